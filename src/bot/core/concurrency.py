@@ -0,0 +1,105 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator, Dict, Hashable, Optional
+
+from aiogram.fsm.storage.base import BaseEventIsolation, StorageKey
+
+from src.bot.core.metrics import metrics
+
+logger = logging.getLogger("zoo_bot.concurrency")
+
+lock_wait = metrics.histogram("updates.lock_wait_ms", "сколько обновление ждало предыдущих обновлений того же чата, мс")
+slot_wait = metrics.histogram("updates.slot_wait_ms", "сколько обновление ждало свободного места в общем лимите, мс")
+serialized = metrics.counter("updates.serialized", "обновления, пришедшие, пока обрабатывалось предыдущее из того же чата")
+
+
+class KeyedLocks:
+    """
+    Набор блокировок по ключу (чату или пользователю).
+    Блокировка существует, пока её кто-то держит или ждёт, поэтому память не растёт
+    с числом пользователей. asyncio.Lock пропускает ждущих по очереди,
+    так что обновления одного чата обрабатываются в порядке поступления.
+    """
+
+    def __init__(self):
+        self._locks: Dict[Hashable, asyncio.Lock] = {}
+        self._users: Dict[Hashable, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._locks)
+
+    async def acquire(self, key: Hashable) -> bool:
+        """Захватывает блокировку ключа. Возвращает True, если пришлось ждать."""
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = asyncio.Lock()
+        self._users[key] = self._users.get(key, 0) + 1
+        contended = lock.locked()
+        try:
+            await lock.acquire()
+        except BaseException:
+            self._forget(key)
+            raise
+        return contended
+
+    def release(self, key: Hashable):
+        self._locks[key].release()
+        self._forget(key)
+
+    def _forget(self, key: Hashable):
+        self._users[key] -= 1
+        if not self._users[key]:
+            del self._users[key]
+            del self._locks[key]
+
+
+class ChatOrderingIsolation(BaseEventIsolation):
+    """
+    Изоляция событий диспетчера (Dispatcher(events_isolation=...)).
+
+    Обновления разных чатов обрабатываются параллельно, но не больше `limit`
+    одновременно (0 — без ограничения), а обновления одного чата — строго по очереди.
+    Встроенный слой FSM читает состояние уже внутри этой блокировки, поэтому
+    следующее обновление чата видит состояние, записанное предыдущим. Так медленная
+    отрисовка результата у одного пользователя не задерживает остальных, а быстрые
+    повторные нажатия одного пользователя не читают и не перезаписывают сессию одновременно.
+    """
+
+    def __init__(self, limit: int = 0):
+        self.limit = limit
+        self._locks = KeyedLocks()
+        self._slots: Optional[asyncio.Semaphore] = asyncio.Semaphore(limit) if limit > 0 else None
+        self._in_flight = 0
+
+        metrics.gauge("updates.in_flight", lambda: self._in_flight, "обновления в обработке")
+        metrics.gauge("updates.active_chats", lambda: len(self._locks), "чаты с обновлениями в обработке или в очереди")
+
+    @asynccontextmanager
+    async def lock(self, key: StorageKey) -> AsyncGenerator[None, None]:
+        # В личном чате chat_id совпадает с id пользователя; в группе очередь общая на весь чат
+        chat = key.chat_id
+        started = time.perf_counter()
+        if await self._locks.acquire(chat):
+            serialized.inc()
+        lock_wait.observe((time.perf_counter() - started) * 1000)
+        try:
+            # Место в общем лимите занимаем уже после очереди своего чата,
+            # чтобы ждущие обновления одного чата не отнимали места у других
+            if self._slots is not None:
+                started = time.perf_counter()
+                await self._slots.acquire()
+                slot_wait.observe((time.perf_counter() - started) * 1000)
+            self._in_flight += 1
+            try:
+                yield
+            finally:
+                self._in_flight -= 1
+                if self._slots is not None:
+                    self._slots.release()
+        finally:
+            self._locks.release(chat)
+
+    async def close(self) -> None:
+        pass
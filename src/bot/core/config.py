@@ -1,22 +1,215 @@
 import os
-from dotenv import load_dotenv
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional
 
-# Загружаем переменные окружения из .env
-load_dotenv()
 
-# Получаем токен бота из переменной окружения
-BOT_TOKEN = os.getenv("TELEGRAM_API_TOKEN")
+def _flag(value: str) -> bool:
+    return value.strip().lower() in ("1", "true", "yes", "on")
 
-# Получаем ссылку на прграмму опекунства
-GUARDIAN_LINK = os.getenv("GUARDIANSHIP_LINK")
 
-# Путь к JSON-файлам с данными
-QUESTIONS_PATH = os.path.join("data", "questions.json")
-ANIMALS_PATH = os.path.join("data", "animals.json")
+@dataclass(frozen=True)
+class Settings:
+    """
+    Настройки бота. Собираются один раз из переменных окружения (и файла .env)
+    при первом вызове get_settings(); импорт модуля ничего не читает и не проверяет.
+    """
 
-# Проверка наличия необходимых файлов
-REQUIRED_FILES = [QUESTIONS_PATH, ANIMALS_PATH]
+    # Токен бота и ссылка на программу опекунства
+    bot_token: Optional[str] = None
+    guardian_link: Optional[str] = None
+    # Адрес Bot API (None — api.telegram.org); например, локальный python -m src.bot.tools.fake_bot_api
+    bot_api_url: Optional[str] = None
 
-for file_path in REQUIRED_FILES:
-    if not os.path.exists(file_path):
-        raise FileNotFoundError(f"Не найден необходимый файл: {file_path}")
\ No newline at end of file
+    # Параметры пула отрисовки изображений с результатом
+    render_workers: int = 2          # количество процессов-воркеров
+    render_queue_size: int = 20      # сколько запросов может ждать в очереди
+    render_timeout: float = 15       # таймаут одной отрисовки, сек
+    # Режим отладки: если задан каталог, копии готовых изображений сохраняются туда.
+    # По умолчанию изображения кодируются в памяти и на диск не пишутся.
+    render_debug_dir: Optional[str] = None
+
+    # Профиль кодирования готового изображения: jpeg | progressive | webp | budget
+    render_profile: str = "jpeg"
+    render_quality: int = 85             # качество JPEG/WebP (для budget — максимальное)
+    render_target_bytes: int = 150_000   # бюджет размера файла для профиля budget
+    render_max_side: int = 1280          # исходные фото уменьшаются до этой стороны
+
+    # Кэш готовых изображений с результатом: LRU в памяти и каталог на диске (None — без диска)
+    render_cache_memory_bytes: int = 16 * 1024 * 1024
+    render_cache_dir: Optional[str] = os.path.join("media", "cache")
+    render_cache_disk_bytes: int = 256 * 1024 * 1024
+
+    # Кэш file_id уже загруженных в Telegram изображений
+    file_id_cache_path: str = os.path.join("data", "file_ids.json")
+    file_id_cache_size: int = 10_000   # максимум записей
+    file_id_cache_flush_interval: float = 5   # как часто сохранять изменения на диск, сек
+
+    # Хранилище состояний викторины: memory | redis | sqlite
+    fsm_storage: str = "memory"
+    redis_url: str = "redis://127.0.0.1:6379/0"
+    fsm_sqlite_path: str = os.path.join("data", "fsm.sqlite3")
+    session_ttl: float = 6 * 60 * 60       # через сколько секунд простоя сессия удаляется
+    session_sweep_interval: float = 600    # как часто искать заброшенные сессии
+
+    # Как выбирать тотем при равенстве очков: first_scored | recent | order | alphabetical
+    tie_break: str = "first_scored"
+    # Завершать викторину досрочно, когда тотем уже не может измениться
+    early_finish: bool = False
+    # Сколько секунд повторное нажатие той же кнопки в том же сообщении считается дублем (0 — не проверять)
+    callback_dedup_ttl: float = 2
+    # Показывать вопросы в одном сообщении, редактируя его, а не отправляя новое на каждый вопрос
+    quiz_edit_in_place: bool = True
+    # Таблица исходов всех путей ответов (собирается python -m src.bot.tools.compile_outcomes)
+    outcomes_path: str = os.path.join("data", "outcomes.bin")
+
+    # Как часто писать метрики в лог, сек (0 — не писать)
+    metrics_log_interval: float = 300
+
+    # Логи: формат text | json, уровень логгера zoo_bot и уровни отдельных логгеров
+    # («zoo_bot.handlers.quiz=DEBUG,aiogram.event=WARNING»)
+    log_format: str = "text"
+    log_level: str = "INFO"
+    log_levels: str = ""
+    # Однотипных записей ниже WARNING — не больше log_sample_limit за интервал, сек (0 — без ограничения)
+    log_sample_limit: int = 20
+    log_sample_interval: float = 1.0
+
+    # Контент викторины: как часто проверять файлы на изменения, сек (0 — не проверять)
+    # и сколько прошлых версий хранить для викторин, начатых до правки
+    content_reload_interval: float = 5
+    content_keep_snapshots: int = 5
+
+    # Как получать обновления: polling (для разработки) | webhook
+    delivery_mode: str = "polling"
+    # Вебхук: адрес и путь встроенного сервера, публичный URL для регистрации в Telegram
+    # (None — не регистрировать, например при локальной проверке) и секретный токен
+    webhook_host: str = "0.0.0.0"
+    webhook_port: int = 8080
+    webhook_path: str = "/webhook"
+    webhook_url: Optional[str] = None
+    webhook_secret: Optional[str] = None
+
+    # Сколько обновлений разных чатов обрабатывать одновременно (0 — без ограничения);
+    # обновления одного чата всегда обрабатываются по очереди
+    update_concurrency: int = 64
+
+    # Ограничение исходящих сообщений: в секунду на всего бота и на один чат
+    # (с запасом на короткий всплеск) и сколько раз повторять запрос после RetryAfter
+    outbound_global_rate: float = 30
+    outbound_chat_rate: float = 1
+    outbound_chat_burst: float = 3
+    outbound_max_retries: int = 3
+
+    # Журналы отзывов и запросов на связь (JSON в строке) и политика fsync: always | interval | never
+    feedback_journal_path: str = os.path.join("data", "feedbacks.jsonl")
+    contact_journal_path: str = os.path.join("data", "contact_requests.jsonl")
+    journal_fsync: str = "interval"
+    journal_fsync_interval: float = 1.0
+    journal_max_bytes: int = 10 * 1024 * 1024   # при превышении файл ротируется
+    journal_backups: int = 5
+
+    # База событий (завершённые викторины, запросы на связь, отзывы) и размер пачки записи
+    events_db_path: str = os.path.join("data", "events.sqlite3")
+    events_batch_size: int = 500
+    events_queue_size: int = 10000       # больше событий в очереди не копится: новые отбрасываются
+    events_max_attempts: int = 5         # после стольких неудач пачка записывается по одному событию
+
+    # Запросы на связь пересылаются сводками в чат сотрудников (None — не пересылаются)
+    staff_chat_id: Optional[int] = None
+    staff_outbox_path: str = os.path.join("data", "outbox.sqlite3")
+    staff_digest_interval: float = 60    # как часто отправлять сводку, сек
+    staff_dedup_window: float = 600      # повтор того же пользователя о том же животном не пересылается, сек
+    staff_max_attempts: int = 10
+
+    # Путь к JSON-файлам с данными
+    questions_path: str = os.path.join("data", "questions.json")
+    animals_path: str = os.path.join("data", "animals.json")
+    # Постоянные номера животных для кнопок «Поделиться» и «Связаться»: список только дополняется
+    animal_ids_path: str = os.path.join("data", "animal_ids.json")
+
+    # Заранее запускать воркеры отрисовки при старте, а не при первом результате
+    render_prewarm: bool = True
+    # Печатать при запуске, сколько заняли импорт, загрузка контента и прогрев
+    startup_profile: bool = False
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        env = os.environ
+        defaults = cls()
+        return cls(
+            bot_token=env.get("TELEGRAM_API_TOKEN"),
+            guardian_link=env.get("GUARDIANSHIP_LINK"),
+            bot_api_url=env.get("TELEGRAM_API_URL") or None,
+            render_workers=int(env.get("RENDER_WORKERS", defaults.render_workers)),
+            render_queue_size=int(env.get("RENDER_QUEUE_SIZE", defaults.render_queue_size)),
+            render_timeout=float(env.get("RENDER_TIMEOUT", defaults.render_timeout)),
+            render_debug_dir=env.get("RENDER_DEBUG_DIR") or None,
+            render_profile=env.get("RENDER_PROFILE", defaults.render_profile),
+            render_quality=int(env.get("RENDER_QUALITY", defaults.render_quality)),
+            render_target_bytes=int(env.get("RENDER_TARGET_BYTES", defaults.render_target_bytes)),
+            render_max_side=int(env.get("RENDER_MAX_SIDE", defaults.render_max_side)),
+            render_cache_memory_bytes=int(env.get("RENDER_CACHE_MEMORY_BYTES", defaults.render_cache_memory_bytes)),
+            render_cache_dir=env.get("RENDER_CACHE_DIR", defaults.render_cache_dir) or None,  # пусто — без диска
+            render_cache_disk_bytes=int(env.get("RENDER_CACHE_DISK_BYTES", defaults.render_cache_disk_bytes)),
+            file_id_cache_path=env.get("FILE_ID_CACHE_PATH", defaults.file_id_cache_path),
+            file_id_cache_size=int(env.get("FILE_ID_CACHE_SIZE", defaults.file_id_cache_size)),
+            file_id_cache_flush_interval=float(
+                env.get("FILE_ID_CACHE_FLUSH_INTERVAL", defaults.file_id_cache_flush_interval)
+            ),
+            fsm_storage=env.get("FSM_STORAGE", defaults.fsm_storage),
+            redis_url=env.get("REDIS_URL", defaults.redis_url),
+            fsm_sqlite_path=env.get("FSM_SQLITE_PATH", defaults.fsm_sqlite_path),
+            session_ttl=float(env.get("SESSION_TTL", defaults.session_ttl)),
+            session_sweep_interval=float(env.get("SESSION_SWEEP_INTERVAL", defaults.session_sweep_interval)),
+            tie_break=env.get("TIE_BREAK", defaults.tie_break),
+            early_finish=_flag(env.get("EARLY_FINISH", "false")),
+            callback_dedup_ttl=float(env.get("CALLBACK_DEDUP_TTL", defaults.callback_dedup_ttl)),
+            quiz_edit_in_place=_flag(env.get("QUIZ_EDIT_IN_PLACE", "true")),
+            outcomes_path=env.get("OUTCOMES_PATH", defaults.outcomes_path),
+            metrics_log_interval=float(env.get("METRICS_LOG_INTERVAL", defaults.metrics_log_interval)),
+            log_format=env.get("LOG_FORMAT", defaults.log_format),
+            log_level=env.get("LOG_LEVEL", defaults.log_level),
+            log_levels=env.get("LOG_LEVELS", defaults.log_levels),
+            log_sample_limit=int(env.get("LOG_SAMPLE_LIMIT", defaults.log_sample_limit)),
+            log_sample_interval=float(env.get("LOG_SAMPLE_INTERVAL", defaults.log_sample_interval)),
+            content_reload_interval=float(env.get("CONTENT_RELOAD_INTERVAL", defaults.content_reload_interval)),
+            content_keep_snapshots=int(env.get("CONTENT_KEEP_SNAPSHOTS", defaults.content_keep_snapshots)),
+            animal_ids_path=env.get("ANIMAL_IDS_PATH", defaults.animal_ids_path),
+            delivery_mode=env.get("DELIVERY_MODE", defaults.delivery_mode),
+            webhook_host=env.get("WEBHOOK_HOST", defaults.webhook_host),
+            webhook_port=int(env.get("WEBHOOK_PORT", defaults.webhook_port)),
+            webhook_path=env.get("WEBHOOK_PATH", defaults.webhook_path),
+            webhook_url=env.get("WEBHOOK_URL") or None,
+            webhook_secret=env.get("WEBHOOK_SECRET") or None,
+            update_concurrency=int(env.get("UPDATE_CONCURRENCY", defaults.update_concurrency)),
+            outbound_global_rate=float(env.get("OUTBOUND_GLOBAL_RATE", defaults.outbound_global_rate)),
+            outbound_chat_rate=float(env.get("OUTBOUND_CHAT_RATE", defaults.outbound_chat_rate)),
+            outbound_chat_burst=float(env.get("OUTBOUND_CHAT_BURST", defaults.outbound_chat_burst)),
+            outbound_max_retries=int(env.get("OUTBOUND_MAX_RETRIES", defaults.outbound_max_retries)),
+            feedback_journal_path=env.get("FEEDBACK_JOURNAL_PATH", defaults.feedback_journal_path),
+            contact_journal_path=env.get("CONTACT_JOURNAL_PATH", defaults.contact_journal_path),
+            journal_fsync=env.get("JOURNAL_FSYNC", defaults.journal_fsync),
+            journal_fsync_interval=float(env.get("JOURNAL_FSYNC_INTERVAL", defaults.journal_fsync_interval)),
+            journal_max_bytes=int(env.get("JOURNAL_MAX_BYTES", defaults.journal_max_bytes)),
+            journal_backups=int(env.get("JOURNAL_BACKUPS", defaults.journal_backups)),
+            events_db_path=env.get("EVENTS_DB_PATH", defaults.events_db_path),
+            events_batch_size=int(env.get("EVENTS_BATCH_SIZE", defaults.events_batch_size)),
+            events_queue_size=int(env.get("EVENTS_QUEUE_SIZE", defaults.events_queue_size)),
+            events_max_attempts=int(env.get("EVENTS_MAX_ATTEMPTS", defaults.events_max_attempts)),
+            staff_chat_id=int(env["STAFF_CHAT_ID"]) if env.get("STAFF_CHAT_ID") else None,
+            staff_outbox_path=env.get("STAFF_OUTBOX_PATH", defaults.staff_outbox_path),
+            staff_digest_interval=float(env.get("STAFF_DIGEST_INTERVAL", defaults.staff_digest_interval)),
+            staff_dedup_window=float(env.get("STAFF_DEDUP_WINDOW", defaults.staff_dedup_window)),
+            staff_max_attempts=int(env.get("STAFF_MAX_ATTEMPTS", defaults.staff_max_attempts)),
+            render_prewarm=_flag(env.get("RENDER_PREWARM", "true")),
+            startup_profile=_flag(env.get("STARTUP_PROFILE", "false")),
+        )
+
+
+@lru_cache(maxsize=None)
+def get_settings() -> Settings:
+    """Возвращает настройки, при первом вызове загрузив переменные окружения из .env."""
+    from dotenv import load_dotenv
+    load_dotenv()
+    return Settings.from_env()
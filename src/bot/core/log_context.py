@@ -0,0 +1,37 @@
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+
+from src.bot.core.logger import bind_log_context, reset_log_context
+
+
+class LogContextMiddleware(BaseMiddleware):
+    """
+    Заполняет контекст записей лога на время обработки события.
+
+    Во внешнем слое обновлений — update_id и user_id, во внутреннем слое
+    сообщений и нажатий — имя обработчика. Фоновые задачи, запущенные
+    обработчиком, получают копию контекста и пишут в лог те же поля.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        fields: Dict[str, Any] = {}
+        if isinstance(event, Update):
+            fields["update_id"] = event.update_id
+        user = data.get("event_from_user")
+        if user is not None:
+            fields["user_id"] = user.id
+        handler_object = data.get("handler")
+        if handler_object is not None:
+            fields["handler"] = handler_object.callback.__name__
+        token = bind_log_context(**fields)
+        try:
+            return await handler(event, data)
+        finally:
+            reset_log_context(token)
@@ -1,21 +1,193 @@
+import contextvars
+import copy
+import json
 import logging
+import multiprocessing
 import os
-from logging.handlers import RotatingFileHandler
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Any, Dict, List, Optional
 
-def setup_logger(name: str) -> logging.Logger:
+from src.bot.core.config import get_settings
+from src.bot.core.metrics import metrics
+
+LOG_FORMATS = ("text", "json")
+
+# Поля контекста, которые попадают в каждую запись: пользователь, обновление, обработчик
+CONTEXT_FIELDS = ("user_id", "update_id", "handler")
+
+_context: contextvars.ContextVar[Dict[str, Any]] = contextvars.ContextVar("log_context", default={})
+
+sampled_out = metrics.counter("logs.sampled_out", "записи лога, пропущенные ограничением частоты")
+
+# Поток, который пишет записи из очереди на диск и в консоль, такой же поток для записей
+# из процессов-воркеров с их очередью и процесс, в котором настроен лог
+_listener: Optional[QueueListener] = None
+_worker_listener: Optional[QueueListener] = None
+_worker_queue: Optional[Any] = None
+_configured_pid: Optional[int] = None
+
+
+def bind_log_context(**fields: Any) -> contextvars.Token:
+    """Добавляет поля к контексту записей лога текущей задачи. Возвращает токен для reset_log_context."""
+    return _context.set({**_context.get(), **fields})
+
+
+def reset_log_context(token: contextvars.Token):
+    _context.reset(token)
+
+
+def parse_levels(spec: str) -> Dict[str, int]:
+    """«zoo_bot.handlers.quiz=DEBUG,aiogram.event=WARNING» -> {имя логгера: уровень}."""
+    levels = {}
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        name, sep, level = item.partition("=")
+        value = logging.getLevelName(level.strip().upper())
+        if not sep or not name.strip() or not isinstance(value, int):
+            raise ValueError(f"Некорректный уровень логгера {item.strip()!r} в LOG_LEVELS, ожидается имя=УРОВЕНЬ")
+        levels[name.strip()] = value
+    return levels
+
+
+class ContextFilter(logging.Filter):
+    """Переносит в запись поля контекста (user_id, update_id, handler) — в потоке, где она создана."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        context = _context.get()
+        for field in CONTEXT_FIELDS:
+            if not hasattr(record, field):
+                setattr(record, field, context.get(field))
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Ограничивает частоту однотипных записей ниже WARNING: не больше `limit`
+    записей с одним шаблоном сообщения за `interval` секунд. Остальные
+    отбрасываются до форматирования; их число добавляется к первой записи
+    следующего интервала (поле suppressed). Предупреждения и ошибки не ограничиваются.
+    """
+
+    def __init__(self, limit: int, interval: float = 1.0):
+        super().__init__()
+        self.limit = limit
+        self.interval = interval
+        self._windows: Dict[tuple, List] = {}     # (логгер, шаблон) -> [начало интервала, записано, пропущено]
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.limit <= 0 or record.levelno >= logging.WARNING:
+            return True
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                dropped = window[2] if window is not None else 0
+                if window is None and len(self._windows) > 10_000:
+                    self._windows.clear()
+                self._windows[key] = [now, 1, 0]
+                if dropped:
+                    record.suppressed = dropped
+                return True
+            if window[1] < self.limit:
+                window[1] += 1
+                return True
+            window[2] += 1
+        sampled_out.inc()
+        return False
+
+
+class _QueueHandler(QueueHandler):
+    """
+    Кладёт запись в очередь вместо записи на диск. Сообщение и трассировка
+    собираются здесь, а оформление (текст или JSON) — в потоке обработчиков.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg = record.message
+        record.args = None
+        record.exc_info = None
+        return record
+
+
+class TextFormatter(logging.Formatter):
+    """Прежний текстовый формат; число пропущенных похожих записей — в конце строки."""
+
+    def __init__(self):
+        super().__init__(fmt='%(asctime)s - %(levelname)s - [%(name)s] %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            line += f" (и ещё {suppressed} похожих пропущено)"
+        return line
+
+
+class JsonFormatter(logging.Formatter):
+    """Запись лога одной строкой JSON с полями контекста — для сборщиков логов."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for field in CONTEXT_FIELDS + ("suppressed",):
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = record.stack_info
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def setup_logger(name: str, log_queue: Optional[Any] = None) -> logging.Logger:
     """
     Создает и настраивает логгер с записью в файл и выводом в консоль.
     Логи хранятся в файле bot.log внутри директории logs.
+
+    Логгер только кладёт записи в очередь — файл и консоль пишет отдельный
+    поток (QueueListener), поэтому цикл событий не ждёт диска. Процессы-воркеры
+    передают `log_queue` из worker_log_queue(): их записи уходят в основной
+    процесс, и bot.log пишет (и ротирует) только он. Формат (LOG_FORMAT),
+    уровни логгеров (LOG_LEVEL, LOG_LEVELS) и ограничение частоты однотипных
+    записей (LOG_SAMPLE_LIMIT за LOG_SAMPLE_INTERVAL) берутся из настроек.
     """
+    global _listener, _worker_listener, _worker_queue, _configured_pid
     logger = logging.getLogger(name)
-    logger.setLevel(logging.INFO)
+    # Процесс-воркер, созданный через fork, наследует обработчики, но не потоки,
+    # которые разбирают очереди, — в нём настраиваем всё заново
+    if _configured_pid == os.getpid():
+        return logger
+    _listener = _worker_listener = _worker_queue = None
 
-    if not logger.handlers:
+    settings = get_settings()
+    if settings.log_format not in LOG_FORMATS:
+        raise ValueError(f"Неизвестный формат LOG_FORMAT={settings.log_format}. Доступны: {', '.join(LOG_FORMATS)}")
+    levels = parse_levels(settings.log_levels)
+    logger.setLevel(settings.log_level.upper())
+
+    if log_queue is not None:
+        queue_handler = _QueueHandler(log_queue)
+    else:
         # Формат записи логов
-        formatter = logging.Formatter(
-            fmt='%(asctime)s - %(levelname)s - [%(name)s] %(message)s',
-            datefmt='%Y-%m-%d %H:%M:%S'
-        )
+        formatter = JsonFormatter() if settings.log_format == "json" else TextFormatter()
 
         # Логгирование в файл
         log_dir = 'data/logs'
@@ -24,11 +196,68 @@ def setup_logger(name: str) -> logging.Logger:
 
         file_handler = RotatingFileHandler(log_file, maxBytes=5*1024*1024, backupCount=3, encoding='utf-8')
         file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
 
         # Логгирование в консоль
         console_handler = logging.StreamHandler()
         console_handler.setFormatter(formatter)
-        logger.addHandler(console_handler)
 
-    return logger
\ No newline at end of file
+        queue_handler = _QueueHandler(queue.SimpleQueue())
+        _listener = QueueListener(queue_handler.queue, file_handler, console_handler, respect_handler_level=True)
+    queue_handler.addFilter(SamplingFilter(settings.log_sample_limit, settings.log_sample_interval))
+    queue_handler.addFilter(ContextFilter())
+
+    targets = [logger]
+    for logger_name, level in levels.items():
+        logging.getLogger(logger_name).setLevel(level)
+        # Логгеры вне name (например, aiogram) получают те же обработчики
+        if logger_name != name and not logger_name.startswith(name + "."):
+            targets.append(logging.getLogger(logger_name))
+    for target in targets:
+        for handler in list(target.handlers):
+            target.removeHandler(handler)
+        target.addHandler(queue_handler)
+
+    if _listener is not None:
+        _listener.start()
+    _configured_pid = os.getpid()
+    return logger
+
+
+def worker_log_queue() -> Optional[Any]:
+    """
+    Очередь для записей из процессов-воркеров (передаётся им при запуске).
+    Записи из неё пишет в тот же файл и консоль отдельный поток основного процесса.
+    None, если лог основного процесса не настроен.
+    """
+    global _worker_listener, _worker_queue
+    if _listener is None or _configured_pid != os.getpid():
+        return None
+    if _worker_queue is None:
+        _worker_queue = multiprocessing.Queue()
+        _worker_listener = QueueListener(_worker_queue, *_listener.handlers, respect_handler_level=True)
+        _worker_listener.start()
+    return _worker_queue
+
+
+def stop_logging():
+    """
+    При остановке бота дописывает очереди записей и останавливает потоки логов.
+    Записи, сделанные после этого, пишутся в файл и консоль напрямую.
+    """
+    global _listener, _worker_listener, _worker_queue
+    if _listener is None or _configured_pid != os.getpid():
+        return
+    if _worker_listener is not None:
+        _worker_listener.stop()
+        _worker_queue.close()
+        _worker_listener = _worker_queue = None
+    _listener.stop()
+    for logger in [logging.getLogger()] + [
+        item for item in logging.Logger.manager.loggerDict.values() if isinstance(item, logging.Logger)
+    ]:
+        for handler in list(logger.handlers):
+            if isinstance(handler, _QueueHandler):
+                logger.removeHandler(handler)
+                for target in _listener.handlers:
+                    logger.addHandler(target)
+    _listener = None
@@ -0,0 +1,125 @@
+import asyncio
+import bisect
+import logging
+from typing import Callable, Dict, Sequence
+
+logger = logging.getLogger("zoo_bot.metrics")
+
+
+class Counter:
+    """Монотонно растущий счётчик."""
+
+    def __init__(self, name: str, description: str = ""):
+        self.name = name
+        self.description = description
+        self.value = 0
+
+    def inc(self, amount: int = 1):
+        self.value += amount
+
+
+class Gauge:
+    """Мгновенное значение, которое вычисляется функцией в момент чтения."""
+
+    def __init__(self, name: str, func: Callable[[], float], description: str = ""):
+        self.name = name
+        self.description = description
+        self._func = func
+
+    @property
+    def value(self) -> float:
+        try:
+            return round(self._func(), 4)
+        except Exception:
+            return float("nan")
+
+
+# Границы корзин гистограмм по умолчанию, мс
+DEFAULT_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+
+class Histogram:
+    """
+    Распределение значений (обычно задержек в мс) по корзинам.
+    Квантили оцениваются по верхней границе корзины, поэтому память не растёт.
+    """
+
+    def __init__(self, name: str, description: str = "", buckets: Sequence[float] = DEFAULT_BUCKETS_MS):
+        self.name = name
+        self.description = description
+        self.bounds = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """Оценка квантиля: верхняя граница корзины, в которую он попадает."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(self.bounds[index], self.max) if index < len(self.bounds) else self.max
+        return self.max
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            f"{self.name}.count": self.count,
+            f"{self.name}.mean": round(self.total / self.count, 2) if self.count else 0.0,
+            f"{self.name}.p50": round(self.quantile(0.5), 2),
+            f"{self.name}.p95": round(self.quantile(0.95), 2),
+            f"{self.name}.max": round(self.max, 2),
+        }
+
+
+class MetricsRegistry:
+    """Реестр метрик бота. Метрики создаются по имени при первом обращении."""
+
+    def __init__(self):
+        self._counters: Dict[str, Counter] = {}
+        self._gauges: Dict[str, Gauge] = {}
+        self._histograms: Dict[str, Histogram] = {}
+
+    def counter(self, name: str, description: str = "") -> Counter:
+        if name not in self._counters:
+            self._counters[name] = Counter(name, description)
+        return self._counters[name]
+
+    def gauge(self, name: str, func: Callable[[], float], description: str = "") -> Gauge:
+        self._gauges[name] = Gauge(name, func, description)
+        return self._gauges[name]
+
+    def histogram(self, name: str, description: str = "", buckets: Sequence[float] = DEFAULT_BUCKETS_MS) -> Histogram:
+        if name not in self._histograms:
+            self._histograms[name] = Histogram(name, description, buckets)
+        return self._histograms[name]
+
+    def snapshot(self) -> Dict[str, float]:
+        """Возвращает текущие значения всех метрик (гистограммы — сводкой из нескольких значений)."""
+        values = {name: counter.value for name, counter in self._counters.items()}
+        values.update({name: gauge.value for name, gauge in self._gauges.items()})
+        for histogram in self._histograms.values():
+            values.update(histogram.summary())
+        return dict(sorted(values.items()))
+
+
+# Общий реестр метрик
+metrics = MetricsRegistry()
+
+
+async def log_metrics_periodically(interval: float):
+    """Раз в `interval` секунд пишет значения метрик в лог."""
+    while True:
+        await asyncio.sleep(interval)
+        snapshot = metrics.snapshot()
+        if snapshot:
+            logger.info("📊 Метрики: %s", ", ".join(f"{name}={value}" for name, value in snapshot.items()))
@@ -0,0 +1,39 @@
+import logging
+import sys
+import time
+from contextlib import contextmanager
+from typing import List, Optional, Tuple
+
+# Тяжёлые зависимости, о которых полезно знать, загружены ли они к моменту старта
+HEAVY_MODULES = ("PIL", "redis", "aiohttp", "pydantic")
+
+
+class StartupProfiler:
+    """Замеряет этапы запуска бота: импорты, загрузку контента, создание хранилища."""
+
+    def __init__(self, started: Optional[float] = None):
+        self.started = started if started is not None else time.perf_counter()
+        self.phases: List[Tuple[str, float, int]] = []
+
+    @contextmanager
+    def phase(self, name: str):
+        """Замеряет длительность этапа и число модулей, импортированных за это время."""
+        modules = len(sys.modules)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self.phases.append((name, elapsed_ms, len(sys.modules) - modules))
+
+    def report(self) -> str:
+        total_ms = (time.perf_counter() - self.started) * 1000
+        lines = [f"⏱ Запуск занял {total_ms:.0f} мс:"]
+        for name, elapsed_ms, modules in self.phases:
+            lines.append(f"  {name:<28} {elapsed_ms:>8.1f} мс  модулей: +{modules}")
+        loaded = [name for name in HEAVY_MODULES if name in sys.modules]
+        lines.append(f"  загружены: {', '.join(loaded) or '—'}; всего модулей: {len(sys.modules)}")
+        return "\n".join(lines)
+
+    def log(self, logger: logging.Logger):
+        logger.info("%s", self.report())
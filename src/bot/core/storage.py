@@ -0,0 +1,313 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, KeyBuilder, StateType, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from src.bot.core.config import get_settings
+from src.bot.core.metrics import metrics
+
+logger = logging.getLogger("zoo_bot.storage")
+
+sessions_expired = metrics.counter("sessions.expired", "сессии, удалённые по истечении TTL")
+
+# Последние измерения, сделанные при очистке: число сессий и средний объём одной сессии
+_session_stats = {"count": 0, "bytes_per_session": 0}
+metrics.gauge("sessions.active", lambda: _session_stats["count"], "сессий в хранилище")
+metrics.gauge("sessions.bytes_per_session", lambda: _session_stats["bytes_per_session"], "средний объём сессии, байт")
+
+
+def _state_name(state: StateType) -> Optional[str]:
+    return state.state if isinstance(state, State) else state
+
+
+def _deep_sizeof(value: Any, _seen: Optional[set] = None) -> int:
+    """Приблизительный объём памяти, занимаемый объектом вместе с вложенными."""
+    seen = _seen if _seen is not None else set()
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(_deep_sizeof(k, seen) + _deep_sizeof(v, seen) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set)):
+        size += sum(_deep_sizeof(item, seen) for item in value)
+    return size
+
+
+class TTLMemoryStorage(MemoryStorage):
+    """
+    Хранилище в памяти процесса, которое помнит время последней записи
+    каждой сессии и позволяет удалять заброшенные сессии.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._touched: Dict[StorageKey, float] = {}
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        await super().set_state(key, state)
+        self._touched[key] = time.monotonic()
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        await super().set_data(key, data)
+        self._touched[key] = time.monotonic()
+
+    async def sweep(self, ttl: float) -> int:
+        """Удаляет сессии, в которые никто не писал дольше ttl секунд."""
+        deadline = time.monotonic() - ttl
+        # Записи, созданные только чтением (get_state у новых пользователей), тоже удаляются
+        expired = [
+            key for key in self.storage
+            if self._touched.get(key, 0) < deadline
+        ]
+        for key in expired:
+            self.storage.pop(key, None)
+            self._touched.pop(key, None)
+        return len(expired)
+
+    async def session_stats(self) -> Tuple[int, int]:
+        """Число сессий и средний объём данных одной сессии в байтах."""
+        records = list(self.storage.values())
+        if not records:
+            return 0, 0
+        total = sum(_deep_sizeof(record.data) + _deep_sizeof(record.state) for record in records)
+        return len(records), total // len(records)
+
+
+class RedisHashStorage(BaseStorage):
+    """
+    Хранилище состояний в Redis или любом сервере с протоколом Redis.
+
+    Данные сессии лежат в хэше: каждое поле сериализуется в JSON отдельно.
+    Поэтому update_data записывает только переданные поля и вместе с чтением
+    результата уходит одним конвейером MULTI/EXEC — один сетевой запрос на ответ.
+
+    Каждая запись продлевает время жизни ключей на ttl секунд,
+    так что заброшенные сессии удаляет сам сервер.
+    """
+
+    def __init__(self, redis, ttl: Optional[float] = None, key_builder: Optional[KeyBuilder] = None):
+        self.redis = redis
+        self.ttl_ms = int(ttl * 1000) if ttl else None
+        self.key_builder = key_builder or DefaultKeyBuilder()
+
+    @classmethod
+    def from_url(cls, url: str, ttl: Optional[float] = None) -> "RedisHashStorage":
+        try:
+            from redis.asyncio import Redis
+        except ImportError as e:
+            raise RuntimeError("Для FSM_STORAGE=redis установите пакет redis: pip install redis") from e
+        # RESP2 поддерживают и Redis любой версии, и локальный сервер из tools/resp_server
+        return cls(Redis.from_url(url, decode_responses=True, protocol=2), ttl=ttl)
+
+    @staticmethod
+    def _decode(raw: Dict[str, str]) -> Dict[str, Any]:
+        return {field: json.loads(value) for field, value in raw.items()}
+
+    @staticmethod
+    def _encode(data: Mapping[str, Any]) -> Dict[str, str]:
+        return {field: json.dumps(value, ensure_ascii=False) for field, value in data.items()}
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        redis_key = self.key_builder.build(key, "state")
+        name = _state_name(state)
+        if name is None:
+            await self.redis.delete(redis_key)
+        else:
+            await self.redis.set(redis_key, name, px=self.ttl_ms)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return await self.redis.get(self.key_builder.build(key, "state"))
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        redis_key = self.key_builder.build(key, "data")
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.delete(redis_key)
+            if data:
+                pipe.hset(redis_key, mapping=self._encode(data))
+                self._expire(pipe, key)
+            await pipe.execute()
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        return self._decode(await self.redis.hgetall(self.key_builder.build(key, "data")))
+
+    async def update_data(self, key: StorageKey, data: Mapping[str, Any]) -> Dict[str, Any]:
+        if not data:
+            return await self.get_data(key)
+
+        redis_key = self.key_builder.build(key, "data")
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(redis_key, mapping=self._encode(data))
+            self._expire(pipe, key)
+            pipe.hgetall(redis_key)
+            results = await pipe.execute()
+        return self._decode(results[-1])
+
+    def _expire(self, pipe, key: StorageKey):
+        """Продлевает жизнь и данных, и состояния сессии — в том же конвейере."""
+        if self.ttl_ms:
+            pipe.pexpire(self.key_builder.build(key, "data"), self.ttl_ms)
+            pipe.pexpire(self.key_builder.build(key, "state"), self.ttl_ms)
+
+    async def sweep(self, ttl: float) -> int:
+        """Заброшенные сессии удаляет сам Redis по истечении TTL ключей."""
+        return 0
+
+    async def session_stats(self) -> Optional[Tuple[int, int]]:
+        return None
+
+    async def close(self) -> None:
+        await self.redis.aclose()
+
+
+class SQLiteStorage(BaseStorage):
+    """
+    Хранилище состояний во встроенной базе SQLite в режиме WAL.
+
+    Все обращения к базе идут через один служебный поток, чтобы не блокировать
+    цикл событий. update_data выполняется одной транзакцией
+    «прочитать — объединить — записать».
+    """
+
+    def __init__(self, path: str, key_builder: Optional[KeyBuilder] = None):
+        self.path = path
+        self.key_builder = key_builder or DefaultKeyBuilder()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="fsm-sqlite")
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS fsm ("
+                " key TEXT PRIMARY KEY,"
+                " state TEXT,"
+                " data TEXT NOT NULL DEFAULT '{}',"
+                " updated_at REAL NOT NULL)"
+            )
+            self._conn = conn
+            logger.info("Хранилище состояний SQLite: %s", self.path)
+        return self._conn
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    def _set_column(self, key: str, column: str, value: Optional[str]):
+        self._connection().execute(
+            f"INSERT INTO fsm (key, {column}, updated_at) VALUES (?, ?, ?) "
+            f"ON CONFLICT(key) DO UPDATE SET {column} = excluded.{column}, updated_at = excluded.updated_at",
+            (key, value, time.time())
+        )
+
+    def _get_row(self, key: str) -> Optional[tuple]:
+        return self._connection().execute("SELECT state, data FROM fsm WHERE key = ?", (key,)).fetchone()
+
+    def _update_data(self, key: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT data FROM fsm WHERE key = ?", (key,)).fetchone()
+            current = json.loads(row[0]) if row else {}
+            current.update(data)
+            self._set_column(key, "data", json.dumps(current, ensure_ascii=False))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return current
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        await self._run(self._set_column, self.key_builder.build(key), "state", _state_name(state))
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        row = await self._run(self._get_row, self.key_builder.build(key))
+        return row[0] if row else None
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        value = json.dumps(dict(data), ensure_ascii=False)
+        await self._run(self._set_column, self.key_builder.build(key), "data", value)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        row = await self._run(self._get_row, self.key_builder.build(key))
+        return json.loads(row[1]) if row else {}
+
+    async def update_data(self, key: StorageKey, data: Mapping[str, Any]) -> Dict[str, Any]:
+        return await self._run(self._update_data, self.key_builder.build(key), dict(data))
+
+    def _sweep(self, ttl: float) -> int:
+        cursor = self._connection().execute("DELETE FROM fsm WHERE updated_at < ?", (time.time() - ttl,))
+        return cursor.rowcount
+
+    def _session_stats(self) -> Tuple[int, int]:
+        count, average = self._connection().execute(
+            "SELECT COUNT(*), AVG(LENGTH(data) + IFNULL(LENGTH(state), 0)) FROM fsm"
+        ).fetchone()
+        return count, int(average or 0)
+
+    async def sweep(self, ttl: float) -> int:
+        """Удаляет сессии, в которые никто не писал дольше ttl секунд."""
+        return await self._run(self._sweep, ttl)
+
+    async def session_stats(self) -> Tuple[int, int]:
+        """Число сессий и средний объём сериализованной сессии в байтах."""
+        return await self._run(self._session_stats)
+
+    async def close(self) -> None:
+        def _close():
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+        await self._run(_close)
+        self._executor.shutdown(wait=True)
+
+
+def create_storage() -> BaseStorage:
+    """
+    Создаёт хранилище состояний FSM по настройке FSM_STORAGE:
+    — memory — в памяти процесса (для разработки, теряется при перезапуске),
+    — redis — Redis или совместимый сервер по адресу REDIS_URL,
+    — sqlite — встроенная база по пути FSM_SQLITE_PATH.
+    """
+    settings = get_settings()
+    if settings.fsm_storage == "memory":
+        return TTLMemoryStorage()
+    if settings.fsm_storage == "redis":
+        logger.info("Хранилище состояний Redis: %s", settings.redis_url)
+        return RedisHashStorage.from_url(settings.redis_url, ttl=settings.session_ttl)
+    if settings.fsm_storage == "sqlite":
+        return SQLiteStorage(settings.fsm_sqlite_path)
+    raise ValueError(
+        f"Неизвестное хранилище состояний FSM_STORAGE={settings.fsm_storage}. Доступны: memory, redis, sqlite"
+    )
+
+
+async def sweep_sessions_periodically(storage: BaseStorage, ttl: float, interval: float):
+    """
+    Фоновая очистка: раз в interval секунд удаляет сессии, простаивающие дольше ttl,
+    и обновляет метрики числа сессий и объёма памяти на сессию.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            removed = await storage.sweep(ttl)
+            if removed:
+                sessions_expired.inc(removed)
+                logger.info("Удалено заброшенных сессий: %s", removed)
+
+            stats = await storage.session_stats()
+            if stats is not None:
+                _session_stats["count"], _session_stats["bytes_per_session"] = stats
+        except Exception as e:
+            logger.exception("Ошибка при очистке сессий: %s", e)
@@ -0,0 +1,70 @@
+import asyncio
+import logging
+
+from aiogram import Bot, Dispatcher
+
+from src.bot.core.config import Settings
+from src.bot.core.metrics import metrics
+
+logger = logging.getLogger("zoo_bot.webhook")
+
+rejected = metrics.counter("webhook.rejected", "запросы к вебхуку с неверным секретным токеном")
+
+DELIVERY_MODES = ("polling", "webhook")
+
+
+async def run_webhook(dp: Dispatcher, bot: Bot, settings: Settings):
+    """
+    Принимает обновления через вебхук: встроенный aiohttp-сервер слушает
+    WEBHOOK_HOST:WEBHOOK_PORT, проверяет секретный токен из заголовка
+    X-Telegram-Bot-Api-Secret-Token и сразу отвечает Telegram 200,
+    а обновление обрабатывается в фоне.
+
+    Если задан WEBHOOK_URL, адрес регистрируется в Telegram при запуске.
+    Без него сервер просто слушает порт — так удобно проверять бота локально,
+    отправляя записанные обновления (python -m src.bot.tools.replay_updates).
+    WEBHOOK_SECRET обязателен в обоих случаях: запросы без него отклоняются.
+    Работает до отмены задачи.
+    """
+    if not settings.webhook_secret:
+        raise ValueError("Вебхук не запускается без WEBHOOK_SECRET")
+
+    from aiohttp import web
+    from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+
+    @web.middleware
+    async def count_rejected(request: web.Request, handler):
+        response = await handler(request)
+        if response.status == 401:
+            rejected.inc()
+            logger.warning("Запрос к вебхуку с неверным секретным токеном от %s", request.remote)
+        return response
+
+    app = web.Application(middlewares=[count_rejected])
+    SimpleRequestHandler(
+        dispatcher=dp,
+        bot=bot,
+        handle_in_background=True,
+        secret_token=settings.webhook_secret
+    ).register(app, path=settings.webhook_path)
+    setup_application(app, dp, bot=bot)
+
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, settings.webhook_host, settings.webhook_port)
+    await site.start()
+    logger.info("Вебхук слушает http://%s:%s%s", settings.webhook_host, settings.webhook_port, settings.webhook_path)
+
+    try:
+        if settings.webhook_url:
+            await bot.set_webhook(
+                settings.webhook_url,
+                secret_token=settings.webhook_secret,
+                allowed_updates=dp.resolve_used_update_types()
+            )
+            logger.info("Вебхук зарегистрирован в Telegram: %s", settings.webhook_url)
+        else:
+            logger.info("WEBHOOK_URL не задан — вебхук в Telegram не регистрируется")
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
@@ -0,0 +1,93 @@
+import contextvars
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+from aiogram import Router
+from aiogram.fsm.context import FSMContext
+from aiogram.types import CallbackQuery
+
+from src.bot.core.logger import bind_log_context
+from src.bot.core.metrics import metrics
+from src.bot.keyboards.callback_codec import CallbackPayload, CallbackType, decode
+from src.bot.services.idempotency import get_callback_guard, suppressed
+
+router = Router()
+logger = logging.getLogger("zoo_bot.handlers.callbacks")
+
+CallbackHandler = Callable[[CallbackQuery, CallbackPayload, FSMContext], Awaitable[None]]
+
+# Таблица маршрутизации нажатий: тип кнопки -> обработчик.
+# Заполняется декоратором callback_handler при импорте модулей-обработчиков
+_HANDLERS: Dict[CallbackType, CallbackHandler] = {}
+
+rejected = metrics.counter("callbacks.rejected", "нажатия с повреждёнными, устаревшими или неизвестными данными")
+ack_time = metrics.histogram("callbacks.ack_ms", "от начала обработки нажатия до ответа на него, мс")
+
+# Когда началась обработка текущего нажатия (для метрики времени ответа)
+_received_at: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("callback_received_at", default=None)
+
+
+def callback_handler(callback_type: CallbackType):
+    """Регистрирует обработчик для кнопок указанного типа."""
+    def register(handler: CallbackHandler) -> CallbackHandler:
+        if callback_type in _HANDLERS:
+            raise ValueError(f"Обработчик для кнопок {callback_type.name} уже зарегистрирован")
+        _HANDLERS[callback_type] = handler
+        return handler
+    return register
+
+
+async def ack_callback(callback: CallbackQuery, text: Optional[str] = None):
+    """
+    Отвечает на нажатие (у пользователя пропадают «часики» на кнопке).
+    Вызывается сразу после проверки данных кнопки, до отправки сообщений и отрисовки.
+    """
+    await callback.answer(text)
+    received = _received_at.get()
+    if received is not None:
+        ack_time.observe((time.perf_counter() - received) * 1000)
+
+
+async def reject_callback(callback: CallbackQuery, reason: str):
+    """Отвечает на нажатие устаревшей или повреждённой кнопки, ничего не делая."""
+    rejected.inc()
+    logger.info("Пользователь %s: нажатие отклонено (%s)", callback.from_user.id, reason)
+    await ack_callback(callback, "⌛ Эта кнопка устарела. Нажми /start, чтобы начать заново.")
+
+
+@router.callback_query()
+async def dispatch_callback(callback: CallbackQuery, state: FSMContext):
+    """
+    Единственный обработчик нажатий на кнопки: распаковывает callback_data
+    один раз и передаёт его обработчику по типу кнопки из таблицы.
+    Обработчик должен ответить на нажатие через ack_callback.
+    """
+    _received_at.set(time.perf_counter())
+    payload = decode(callback.data)
+    if payload is None:
+        await reject_callback(callback, f"некорректные данные {callback.data!r}")
+        return
+
+    handler = _HANDLERS.get(payload.type)
+    if handler is None:
+        await reject_callback(callback, f"нет обработчика для {payload.type.name}")
+        return
+
+    # Двойное нажатие той же кнопки в том же сообщении обрабатывается один раз
+    message_id = callback.message.message_id if callback.message else callback.inline_message_id
+    guard = get_callback_guard()
+    key = (callback.from_user.id, message_id, callback.data)
+    if guard.seen(key):
+        suppressed.inc()
+        logger.info("Пользователь %s: повторное нажатие %s пропущено", callback.from_user.id, payload.type.name)
+        await ack_callback(callback)
+        return
+
+    bind_log_context(handler=handler.__name__)
+    try:
+        await handler(callback, payload, state)
+    except Exception:
+        # Обработка сорвалась — повторное нажатие той же кнопки должно пройти
+        guard.forget(key)
+        raise
@@ -1,44 +1,59 @@
-import os
 import logging
-from aiogram import Router, F
 from aiogram.types import CallbackQuery
+from aiogram.fsm.context import FSMContext
+
+from src.bot.keyboards.callback_codec import CallbackPayload, CallbackType
+from src.bot.handlers.callbacks import ack_callback, callback_handler, reject_callback
+from src.bot.services.content import get_content_store
+from src.bot.services.journal import JournalClosed, get_journal
+from src.bot.services.events import get_event_store
+from src.bot.services.staff_notify import get_staff_notifier
 
-router = Router()
 logger = logging.getLogger("zoo_bot.handlers.contact")
 
-@router.callback_query(F.data.startswith("contact_"))
-async def handle_contact_request(callback: CallbackQuery):
+@callback_handler(CallbackType.CONTACT)
+async def handle_contact_request(callback: CallbackQuery, payload: CallbackPayload, state: FSMContext):
     """
     Обрабатывает нажатие кнопки "📞 Связаться":
     — собирает информацию о пользователе и его тотемном животном,
-    — сохраняет запрос в файл,
+    — сохраняет запрос в журнал (data/contact_requests.jsonl),
+    — ставит его в очередь уведомлений сотрудникам (если задан STAFF_CHAT_ID),
     — отправляет подтверждение пользователю.
     """
     user = callback.from_user
-    totem_key = callback.data.replace("contact_", "").strip()
-
-    # Формируем текст для сотрудника зоопарка
-    request_text = (
-        "📩 Новый контактный запрос:\n"
-        f"👤 Пользователь: {user.full_name} (ID: {user.id})\n"
-        f"🐾 Тотемное животное: {totem_key}\n"
-    )
-
-    # Сохраняем запрос в файл
-    contact_dir = 'data'
-    contact_path = os.path.join(contact_dir, 'contact_requests.txt')
+    (animal_id,) = payload.args
+    # Кнопки с версией контента — прежнего формата, где номер зависел от порядка животных
+    found = get_content_store().find_animal(animal_id) if payload.version == 0 else None
+    if found is None:
+        await reject_callback(callback, f"нет животного с номером {animal_id} (версия кнопки {payload.version})")
+        return
+    snapshot, totem_key = found
+    await ack_callback(callback)
 
+    # Сохраняем запрос для сотрудников зоопарка: запись на диск идёт в фоне
     try:
-        os.makedirs(contact_dir, exist_ok=True)
-        with open(contact_path, 'a', encoding='utf-8') as f:
-            f.write(request_text + "\n")
-        logger.info(f"Контактный запрос сохранён: user_id={user.id}, totem={totem_key}")
-    except Exception as e:
-        logger.exception(f"Ошибка при сохранении контактного запроса: {e}")
+        get_journal("contacts").write({
+            "user_id": user.id,
+            "full_name": user.full_name,
+            "username": user.username,
+            "animal": totem_key,
+            "animal_name": snapshot.animals[totem_key]["name"],
+            "content_version": snapshot.version,
+        })
+    except JournalClosed as e:
+        logger.error("Контактный запрос от %s не сохранён: %s", user.id, e)
+    else:
+        # В базу событий — только запросы, принятые журналом
+        get_event_store().record_contact(user.id, user.full_name, user.username, totem_key, snapshot.version)
+        logger.info("Контактный запрос сохранён: user_id=%s, totem=%s", user.id, totem_key)
+
+    # Сотрудники получат запрос в ближайшей сводке; нажатие не ждёт отправки
+    notifier = get_staff_notifier()
+    if notifier is not None:
+        notifier.submit(user.id, user.full_name, user.username, totem_key, snapshot.animals[totem_key]["name"])
 
     # Отправляем подтверждение пользователю
     await callback.message.answer(
         "📧 Ваш запрос успешно отправлен сотрудникам Московского зоопарка! "
         "Мы свяжемся с вами в ближайшее время."
-    )
-    await callback.answer()
\ No newline at end of file
+    )
\ No newline at end of file
@@ -1,10 +1,14 @@
-import os
 import logging
-from aiogram import Router, F
+from aiogram import Router
 from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.fsm.context import FSMContext
 
+from src.bot.keyboards.callback_codec import CallbackPayload, CallbackType
+from src.bot.handlers.callbacks import ack_callback, callback_handler
+from src.bot.services.journal import JournalClosed, get_journal
+from src.bot.services.events import get_event_store
+
 router = Router()
 logger = logging.getLogger("zoo_bot.handlers.feedback")
 
@@ -13,27 +17,27 @@ class FeedbackState(StatesGroup):
     waiting_for_feedback = State()
 
 # 2) Хэндлер кнопки “💬 Отзыв”
-@router.callback_query(F.data == "feedback")
-async def start_user_feedback(callback: CallbackQuery, state: FSMContext):
+@callback_handler(CallbackType.FEEDBACK)
+async def start_user_feedback(callback: CallbackQuery, payload: CallbackPayload, state: FSMContext):
     """
     Запускает сбор отзыва от пользователя.
     Переводит бота в состояние ожидания текстового сообщения.
     """
     user = callback.from_user
-    logger.info(f"Пользователь {user.id} начал оставлять отзыв")
-    
+    logger.info("Пользователь %s начал оставлять отзыв", user.id)
+    await ack_callback(callback)
+
     await callback.message.answer(
         "💌 Поделитесь своими впечатлениями — что вам понравилось или что можно улучшить:"
     )
     await state.set_state(FeedbackState.waiting_for_feedback)
-    await callback.answer()
 
 # 3) Хэндлер получения текста отзыва
 @router.message(FeedbackState.waiting_for_feedback)
 async def receive_user_feedback(message: Message, state: FSMContext):
     """
     Обрабатывает введённый пользователем отзыв:
-    — сохраняет его в файл,
+    — сохраняет его в журнал (data/feedbacks.jsonl),
     — отправляет подтверждение,
     — завершает состояние.
     """
@@ -41,20 +45,17 @@ async def receive_user_feedback(message: Message, state: FSMContext):
     feedback_text = message.text.strip()
     username = user.username or user.first_name
 
-    # Путь к файлу с отзывами
-    feedback_dir = 'data'
-    os.makedirs(feedback_dir, exist_ok=True)
-    feedback_path = os.path.join(feedback_dir, 'feedbacks.txt')
-
-    # Сохраняем отзыв в файл
+    # Сохраняем отзыв: запись на диск идёт в фоне
     try:
-        with open(feedback_path, 'a', encoding='utf-8') as f:
-            f.write(f"{user.id} (@{username}): {feedback_text}\n")
-        logger.info(f"Отзыв от пользователя {user.id} успешно сохранён")
-        await message.answer("Спасибо за ваше мнение! ❤️")
-    except Exception as e:
-        logger.exception(f"Ошибка при сохранении отзыва от {user.id}: {e}")
+        get_journal("feedback").write({"user_id": user.id, "username": username, "text": feedback_text})
+    except JournalClosed as e:
+        logger.exception("Ошибка при сохранении отзыва от %s: %s", user.id, e)
         await message.answer("⚠️ Не удалось сохранить отзыв. Попробуйте позже.")
+    else:
+        # В базу событий — только отзывы, принятые журналом
+        get_event_store().record_feedback(user.id, username, feedback_text)
+        logger.info("Отзыв от пользователя %s успешно сохранён", user.id)
+        await message.answer("Спасибо за ваше мнение! ❤️")
 
     # Сброс состояния
     await state.clear()
\ No newline at end of file
@@ -1,81 +1,179 @@
 import logging
-from aiogram import Router, F
-from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
+from contextlib import suppress
+from aiogram.exceptions import TelegramBadRequest
+from typing import Optional
+from aiogram.types import Message, CallbackQuery, User
 from aiogram.fsm.context import FSMContext
 
 from src.bot.states.quiz_states import QuizSession
-from src.bot.services.data_loader import load_questions
+from src.bot.core.config import get_settings
+from src.bot.core.metrics import metrics
+from src.bot.services.content import get_content_store, ContentSnapshot
 from src.bot.keyboards.buttons import get_question_keyboard
+from src.bot.keyboards.callback_codec import CallbackPayload, CallbackType
+from src.bot.handlers.callbacks import ack_callback, callback_handler, reject_callback
+from src.bot.services import session
+from src.bot.services.idempotency import suppressed
 
-router = Router()
 logger = logging.getLogger("zoo_bot.handlers.quiz")
 
-# Загружаем вопросы из JSON-файла
-QUESTIONS = load_questions()
-TOTAL_QUESTIONS = len(QUESTIONS)
+# На каждый вопрос уходят три вызова Bot API: отправка вопроса, снятие клавиатуры и ответ на нажатие.
+# При показе вопросов в одном сообщении — два: правка сообщения и ответ на нажатие
+API_CALLS_PER_QUESTION = 3
+API_CALLS_PER_QUESTION_IN_PLACE = 2
 
-logger.info(f"Загружено {TOTAL_QUESTIONS} вопросов для викторины")
+early_finishes = metrics.counter("quiz.early_finishes", "викторины, завершённые досрочно")
+questions_skipped = metrics.counter("quiz.questions_skipped", "вопросы, которые не пришлось задавать")
+edit_fallbacks = metrics.counter("quiz.edit_fallbacks", "вопросы, отправленные новым сообщением, потому что правка не удалась")
 
 
-@router.callback_query(F.data == "start_quiz")
-async def start_quiz(callback: CallbackQuery, state: FSMContext):
+@callback_handler(CallbackType.START_QUIZ)
+async def start_quiz(callback: CallbackQuery, payload: CallbackPayload, state: FSMContext):
     """
     Обработчик кнопки «🐾 Начать викторину».
     Очищает предыдущее состояние и начинает новую сессию.
     """
+    from src.bot.handlers.result import cancel_result_delivery
+
+    # Викторина проходит целиком на той версии контента, с которой начата
+    snapshot = get_content_store().current
+    await ack_callback(callback)
+
+    # Результат прошлой викторины, который ещё рисуется, пользователю уже не нужен
+    cancel_result_delivery(callback.from_user.id)
     await state.clear()
-    await state.update_data(current_index=0, selected_answers=[])
-    logger.info(f"Пользователь {callback.from_user.id} начал викторину")
-    await ask_question(callback.message, 0, state)
-    await callback.answer()
+    await state.set_state(QuizSession.question_index)
+    await state.set_data(session.new_session(snapshot.version, snapshot.bank))
+    logger.info("Пользователь %s начал викторину (контент %s)", callback.from_user.id, snapshot.version)
+    await ask_question(callback.message, 0, state, snapshot)
 
 
-async def ask_question(message: Message, index: int, state: FSMContext):
+async def edit_question(message: Message, text: str, keyboard) -> bool:
+    """
+    Заменяет текст и клавиатуру сообщения с предыдущим вопросом.
+    Возвращает False, если править нельзя (сообщение слишком старое, удалено
+    или это фото) — тогда вопрос нужно отправить новым сообщением.
     """
-    Отправляет пользователю очередной вопрос по индексу.
-    Если вопросы закончились — переходим к результатам.
+    try:
+        await message.edit_text(text, reply_markup=keyboard)
+        return True
+    except TelegramBadRequest as e:
+        if "message is not modified" in e.message:
+            # Повторное нажатие: в сообщении уже этот вопрос
+            return True
+        edit_fallbacks.inc()
+        logger.info("Не удалось изменить сообщение %s, отправляем вопрос заново: %s", message.message_id, e.message)
+    # У старого сообщения не должно остаться рабочих кнопок
+    with suppress(TelegramBadRequest):
+        await message.edit_reply_markup(reply_markup=None)
+    return False
+
+
+async def ask_question(
+    message: Message,
+    index: int,
+    state: FSMContext,
+    snapshot: ContentSnapshot,
+    edit: bool = False,
+    user: Optional[User] = None
+):
     """
-    if index >= TOTAL_QUESTIONS:
-        logger.info(f"Все вопросы пройдены для пользователя {message.from_user.id}")
+    Отправляет пользователю очередной вопрос по индексу из снимка контента сессии.
+    При edit=True вопрос заменяет собой сообщение `message` с предыдущим вопросом.
+    Если вопросы закончились — переходим к результатам для пользователя `user`
+    (автор сообщения с вопросом — сам бот).
+    """
+    if index >= snapshot.total_questions:
+        user = user or message.from_user
+        logger.info("Все вопросы пройдены для пользователя %s", user.id)
         from src.bot.handlers.result import show_result
-        await show_result(message, state)
+        await show_result(message, state, user)
         return
 
-    question = QUESTIONS[index]
-    keyboard = get_question_keyboard(index, question["answers"])
-
-    await message.answer(
-        f"❓ Вопрос {index + 1}/{TOTAL_QUESTIONS}:\n"
-        f"{question['question']}",
-        reply_markup=keyboard
+    question = snapshot.questions[index]
+    keyboard = get_question_keyboard(index, question["answers"], snapshot.version_byte)
+    text = (
+        f"❓ Вопрос {index + 1}/{snapshot.total_questions}:\n"
+        f"{question['question']}"
     )
-    await state.set_state(QuizSession.question_index)
+
+    if edit and await edit_question(message, text, keyboard):
+        return
+    await message.answer(text, reply_markup=keyboard)
 
 
-@router.callback_query(F.data.startswith("answer_"))
-async def process_answer(callback: CallbackQuery, state: FSMContext):
+@callback_handler(CallbackType.ANSWER)
+async def process_answer(callback: CallbackQuery, payload: CallbackPayload, state: FSMContext):
     """
     Обрабатывает выбор ответа пользователем.
-    Сохраняет выбранные веса и переходит к следующему вопросу.
+    Сохраняет номер ответа в компактном виде, обновляет очки и переходит к следующему вопросу.
     """
     data = await state.get_data()
-    current_index = data.get("current_index", 0)
-    selected_answers = data.get("selected_answers", [])
+    snapshot = get_content_store().get(data.get(session.VERSION_FIELD))
 
-    # Извлекаем индексы вопроса и ответа из callback_data
-    _, q_idx_str, a_idx_str = callback.data.split("_")
-    q_idx, a_idx = int(q_idx_str), int(a_idx_str)
-
-    # Получаем веса выбранного ответа
-    answer_weights = QUESTIONS[q_idx]["answers"][a_idx]["weights"]
-    selected_answers.append(answer_weights)
+    # Сессия потеряна, устарела или начата с версией контента, которой уже нет
+    if snapshot is None or not session.is_current(data, snapshot.version):
+        logger.info("Пользователь %s ответил в устаревшей сессии", callback.from_user.id)
+        await ack_callback(callback)
+        await callback.message.answer("⌛ Эта викторина устарела. Нажми /start, чтобы пройти её заново.")
+        return
 
-    await state.update_data(current_index=current_index + 1, selected_answers=selected_answers)
+    current_index = data[session.INDEX_FIELD]
+    q_idx, a_idx = payload.args
 
-    # Убираем клавиатуру у текущего сообщения
-    await callback.message.edit_reply_markup(reply_markup=None)
-    logger.debug(f"Пользователь {callback.from_user.id} выбрал ответ {a_idx} на вопрос {q_idx}")
+    # Кнопка из другой версии контента или с номерами вне банка вопросов
+    if payload.version != snapshot.version_byte:
+        await reject_callback(callback, "кнопка из другой версии контента")
+        return
+    if q_idx >= snapshot.bank.question_count or a_idx >= snapshot.bank.radices[q_idx]:
+        await reject_callback(callback, f"нет вопроса {q_idx} или ответа {a_idx}")
+        return
+    # Ответ не на текущий вопрос: повторное нажатие или кнопка из уже пройденного вопроса.
+    # Без этой проверки очки за ответ начислились бы дважды
+    if q_idx != current_index:
+        suppressed.inc()
+        logger.info(
+            "Пользователь %s: ответ на вопрос %s пропущен, текущий вопрос %s",
+            callback.from_user.id, q_idx, current_index
+        )
+        await ack_callback(callback)
+        return
 
-    # Переходим к следующему вопросу
-    await ask_question(callback.message, current_index + 1, state)
-    await callback.answer()
\ No newline at end of file
+    # Данные кнопки проверены — сразу отвечаем на нажатие, не дожидаясь следующего вопроса или результата
+    await ack_callback(callback)
+
+    # Одна запись в хранилище на ответ (в Redis — один конвейер MULTI/EXEC)
+    update = session.record_answer(data, snapshot.bank, q_idx, a_idx)
+    await state.update_data(update)
+
+    logger.debug("Пользователь %s выбрал ответ %s на вопрос %s", callback.from_user.id, a_idx, q_idx)
+
+    in_place = get_settings().quiz_edit_in_place
+    next_index = current_index + 1
+    if (
+        get_settings().early_finish
+        and next_index < snapshot.total_questions
+        and snapshot.bank.is_decided(update[session.SCORES_FIELD], next_index)
+    ):
+        # Лидера уже никто не догонит — оставшиеся вопросы не изменят результат
+        skipped = snapshot.total_questions - next_index
+        early_finishes.inc()
+        questions_skipped.inc(skipped)
+        calls = API_CALLS_PER_QUESTION_IN_PLACE if in_place else API_CALLS_PER_QUESTION
+        logger.info(
+            "Пользователь %s: тотем определён после %s вопросов, "
+            "сэкономлено %s сообщений, %s вызовов API и %s записей в хранилище",
+            callback.from_user.id, next_index, skipped, skipped * calls, skipped
+        )
+        next_index = snapshot.total_questions
+
+    # Следующий вопрос заменяет текущий в том же сообщении. Иначе (или перед результатом)
+    # просто убираем клавиатуру у текущего сообщения. Ответ уже сохранён, поэтому
+    # неудача здесь (сообщение старое или удалено) не должна помешать перейти дальше
+    in_place = in_place and next_index < snapshot.total_questions
+    if not in_place:
+        with suppress(TelegramBadRequest):
+            await callback.message.edit_reply_markup(reply_markup=None)
+
+    # Переходим к следующему вопросу (или к результату)
+    await ask_question(callback.message, next_index, state, snapshot, edit=in_place, user=callback.from_user)
\ No newline at end of file
@@ -1,15 +1,24 @@
 import os
+import asyncio
 import logging
-from typing import Optional, Dict, Any
+import time
+from typing import Optional, Dict, Any, Mapping, Sequence
 from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton, User
 from aiogram.fsm.context import FSMContext
-
-from src.bot.core.config import GUARDIAN_LINK
-from src.bot.services.media import generate_result_image
-from src.bot.services.scoring import calculate_scores, determine_top_animal
+from aiogram.utils.chat_action import ChatActionSender
+
+from src.bot.core.config import get_settings
+from src.bot.core.metrics import metrics
+from src.bot.services.render_executor import get_render_executor, RenderQueueFull
+from src.bot.services.file_cache import answer_photo_cached
+from src.bot.services.render_cache import get_render_cache, make_cache_key, normalize_user_name
+from src.bot.services.render_assets import asset_version
 from src.bot.keyboards.buttons import get_result_keyboard
-from src.bot.services.data_loader import load_animals
+from src.bot.services.content import get_content_store, ContentSnapshot
+from src.bot.services import session
+from src.bot.services.idempotency import SingleFlight
+from src.bot.services.events import get_event_store
 
 
 def get_user_display_name(user: User) -> str:
@@ -27,54 +36,203 @@ def get_user_display_name(user: User) -> str:
 router = Router()
 logger = logging.getLogger("zoo_bot.handlers.result")
 
-# Загружаем информацию о животных
-ANIMALS_DATA = load_animals()
+# Отправка результата идёт фоновой задачей — по одной на пользователя
+_deliveries: Dict[int, asyncio.Task] = {}
+# Одновременные отрисовки одной и той же пары (животное, имя) выполняются один раз
+_renders = SingleFlight()
+# Место в очереди пула у общей отрисовки по ключу кэша (None — рисуется без очереди):
+# о нём сообщается каждому, кто ждёт эту отрисовку
+_queue_positions: Dict[str, asyncio.Future] = {}
+
+delivery_time = metrics.histogram("result.delivery_ms", "от последнего ответа до отправленного результата, мс")
+deliveries_cancelled = metrics.counter("result.deliveries_cancelled", "результаты, отменённые новой викториной")
+metrics.gauge("result.deliveries_in_flight", lambda: len(_deliveries), "результаты, которые рисуются или отправляются")
 
-async def show_result(message: Message, state: FSMContext):
+
+async def render_result_image(
+    message: Message, animal_key: str, animal_info: Mapping[str, Any], user: Optional[User] = None
+) -> Optional[bytes]:
+    """
+    Генерирует изображение с результатом в пуле отрисовки, не блокируя бота.
+    Возвращает байты изображения, которые отправляются в Telegram без записи на диск.
+    Готовые изображения берутся из кэша, если такую пару (животное, имя) уже рисовали.
+    Если все воркеры заняты — сообщает пользователю его место в очереди.
+    При переполнении очереди, таймауте или ошибке возвращает None,
+    и результат отправляется без картинки.
+    Имя на картинке берётся у `user` (по умолчанию — у автора сообщения).
+    """
+    render_executor = get_render_executor()
+    render_cache = get_render_cache()
+    user_name = normalize_user_name(get_user_display_name(user or message.from_user))
+    cache_key = make_cache_key(animal_key, user_name, asset_version(animal_info["image"], render_executor.profile))
+
+    image = await render_cache.get(cache_key)
+    if image is not None:
+        return image
+
+    # Общая отрисовка только отмечает своё место в очереди, а сообщает о нём каждый ждущий сам
+    queued = _queue_positions.setdefault(cache_key, asyncio.get_running_loop().create_future())
+
+    async def mark_queued(position: int):
+        if not queued.done():
+            queued.set_result(position)
+
+    async def render() -> bytes:
+        try:
+            rendered = await render_executor.render(
+                animal_image=animal_info["image"],
+                animal_name=animal_info["name"],
+                user_name=user_name,
+                on_queued=mark_queued
+            )
+            await render_cache.put(cache_key, rendered)
+            return rendered
+        finally:
+            if _queue_positions.get(cache_key) is queued:
+                del _queue_positions[cache_key]
+            if not queued.done():
+                queued.set_result(None)
+
+    async def notify_queued():
+        position = await queued
+        if position:
+            try:
+                await message.answer(
+                    f"🎨 Рисуем твой результат… Ты {position}-й в очереди, это займёт несколько секунд."
+                )
+            except Exception as e:
+                logger.warning("Не удалось уведомить пользователя о позиции в очереди: %s", e)
+
+    notifier = asyncio.create_task(notify_queued())
+    try:
+        image = await _renders.run(cache_key, render)
+    except RenderQueueFull as e:
+        logger.warning("Очередь отрисовки переполнена, отправляем результат без картинки: %s", e)
+        return None
+    except Exception as e:
+        logger.exception("Ошибка при генерации изображения для %s: %s", animal_info["name"], e)
+        return None
+    finally:
+        # Уведомление о месте в очереди уже не нужно, если результат готов
+        notifier.cancel()
+
+    return image
+
+
+async def show_result(message: Message, state: FSMContext, user: Optional[User] = None):
     """
     Отображает результат викторины:
     1) Получает собранные ответы из состояния,
     2) Рассчитывает тотемное животное,
-    3) Генерирует изображение с результатом,
-    4) Отправляет пользователю сообщение и картинку,
-    5) Сбрасывает состояние.
+    3) Сбрасывает состояние,
+    4) Запускает в фоне отрисовку и отправку результата (deliver_result).
+    Обработчик нажатия не ждёт отрисовки и загрузки фото.
+    `user` — тот, кто проходил викторину: у сообщения с вопросом автор — сам бот.
     """
+    user = user or message.from_user
     data = await state.get_data()
-    answers = data.get("selected_answers", [])
-
-    # 1) Подсчёт очков за ответы
-    scores = calculate_scores(answers)
-    top_animal = determine_top_animal(scores)
+    scores = data.get(session.SCORES_FIELD, [])
+
+    # Результат считается по той версии контента, с которой начата викторина
+    snapshot = get_content_store().get(data.get(session.VERSION_FIELD))
+
+    # 1) Для полного прохождения результат берётся из таблицы исходов по номеру пути,
+    # иначе — максимум очков, посчитанных по ходу викторины
+    top_animal = None
+    if snapshot is not None:
+        bank = snapshot.bank
+        if snapshot.outcomes is not None and data.get(session.INDEX_FIELD) == bank.question_count:
+            animal_key = snapshot.outcomes.lookup(bank, data.get(session.PACKED_FIELD, -1))
+            if animal_key is not None:
+                top_animal = animal_key, max(scores, default=0)
+        if top_animal is None:
+            answers = session.unpack_answers(data, bank.radices)
+            top_animal = bank.winner(scores, answers)
+
+    # 2) Сессия больше не нужна: результат уже определён
+    await state.clear()
 
     if not top_animal:
-        logger.warning(f"Нет данных для определения тотемного животного у пользователя {message.from_user.id}")
+        logger.warning("Нет данных для определения тотемного животного у пользователя %s", user.id)
         await message.answer("⚠️ Не удалось определить ваше тотемное животное. Попробуйте ещё раз.")
-        await state.clear()
         return
 
     animal_key, score = top_animal
-    animal_info = ANIMALS_DATA.get(animal_key)
-
-    if not animal_info:
-        logger.error(f"Животное '{animal_key}' не найдено в базе данных")
+    if animal_key not in snapshot.animals:
+        logger.error("Животное '%s' не найдено в базе данных", animal_key)
         await message.answer("⚠️ Произошла ошибка при определении тотема.")
-        await state.clear()
         return
 
-    logger.info(f"Пользователь {message.from_user.id} — тотем: {animal_info['name']} ({score} баллов)")
+    logger.info("Пользователь %s — тотем: %s (%s баллов)", user.id, snapshot.animals[animal_key]["name"], score)
+
+    # 3) Картинка рисуется и отправляется в фоне
+    answers = session.unpack_answers(data, snapshot.bank.radices)
+    start_result_delivery(message, user, snapshot, animal_key, score, answers)
+
+
+def start_result_delivery(
+    message: Message,
+    user: User,
+    snapshot: ContentSnapshot,
+    animal_key: str,
+    score: int = 0,
+    answers: Sequence[int] = ()
+) -> asyncio.Task:
+    """Запускает фоновую отправку результата; предыдущая отправка этому пользователю отменяется."""
+    cancel_result_delivery(user.id)
+    task = asyncio.create_task(
+        deliver_result(message, user, snapshot, animal_key, time.perf_counter(), score, answers),
+        name=f"result-{user.id}"
+    )
+    _deliveries[user.id] = task
+
+    def forget(finished: asyncio.Task):
+        if _deliveries.get(user.id) is finished:
+            del _deliveries[user.id]
+
+    task.add_done_callback(forget)
+    return task
 
-    # 2) Генерация изображения
-    image_path = None
-    try:
-        image_path = await generate_result_image(
-            animal_image=animal_info["image"],
-            animal_name=animal_info["name"],
-            user_name=get_user_display_name(message.from_user)
-        )
-    except Exception as e:
-        logger.exception(f"Ошибка при генерации изображения для {animal_key}: {e}")
 
-    # 3) Формирование текста результата
+def cancel_result_delivery(user_id: int) -> bool:
+    """Отменяет ещё не отправленный результат (например, пользователь начал викторину заново)."""
+    task = _deliveries.pop(user_id, None)
+    if task is None or task.done():
+        return False
+    task.cancel()
+    deliveries_cancelled.inc()
+    logger.info("Пользователь %s начал викторину заново — отправка прошлого результата отменена", user_id)
+    return True
+
+
+async def wait_result_deliveries(timeout: float):
+    """При остановке бота даёт уже начатым отправкам результата завершиться."""
+    pending = [task for task in _deliveries.values() if not task.done()]
+    if not pending:
+        return
+    logger.info("Ждём отправки %s результатов перед остановкой", len(pending))
+    _, still_pending = await asyncio.wait(pending, timeout=timeout)
+    for task in still_pending:
+        task.cancel()
+
+
+async def deliver_result(
+    message: Message,
+    user: User,
+    snapshot: ContentSnapshot,
+    animal_key: str,
+    started: float,
+    score: int = 0,
+    answers: Sequence[int] = ()
+):
+    """
+    Фоновая задача: рисует изображение с результатом и отправляет его.
+    Пока идёт отрисовка и загрузка, пользователь видит статус «отправляет фото».
+    Завершённая викторина записывается в базу событий.
+    """
+    animal_info = snapshot.animals[animal_key]
+
+    # Формирование текста результата
     caption = (
         f"_{animal_info['description']}_\n\n"
 
@@ -92,26 +250,38 @@ async def show_result(message: Message, state: FSMContext):
         "🫶 Это шанс быть частью чего-то большего.\n"
         "Помогать ежедневно, даже без больших затрат.\n\n"
 
-        f"[💚 Подробнее о программе опеки]({GUARDIAN_LINK})"
+        f"[💚 Подробнее о программе опеки]({get_settings().guardian_link})"
     )
 
-    # 4) Создание клавиатуры
-    keyboard = get_result_keyboard(animal_key)
+    # Создание клавиатуры
+    keyboard = get_result_keyboard(snapshot.animal_ids[animal_key])
 
-    # 5) Отправка результата (картинка или текст)
     try:
-        if image_path:
-            from aiogram.types import FSInputFile
-            photo = FSInputFile(image_path)
-            await message.answer_photo(photo=photo, caption=caption, reply_markup=keyboard, parse_mode="Markdown")
-        else:
-            await message.answer(text=caption, reply_markup=keyboard, parse_mode="Markdown")
+        async with ChatActionSender.upload_photo(chat_id=message.chat.id, bot=message.bot):
+            # Генерация изображения
+            image = await render_result_image(message, animal_key, animal_info, user)
+
+            # Отправка результата (картинка или текст)
+            if image:
+                await answer_photo_cached(
+                    message, image, filename=f"{animal_key}.{get_render_executor().profile.extension}",
+                    caption=caption, reply_markup=keyboard, parse_mode="Markdown"
+                )
+            else:
+                await message.answer(text=caption, reply_markup=keyboard, parse_mode="Markdown")
+        latency_ms = (time.perf_counter() - started) * 1000
+        delivery_time.observe(latency_ms)
+    except asyncio.CancelledError:
+        raise
     except Exception as e:
-        logger.exception(f"Ошибка при отправке результата пользователю {message.from_user.id}: {e}")
-        await message.answer("⚠️ Не удалось отправить результат. Попробуйте позже.")
+        logger.exception("Ошибка при отправке результата пользователю %s: %s", user.id, e)
+        try:
+            await message.answer("⚠️ Не удалось отправить результат. Попробуйте позже.")
+        except Exception as notify_error:
+            logger.warning("Не удалось сообщить пользователю %s об ошибке: %s", user.id, notify_error)
+        latency_ms = None
 
-    # 6) Сброс состояния
-    await state.clear()
+    get_event_store().record_quiz_result(user.id, animal_key, score, answers, latency_ms, snapshot.version)
 
 
 # тестовая функция для вывода результата без прохождения викторины
@@ -120,25 +290,18 @@ async def show_result_with_animal(message: Message, state: FSMContext, animal_ke
     Показывает результат викторины для заданного animal_key.
     Используется для тестирования (/test_result).
     """
-    animal = ANIMALS_DATA.get(animal_key)
+    snapshot = get_content_store().current
+    animal = snapshot.animals.get(animal_key)
 
     if not animal:
-        logger.error(f"Totem key '{animal_key}' отсутствует в animals.json")
+        logger.error("Totem key '%s' отсутствует в animals.json", animal_key)
         await message.answer("⚠️ Не удалось определить тотемное животное.")
         return
 
-    logger.info(f"Тестовый режим: пользователь {message.from_user.id} получил животное '{animal['name']}'")
+    logger.info("Тестовый режим: пользователь %s получил животное '%s'", message.from_user.id, animal["name"])
 
     # Генерация картинки
-    try:
-        image_path = await generate_result_image(
-            animal_image=animal["image"],
-            animal_name=animal["name"],
-            user_name=get_user_display_name(message.from_user)
-        )
-    except Exception as e:
-        logger.exception(f"Ошибка генерации изображения для тестового результата: {e}")
-        image_path = None
+    image = await render_result_image(message, animal_key, animal)
 
     # Формирование текста
     # caption = (
@@ -163,22 +326,18 @@ async def show_result_with_animal(message: Message, state: FSMContext, animal_ke
         "🫶 Это шанс быть частью чего-то большего.\n"
         "Помогать ежедневно, даже без больших затрат.\n\n"
 
-        f"[💚 Подробнее о программе опеки]({GUARDIAN_LINK})"
+        f"[💚 Подробнее о программе опеки]({get_settings().guardian_link})"
     )
 
     # Кнопки
-    kb = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="🔁 Пройти снова", callback_data="start_quiz")],
-        [InlineKeyboardButton(text="📢 Поделиться", callback_data=f"share_{animal_key}")],
-        [InlineKeyboardButton(text="💬 Отзыв", callback_data="feedback")],
-        [InlineKeyboardButton(text="📞 Связаться", callback_data=f"contact_{animal_key}")]
-    ])
+    kb = get_result_keyboard(snapshot.animal_ids[animal_key])
 
     # Отправка результата
-    if image_path:
-        from aiogram.types import FSInputFile
-        photo = FSInputFile(image_path)
-        await message.answer_photo(photo=photo, caption=caption, parse_mode="Markdown", reply_markup=kb)
+    if image:
+        await answer_photo_cached(
+            message, image, filename=f"{animal_key}.{get_render_executor().profile.extension}",
+            caption=caption, parse_mode="Markdown", reply_markup=kb
+        )
     else:
         await message.answer(caption, parse_mode="Markdown", reply_markup=kb)
 
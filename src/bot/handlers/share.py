@@ -1,27 +1,39 @@
 import logging
-from aiogram import Router, F, types
+from aiogram import types
+from aiogram.fsm.context import FSMContext
+
+from src.bot.keyboards.callback_codec import CallbackPayload, CallbackType
+from src.bot.handlers.callbacks import ack_callback, callback_handler, reject_callback
+from src.bot.services.content import get_content_store
+from src.bot.services.outbound import Priority, outbound_priority
 
-router = Router()
 logger = logging.getLogger("zoo_bot.handlers.sharing")
 
-@router.callback_query(F.data.startswith("share_"))
-async def handle_share_request(callback: types.CallbackQuery):
+@callback_handler(CallbackType.SHARE)
+async def handle_share_request(callback: types.CallbackQuery, payload: CallbackPayload, state: FSMContext):
     """
     Обрабатывает нажатие кнопки «📢 Поделиться».
     Отправляет пользователю текстовое сообщение,
     которое он может легко переслать или опубликовать.
     """
     user = callback.from_user
-    totem_key = callback.data.replace("share_", "").strip()
+    (animal_id,) = payload.args
+    # Кнопки с версией контента — прежнего формата, где номер зависел от порядка животных
+    found = get_content_store().find_animal(animal_id) if payload.version == 0 else None
+    if found is None:
+        await reject_callback(callback, f"нет животного с номером {animal_id} (версия кнопки {payload.version})")
+        return
+    snapshot, totem_key = found
+    await ack_callback(callback)
 
-    logger.info(f"Пользователь {user.id} выбрал поделиться результатом: {totem_key}")
+    logger.info("Пользователь %s выбрал поделиться результатом: %s", user.id, totem_key)
 
     # Получаем username бота для формирования ссылки
     try:
         bot_info = await callback.bot.get_me()
         bot_username = bot_info.username.replace("_", r"\_")
     except Exception as e:
-        logger.warning(f"Не удалось получить имя бота: {e}")
+        logger.warning("Не удалось получить имя бота: %s", e)
         bot_username = "MZoo_Bot"
 
 
@@ -35,10 +47,10 @@ async def handle_share_request(callback: types.CallbackQuery):
         f"https://t.me/{bot_username}"
     )
 
-    # Вариант: отправляем сообщение, которое можно переслать
-    await callback.message.answer(
-        f"{message_text}\n",
-        parse_mode="Markdown"
-    )
-
-    await callback.answer()
+    # Вариант: отправляем сообщение, которое можно переслать.
+    # Подсказка второстепенна — при очереди пропускаем вперёд вопросы и результаты
+    with outbound_priority(Priority.LOW):
+        await callback.message.answer(
+            f"{message_text}\n",
+            parse_mode="Markdown"
+        )
@@ -3,7 +3,9 @@ import logging
 from aiogram import Router, types
 from aiogram.filters import CommandStart
 from aiogram.utils.keyboard import InlineKeyboardBuilder
-from aiogram.types import FSInputFile
+
+from src.bot.services.file_cache import answer_photo_cached
+from src.bot.keyboards.buttons import get_start_keyboard
 
 router = Router()
 logger = logging.getLogger("zoo_bot.handlers.start")
@@ -15,7 +17,7 @@ async def cmd_start(message: types.Message):
     и приглашает пользователя пройти викторину.
     """
     user = message.from_user
-    logger.info(f"Пользователь {user.id} начал взаимодействие")
+    logger.info("Пользователь %s начал взаимодействие", user.id)
 
     # Путь к логотипу
     logo_path = "media/logo/mzoo_logo_post.png"
@@ -31,22 +33,21 @@ async def cmd_start(message: types.Message):
             "А пока начнём с малого — узнай себя в мире животных 🐾"
         )
     
+    keyboard = get_start_keyboard()
+
     try:
-        photo = FSInputFile(logo_path)
         caption = post_text
 
-        keyboard = types.InlineKeyboardMarkup(inline_keyboard=[
-            [types.InlineKeyboardButton(text="🐾 Начать викторину", callback_data="start_quiz")]
-        ])
-
-        await message.answer_photo(
-            photo=photo,
+        # Логотип загружается в Telegram один раз, дальше отправляется по file_id
+        await answer_photo_cached(
+            message,
+            logo_path,
             caption=caption,
             parse_mode="Markdown",
             reply_markup=keyboard
         )
     except Exception as e:
-        logger.error(f"Не удалось отправить фото: {e}")
+        logger.error("Не удалось отправить фото: %s", e)
         # Если не получилось отправить с фото — просто текст
         fallback_text = post_text
         await message.answer(
@@ -3,7 +3,8 @@ import logging
 from aiogram import Router, types
 from aiogram.fsm.context import FSMContext
 
-from src.bot.handlers.result import ANIMALS_DATA, show_result_with_animal
+from src.bot.handlers.result import show_result_with_animal
+from src.bot.services.content import get_content_store
 
 router = Router()
 logger = logging.getLogger("zoo_bot.handlers.test")
@@ -16,20 +17,22 @@ async def test_result(message: types.Message, state: FSMContext):
       /test_result         -> случайное животное
       /test_result ёж     -> показать ёжа
     """
-    logger.info(f"Пользователь {message.from_user.id} вызвал /test_result")
+    logger.info("Пользователь %s вызвал /test_result", message.from_user.id)
+
+    animals = get_content_store().current.animals
 
     # Определяем животное
     args = message.text.split()[1:] if len(message.text.split()) > 1 else []
-    animal_key = args[0] if args and args[0] in ANIMALS_DATA else None
+    animal_key = args[0] if args and args[0] in animals else None
 
     if not animal_key:
-        animal_key = random.choice(list(ANIMALS_DATA.keys()))
-        logger.debug(f"Выбрано случайное животное: {animal_key}")
+        animal_key = random.choice(list(animals.keys()))
+        logger.debug("Выбрано случайное животное: %s", animal_key)
 
-    if animal_key not in ANIMALS_DATA:
+    if animal_key not in animals:
         await message.answer(
             f"⚠️ Животное '{animal_key}' не найдено. Попробуйте:\n"
-            f"{', '.join(ANIMALS_DATA.keys())}"
+            f"{', '.join(animals.keys())}"
         )
         return
 
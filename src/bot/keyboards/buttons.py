@@ -1,24 +1,27 @@
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 
+from src.bot.keyboards.callback_codec import CallbackType, encode
+
 def get_start_keyboard():
     return InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="🐾 Начать викторину", callback_data="start_quiz")]
+        [InlineKeyboardButton(text="🐾 Начать викторину", callback_data=encode(CallbackType.START_QUIZ))]
     ])
 
-def get_question_keyboard(question_index: int, answers: list):
+def get_question_keyboard(question_index: int, answers: list, version: int):
     buttons = [
         [InlineKeyboardButton(
             text=ans["text"],
-            callback_data=f"answer_{question_index}_{i}"
+            callback_data=encode(CallbackType.ANSWER, version, question_index, i)
         )]
         for i, ans in enumerate(answers)
     ]
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
-def get_result_keyboard(animal_key: str):
+def get_result_keyboard(animal_id: int):
+    # Животное указано постоянным номером, поэтому кнопки не зависят от версии контента
     return InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="🔁 Пройти снова", callback_data="start_quiz")],
-        [InlineKeyboardButton(text="📢 Поделиться", callback_data=f"share_{animal_key}")],
-        [InlineKeyboardButton(text="💬 Отзыв", callback_data="feedback")],
-        [InlineKeyboardButton(text="📞 Связаться", callback_data=f"contact_{animal_key}")]
-    ])
\ No newline at end of file
+        [InlineKeyboardButton(text="🔁 Пройти снова", callback_data=encode(CallbackType.START_QUIZ))],
+        [InlineKeyboardButton(text="📢 Поделиться", callback_data=encode(CallbackType.SHARE, 0, animal_id))],
+        [InlineKeyboardButton(text="💬 Отзыв", callback_data=encode(CallbackType.FEEDBACK))],
+        [InlineKeyboardButton(text="📞 Связаться", callback_data=encode(CallbackType.CONTACT, 0, animal_id))]
+    ])
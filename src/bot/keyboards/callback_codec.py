@@ -0,0 +1,96 @@
+import base64
+import binascii
+import zlib
+from enum import IntEnum
+from typing import NamedTuple, Optional, Tuple
+
+# Формат callback_data кнопок (до кодирования в base64url без выравнивания):
+#   1 байт  — тип кнопки (CallbackType),
+#   1 байт  — версия контента, для которой создана кнопка (0 — кнопка не зависит от контента),
+#   N байт  — целочисленные аргументы: номера вопроса и ответа или постоянный номер животного,
+#   2 байта — контрольная сумма (младшие байты CRC32 всего предыдущего).
+# Кнопка ответа занимает 6 байт — 8 символов вместо «answer_9_2» и длинных ключей животных.
+CHECKSUM_SIZE = 2
+HEADER_SIZE = 2
+# Неизвестная или «битая» кнопка длиннее этого не бывает: лишнее отбрасывается без декодирования
+MAX_ENCODED_LENGTH = 24
+
+
+class CallbackType(IntEnum):
+    START_QUIZ = 1
+    ANSWER = 2
+    SHARE = 3
+    CONTACT = 4
+    FEEDBACK = 5
+
+
+# Сколько аргументов у каждого типа кнопки
+ARITY = {
+    CallbackType.START_QUIZ: 0,
+    CallbackType.ANSWER: 2,      # номер вопроса, номер ответа
+    CallbackType.SHARE: 1,       # постоянный номер животного (ContentSnapshot.animal_ids)
+    CallbackType.CONTACT: 1,     # постоянный номер животного
+    CallbackType.FEEDBACK: 0,
+}
+
+# Кнопки из сообщений, отправленных до перехода на упакованный формат.
+# Принимаются только те, что не зависят от контента
+LEGACY_PAYLOADS = {
+    "start_quiz": CallbackType.START_QUIZ,
+    "feedback": CallbackType.FEEDBACK,
+}
+
+
+class CallbackPayload(NamedTuple):
+    type: CallbackType
+    version: int
+    args: Tuple[int, ...]
+
+
+def _checksum(data: bytes) -> bytes:
+    return (zlib.crc32(data) & 0xFFFF).to_bytes(CHECKSUM_SIZE, "big")
+
+
+def encode(callback_type: CallbackType, version: int = 0, *args: int) -> str:
+    """Упаковывает кнопку в строку для callback_data."""
+    if len(args) != ARITY[callback_type]:
+        raise ValueError(f"Кнопке {callback_type.name} нужно аргументов: {ARITY[callback_type]}, передано {len(args)}")
+    body = bytes([callback_type, version, *args])
+    return base64.urlsafe_b64encode(body + _checksum(body)).rstrip(b"=").decode("ascii")
+
+
+def decode(data: Optional[str]) -> Optional[CallbackPayload]:
+    """
+    Распаковывает callback_data. Для повреждённых, чужих и неизвестных данных
+    возвращает None, не выбрасывая исключений.
+    """
+    if not data or len(data) > MAX_ENCODED_LENGTH:
+        return None
+
+    legacy = LEGACY_PAYLOADS.get(data)
+    if legacy is not None:
+        return CallbackPayload(legacy, 0, ())
+
+    try:
+        raw = base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+    except (binascii.Error, ValueError):
+        return None
+    if len(raw) < HEADER_SIZE + CHECKSUM_SIZE:
+        return None
+
+    body, checksum = raw[:-CHECKSUM_SIZE], raw[-CHECKSUM_SIZE:]
+    if _checksum(body) != checksum:
+        return None
+    try:
+        callback_type = CallbackType(body[0])
+    except ValueError:
+        return None
+    args = tuple(body[HEADER_SIZE:])
+    if len(args) != ARITY[callback_type]:
+        return None
+    return CallbackPayload(callback_type, body[1], args)
+
+
+def content_version_byte(version: str) -> int:
+    """Байт версии контента для кнопок: первые два шестнадцатеричных знака версии снимка."""
+    return int(version[:2], 16)
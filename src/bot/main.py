@@ -1,50 +1,185 @@
-import os
+import time
+
+# Время старта — до импорта остальных модулей, чтобы профиль запуска учитывал и их
+STARTED = time.perf_counter()
+
+import argparse
 import asyncio
-from aiogram import Bot, Dispatcher
-from aiogram.fsm.storage.memory import MemoryStorage
-from dotenv import load_dotenv
+import logging
 
-from src.bot.core.logger import setup_logger
-from src.bot.core.config import BOT_TOKEN
-from src.bot.router import router
+from src.bot.core.config import get_settings
+from src.bot.core.logger import setup_logger, stop_logging
+from src.bot.core.startup import StartupProfiler
 
-# Загружаем переменные окружения из .env
-load_dotenv()
+logger = logging.getLogger("zoo_bot")
 
-# Настраиваем логгер
-logger = setup_logger("zoo_bot")
 
-async def main():
+async def main(check_only: bool = False, profile_startup: bool = False):
     """
     Точка входа в бота:
-    — инициализирует бота,
-    — подключает роутер,
-    — запускает polling.
+    — загружает настройки и инициализирует логгер,
+    — импортирует обработчики и прогревает контент и хранилище,
+    — инициализирует бота и подключает роутер,
+    — получает обновления через polling или вебхук (DELIVERY_MODE).
     """
+    profiler = StartupProfiler(STARTED)
+
+    with profiler.phase("настройки и логгер"):
+        settings = get_settings()
+        setup_logger("zoo_bot")
+
     logger.info("🚀 Бот начинает работу...")
 
+    # Тяжёлые модули импортируются здесь, а не при импорте main
+    with profiler.phase("aiogram"):
+        from aiogram import Bot, Dispatcher
+    with profiler.phase("обработчики"):
+        from src.bot.router import router
+        from src.bot.core.metrics import log_metrics_periodically
+        from src.bot.core.storage import create_storage, sweep_sessions_periodically
+        from src.bot.services.content import get_content_store, watch_content_periodically
+        from src.bot.services.outbound import OutboundScheduler
+        from src.bot.core.webhook import DELIVERY_MODES, run_webhook
+        from src.bot.core.concurrency import ChatOrderingIsolation
+        from src.bot.core.log_context import LogContextMiddleware
+        from src.bot.handlers.result import wait_result_deliveries
+        from src.bot.services.journal import close_journals
+        from src.bot.services.events import get_event_store
+        from src.bot.services.staff_notify import get_staff_notifier
+        from src.bot.services.render_executor import get_render_executor
+        from src.bot.services.file_cache import get_file_id_cache
+
+    # Прогрев: загружаем и проверяем контент викторины до приёма обновлений —
+    # ошибка в вопросах или животных останавливает запуск, а не всплывает у пользователя
+    with profiler.phase("контент"):
+        content_store = get_content_store()
+        content_store.current
+    with profiler.phase("хранилище состояний"):
+        storage = create_storage()
+
+    if settings.delivery_mode not in DELIVERY_MODES:
+        await storage.close()
+        raise ValueError(
+            f"Неизвестный режим DELIVERY_MODE={settings.delivery_mode}. Доступны: {', '.join(DELIVERY_MODES)}"
+        )
+    # Без секретного токена любой, кто знает адрес вебхука, мог бы присылать поддельные обновления
+    if settings.delivery_mode == "webhook" and not settings.webhook_secret:
+        await storage.close()
+        raise ValueError("В режиме DELIVERY_MODE=webhook нужен WEBHOOK_SECRET: без него вебхук принимает чужие запросы")
+
+    if profile_startup or settings.startup_profile:
+        profiler.log(logger)
+
+    if check_only:
+        logger.info("✅ Проверка запуска пройдена, бот не подключается к Telegram")
+        await storage.close()
+        return
+
     # Проверяем наличие токена
-    if not BOT_TOKEN:
+    if not settings.bot_token:
         logger.critical("❌ Не указан BOT_TOKEN. Проверьте файл .env")
+        await storage.close()
         raise ValueError("BOT_TOKEN не найден. Убедитесь, что он указан в .env")
 
     # Инициализируем бота и диспетчер
-    bot = Bot(token=BOT_TOKEN)
-    dp = Dispatcher(storage=MemoryStorage())
+    session = None
+    if settings.bot_api_url:
+        from aiogram.client.session.aiohttp import AiohttpSession
+        from aiogram.client.telegram import TelegramAPIServer
+        logger.info("Bot API: %s", settings.bot_api_url)
+        session = AiohttpSession(api=TelegramAPIServer.from_base(settings.bot_api_url))
+    bot = Bot(token=settings.bot_token, session=session)
+    # Обновления разных чатов обрабатываются параллельно, одного чата — по очереди;
+    # состояние FSM читается уже после того, как дошла очередь обновления
+    dp = Dispatcher(storage=storage, events_isolation=ChatOrderingIsolation(limit=settings.update_concurrency))
+
+    # Все отправки в чаты проходят через планировщик с ограничением скорости и приоритетами
+    outbound = OutboundScheduler(
+        global_rate=settings.outbound_global_rate,
+        chat_rate=settings.outbound_chat_rate,
+        chat_burst=settings.outbound_chat_burst,
+        max_retries=settings.outbound_max_retries
+    )
+    bot.session.middleware(outbound)
+
+    # Записи лога при обработке события несут id пользователя, обновления и имя обработчика
+    log_context = LogContextMiddleware()
+    dp.update.outer_middleware(log_context)
+    dp.message.middleware(log_context)
+    dp.callback_query.middleware(log_context)
 
     # Подключаем главный роутер
     dp.include_router(router)
 
+    render_executor = get_render_executor()
+
+    # Фоновые задачи: метрики в лог, очистка заброшенных сессий, подхват правок контента
+    # и прогрев пула отрисовки (не задерживает приём обновлений)
+    background_tasks = [
+        asyncio.create_task(
+            sweep_sessions_periodically(dp.storage, settings.session_ttl, settings.session_sweep_interval)
+        )
+    ]
+    if settings.metrics_log_interval > 0:
+        background_tasks.append(asyncio.create_task(log_metrics_periodically(settings.metrics_log_interval)))
+    if settings.content_reload_interval > 0:
+        background_tasks.append(
+            asyncio.create_task(watch_content_periodically(
+                content_store,
+                settings.content_reload_interval,
+                # Воркеры отрисовки собирают шаблоны по новому снимку
+                on_change=render_executor.invalidate_templates
+            ))
+        )
+    if settings.render_prewarm:
+        background_tasks.append(asyncio.create_task(render_executor.warm_up()))
+    file_id_cache = get_file_id_cache()
+    background_tasks.append(asyncio.create_task(file_id_cache.run()))
+    staff_notifier = get_staff_notifier()
+    if staff_notifier is not None:
+        background_tasks.append(asyncio.create_task(staff_notifier.run(bot)))
+
     try:
-        logger.info("🤖 Бот запущен и готов к работе!")
-        await dp.start_polling(bot)
+        logger.info("🤖 Бот запущен и готов к работе! Режим: %s", settings.delivery_mode)
+        if settings.delivery_mode == "webhook":
+            await run_webhook(dp, bot, settings)
+        else:
+            # Если раньше был зарегистрирован вебхук, Telegram не отдаст обновления через getUpdates
+            await bot.delete_webhook()
+            await dp.start_polling(bot, handle_as_tasks=True)
     except Exception as e:
-        logger.exception(f"🚨 Произошла ошибка при запуске бота: {e}")
+        logger.exception("🚨 Произошла ошибка при запуске бота: %s", e)
     finally:
         # Корректно закрываем сессию бота
         logger.info("🛑 Бот остановлен.")
+        for task in background_tasks:
+            task.cancel()
+        # Результаты, которые уже рисуются, успевают дойти до пользователей
+        await wait_result_deliveries(timeout=settings.render_timeout)
+        render_executor.shutdown()
+        # Журналы дописывают очередь на диск, прежде чем бот завершится
+        await close_journals()
+        await file_id_cache.close()
+        await get_event_store().close()
+        if staff_notifier is not None:
+            await staff_notifier.close()
+        await outbound.close()
+        await dp.storage.close()
         await bot.session.close()
 
+
 if __name__ == "__main__":
-    # Запуск асинхронного цикла
-    asyncio.run(main())
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Telegram-бот викторины Московского зоопарка")
+    parser.add_argument(
+        "--profile-startup", action="store_true", help="вывести, сколько занял каждый этап запуска"
+    )
+    parser.add_argument(
+        "--check", action="store_true", help="подготовить контент и хранилище и выйти, не подключаясь к Telegram"
+    )
+    args = parser.parse_args()
+
+    # Запуск асинхронного цикла; после остановки дописываем очередь логов
+    try:
+        asyncio.run(main(check_only=args.check, profile_startup=args.profile_startup))
+    finally:
+        stop_logging()
@@ -1,7 +1,7 @@
 from aiogram import Router
 
 from src.bot.handlers import (
-    share,
+    callbacks,
     start,
     quiz,
     result,
@@ -14,11 +14,11 @@ from src.bot.handlers import (
 # Создаём главный роутер
 router = Router()
 
-# Регистрируем все модули-обработчики
+# Регистрируем все модули-обработчики.
+# Нажатия на кнопки принимает один обработчик из callbacks: он направляет их
+# по типу кнопки в функции, зарегистрированные в quiz, feedback, contact и share
 router.include_router(start.router)
-router.include_router(quiz.router)
+router.include_router(callbacks.router)
 router.include_router(result.router)
 router.include_router(feedback.router)
-router.include_router(contact.router)
-router.include_router(share.router)
-router.include_router(test.router)
\ No newline at end of file
+router.include_router(test.router)
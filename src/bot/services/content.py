@@ -0,0 +1,319 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+from src.bot.core.config import get_settings
+from src.bot.core.metrics import metrics
+from src.bot.keyboards.callback_codec import content_version_byte
+from src.bot.services.outcomes import OutcomeTable, load_outcome_table
+from src.bot.services.scoring import CompiledQuestionBank
+
+logger = logging.getLogger("zoo_bot.content")
+
+reloads = metrics.counter("content.reloads", "успешные перезагрузки контента")
+reload_failures = metrics.counter("content.reload_failures", "правки контента, отклонённые проверкой")
+
+# Номер животного в кнопке занимает один байт
+MAX_ANIMAL_IDS = 256
+
+
+class ContentError(ValueError):
+    """Контент не прошёл проверку: бот продолжает работать с предыдущей версией."""
+
+
+def _freeze(value: Any) -> Any:
+    """Делает загруженный JSON неизменяемым: словари — только для чтения, списки — кортежи."""
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+@dataclass(frozen=True)
+class ContentSnapshot:
+    """
+    Неизменяемая версия контента: вопросы, животные и всё, что из них скомпилировано.
+    Сессия викторины хранит версию снимка и проходит до конца на том контенте,
+    с которым начата, даже если файлы за это время поменялись.
+    """
+    version: str
+    questions: Tuple[Mapping[str, Any], ...]
+    animals: Mapping[str, Mapping[str, Any]]
+    bank: CompiledQuestionBank
+    outcomes: Optional[OutcomeTable]
+    # Постоянный номер животного для кнопок (не зависит от порядка в animals.json)
+    animal_ids: Mapping[str, int]
+
+    @property
+    def total_questions(self) -> int:
+        return len(self.questions)
+
+    @property
+    def version_byte(self) -> int:
+        """Сокращённая версия, которая записывается в кнопки."""
+        return content_version_byte(self.version)
+
+
+def validate_content(questions: Any, animals: Any) -> List[str]:
+    """Проверяет вопросы и животных друг относительно друга. Возвращает список ошибок."""
+    errors = []
+
+    if not isinstance(animals, dict) or not animals:
+        return ["animals.json: ожидается непустой объект «ключ -> животное»"]
+    for key, animal in animals.items():
+        if not isinstance(animal, dict):
+            errors.append(f"animals.json, '{key}': ожидается объект")
+            continue
+        for field in ("name", "description", "image"):
+            if not isinstance(animal.get(field), str) or not animal[field].strip():
+                errors.append(f"animals.json, '{key}': нет поля {field}")
+        image = animal.get("image")
+        if isinstance(image, str) and image and not os.path.exists(image):
+            errors.append(f"animals.json, '{key}': не найдено изображение {image}")
+
+    if not isinstance(questions, list) or not questions:
+        return errors + ["questions.json: ожидается непустой список вопросов"]
+    for q_idx, question in enumerate(questions, start=1):
+        if not isinstance(question, dict):
+            errors.append(f"Вопрос {q_idx}: ожидается объект")
+            continue
+        if not isinstance(question.get("question"), str) or not question["question"].strip():
+            errors.append(f"Вопрос {q_idx}: нет текста вопроса")
+        answers = question.get("answers")
+        if not isinstance(answers, list) or not answers:
+            errors.append(f"Вопрос {q_idx}: нет вариантов ответа")
+            continue
+        for a_idx, answer in enumerate(answers, start=1):
+            if not isinstance(answer, dict):
+                errors.append(f"Вопрос {q_idx}, ответ {a_idx}: ожидается объект")
+                continue
+            if not isinstance(answer.get("text"), str) or not answer["text"].strip():
+                errors.append(f"Вопрос {q_idx}, ответ {a_idx}: нет текста ответа")
+            weights = answer.get("weights")
+            if not isinstance(weights, list):
+                errors.append(f"Вопрос {q_idx}, ответ {a_idx}: weights должен быть списком")
+                continue
+            for key in weights:
+                if key not in animals:
+                    errors.append(f"Вопрос {q_idx}, ответ {a_idx}: животного '{key}' нет в animals.json")
+
+    return errors
+
+
+class ContentStore:
+    """
+    Единое хранилище контента викторины.
+
+    Читает questions.json и animals.json, проверяет их друг относительно друга
+    и компилирует в неизменяемый снимок. При изменении файлов новый снимок
+    собирается и подменяет текущий одним присваиванием; если правка содержит
+    ошибку, бот продолжает работать на предыдущей версии.
+    Последние снимки хранятся, чтобы начатые викторины доигрывались на своей версии.
+
+    Кнопки «Поделиться» и «Связаться» ссылаются на животное по постоянному номеру:
+    список ключей в animal_ids_path только дополняется новыми животными, поэтому
+    кнопка указывает на то же животное при любых правках контента.
+    """
+
+    def __init__(
+        self,
+        questions_path: str,
+        animals_path: str,
+        outcomes_path: Optional[str],
+        tie_break: str,
+        keep: int = 5,
+        animal_ids_path: Optional[str] = None
+    ):
+        self.questions_path = questions_path
+        self.animals_path = animals_path
+        self.animal_ids_path = animal_ids_path
+        self.outcomes_path = outcomes_path
+        self.tie_break = tie_break
+        self.keep = max(1, keep)
+        self._snapshots: "OrderedDict[str, ContentSnapshot]" = OrderedDict()
+        self._current: Optional[ContentSnapshot] = None
+        self._stamp: Optional[Tuple] = None
+        self._animal_keys: Optional[List[str]] = None
+
+    def _file_stamp(self) -> Tuple:
+        stamp = []
+        for path in (self.questions_path, self.animals_path, self.outcomes_path):
+            try:
+                stat = os.stat(path) if path else None
+            except FileNotFoundError:
+                stat = None
+            stamp.append((stat.st_mtime_ns, stat.st_size) if stat else None)
+        return tuple(stamp)
+
+    def _read_animal_keys(self) -> List[str]:
+        if not self.animal_ids_path or not os.path.exists(self.animal_ids_path):
+            return []
+        try:
+            with open(self.animal_ids_path, encoding="utf-8") as f:
+                keys = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            raise ContentError(f"Не удалось прочитать номера животных {self.animal_ids_path}: {e}") from e
+        if not isinstance(keys, list) or not all(isinstance(key, str) for key in keys) or len(set(keys)) != len(keys):
+            raise ContentError(f"{self.animal_ids_path}: ожидается список неповторяющихся ключей животных")
+        return keys
+
+    def _assign_animal_ids(self, animals: Mapping[str, Any]) -> Dict[str, int]:
+        """Выдаёт новым животным следующие номера и дописывает их в файл; старые номера не меняются."""
+        if self._animal_keys is None:
+            self._animal_keys = self._read_animal_keys()
+        added = [key for key in animals if key not in self._animal_keys]
+        if len(self._animal_keys) + len(added) > MAX_ANIMAL_IDS:
+            raise ContentError(f"Животных за всё время больше {MAX_ANIMAL_IDS}: номер не помещается в кнопку")
+        if added:
+            keys = self._animal_keys + added
+            if self.animal_ids_path:
+                tmp_path = f"{self.animal_ids_path}.tmp"
+                try:
+                    with open(tmp_path, "w", encoding="utf-8") as f:
+                        json.dump(keys, f, ensure_ascii=False, indent=2)
+                        f.write("\n")
+                    os.replace(tmp_path, self.animal_ids_path)
+                except OSError as e:
+                    # Номера новых животных всё равно идут после записанных, поэтому не расходятся с файлом
+                    logger.warning("Не удалось сохранить номера животных %s: %s", self.animal_ids_path, e)
+            self._animal_keys = keys
+            logger.info("Новые номера животных для кнопок: %s", ", ".join(added))
+        return {key: self._animal_keys.index(key) for key in animals}
+
+    def _build(self) -> ContentSnapshot:
+        with open(self.questions_path, "rb") as f:
+            questions_raw = f.read()
+        with open(self.animals_path, "rb") as f:
+            animals_raw = f.read()
+        try:
+            questions = json.loads(questions_raw)
+            animals = json.loads(animals_raw)
+        except json.JSONDecodeError as e:
+            raise ContentError(f"Некорректный JSON: {e}") from e
+
+        errors = validate_content(questions, animals)
+        if errors:
+            raise ContentError("; ".join(errors))
+
+        bank = CompiledQuestionBank(questions, animals, self.tie_break)
+        unused = [key for key in animals if not any(
+            key in answer["weights"] for question in questions for answer in question["answers"]
+        )]
+        if unused:
+            logger.warning("Животные без единого веса в вопросах (недостижимы): %s", ", ".join(unused))
+
+        version = hashlib.sha1(
+            questions_raw + b"\0" + animals_raw + b"\0" + self.tie_break.encode()
+        ).hexdigest()[:8]
+        return ContentSnapshot(
+            version=version,
+            questions=_freeze(questions),
+            animals=_freeze(animals),
+            bank=bank,
+            outcomes=load_outcome_table(self.outcomes_path, bank),
+            animal_ids=MappingProxyType(self._assign_animal_ids(animals)),
+        )
+
+    def _publish(self, snapshot: ContentSnapshot):
+        self._snapshots.pop(snapshot.version, None)
+        self._snapshots[snapshot.version] = snapshot
+        while len(self._snapshots) > self.keep:
+            self._snapshots.popitem(last=False)
+        self._current = snapshot
+
+    @property
+    def current(self) -> ContentSnapshot:
+        """Актуальный снимок; при первом обращении контент загружается (ошибка — исключение)."""
+        if self._current is None:
+            self._stamp = self._file_stamp()
+            self._publish(self._build())
+            logger.info(
+                "Загружен контент версии %s: %s вопросов, %s животных",
+                self._current.version, self._current.total_questions, len(self._current.animals)
+            )
+        return self._current
+
+    def get(self, version: Optional[str]) -> Optional[ContentSnapshot]:
+        """Снимок по версии из сессии или None, если такой версии уже нет."""
+        current = self.current
+        return current if version == current.version else self._snapshots.get(version)
+
+    def find_animal(self, animal_id: int) -> Optional[Tuple[ContentSnapshot, str]]:
+        """
+        Животное по постоянному номеру из кнопки: (самый свежий снимок, где оно есть, ключ)
+        или None, если номер неизвестен или животного нет ни в одном из хранимых снимков.
+        """
+        current = self.current
+        keys = self._animal_keys or []
+        if not 0 <= animal_id < len(keys):
+            return None
+        key = keys[animal_id]
+        for snapshot in [current, *reversed(list(self._snapshots.values()))]:
+            if key in snapshot.animals:
+                return snapshot, key
+        return None
+
+    def reload_if_changed(self) -> bool:
+        """Пересобирает снимок, если файлы изменились. Возвращает True, если версия сменилась."""
+        stamp = self._file_stamp()
+        if self._current is not None and stamp == self._stamp:
+            return False
+        self._stamp = stamp
+        previous = self._current
+        try:
+            snapshot = self._build()
+        except (ContentError, OSError) as e:
+            reload_failures.inc()
+            logger.error("Правка контента отклонена, остаётся версия %s: %s", previous and previous.version, e)
+            return False
+        self._publish(snapshot)
+        if previous is not None and snapshot.version == previous.version:
+            # Изменилась только таблица исходов или время изменения файлов
+            logger.info("Контент версии %s пересобран без изменений в вопросах и животных", snapshot.version)
+            return False
+        reloads.inc()
+        logger.info(
+            "Контент обновлён: версия %s, %s вопросов, %s животных",
+            snapshot.version, snapshot.total_questions, len(snapshot.animals)
+        )
+        return True
+
+
+async def watch_content_periodically(
+    store: ContentStore, interval: float, on_change: Optional[Callable[[], None]] = None
+):
+    """
+    Фоновая задача: проверяет файлы контента и подхватывает правки без перезапуска.
+    После смены версии вызывает `on_change` (в цикле событий) — например, чтобы пересобрать шаблоны отрисовки.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            # Сборка снимка читает файлы и компилирует банк — не держим на этом цикл событий
+            changed = await asyncio.to_thread(store.reload_if_changed)
+            if changed and on_change is not None:
+                on_change()
+        except Exception as e:
+            logger.exception("Ошибка при проверке контента: %s", e)
+
+
+@lru_cache(maxsize=None)
+def get_content_store() -> ContentStore:
+    """Общее хранилище контента для всех обработчиков: создаётся при первом обращении."""
+    settings = get_settings()
+    return ContentStore(
+        settings.questions_path,
+        settings.animals_path,
+        settings.outcomes_path,
+        settings.tie_break,
+        keep=settings.content_keep_snapshots,
+        animal_ids_path=settings.animal_ids_path
+    )
@@ -0,0 +1,266 @@
+import asyncio
+import logging
+import sqlite3
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from src.bot.core.config import get_settings
+from src.bot.core.metrics import metrics
+
+logger = logging.getLogger("zoo_bot.events")
+
+# Таблицы событий и их столбцы (кроме id). Время ts — unix-время в секундах
+TABLES: Dict[str, Tuple[str, ...]] = {
+    "quiz_results": ("ts", "user_id", "animal", "score", "answers", "latency_ms", "content_version"),
+    "contact_requests": ("ts", "user_id", "full_name", "username", "animal", "content_version"),
+    "feedback": ("ts", "user_id", "username", "text"),
+}
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS quiz_results ("
+    " id INTEGER PRIMARY KEY,"
+    " ts REAL NOT NULL,"
+    " user_id INTEGER NOT NULL,"
+    " animal TEXT NOT NULL,"
+    " score INTEGER,"
+    " answers TEXT,"              # номера выбранных ответов через запятую
+    " latency_ms REAL,"           # от последнего ответа до отправленного результата
+    " content_version TEXT)",
+    "CREATE INDEX IF NOT EXISTS quiz_results_ts ON quiz_results (ts)",
+    "CREATE INDEX IF NOT EXISTS quiz_results_animal_ts ON quiz_results (animal, ts)",
+    "CREATE TABLE IF NOT EXISTS contact_requests ("
+    " id INTEGER PRIMARY KEY,"
+    " ts REAL NOT NULL,"
+    " user_id INTEGER NOT NULL,"
+    " full_name TEXT,"
+    " username TEXT,"
+    " animal TEXT NOT NULL,"
+    " content_version TEXT)",
+    "CREATE INDEX IF NOT EXISTS contact_requests_ts ON contact_requests (ts)",
+    "CREATE INDEX IF NOT EXISTS contact_requests_animal_ts ON contact_requests (animal, ts)",
+    "CREATE TABLE IF NOT EXISTS feedback ("
+    " id INTEGER PRIMARY KEY,"
+    " ts REAL NOT NULL,"
+    " user_id INTEGER NOT NULL,"
+    " username TEXT,"
+    " text TEXT NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS feedback_ts ON feedback (ts)",
+)
+
+# Запросы вставки не меняются — sqlite3 подготавливает каждый один раз и берёт из кэша
+INSERTS = {
+    table: f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+    for table, columns in TABLES.items()
+}
+
+# Сигнал фоновой задаче: дописать очередь и завершиться
+_STOP = None
+
+written = metrics.counter("events.written", "события, записанные в базу")
+transactions = metrics.counter("events.transactions", "транзакции записи событий")
+write_failures = metrics.counter("events.write_failures", "неудачные попытки записать пачку событий")
+dropped = metrics.counter("events.dropped", "события, отброшенные из-за переполненной очереди или ошибок записи")
+
+
+def open_database(path: str, readonly: bool = False) -> sqlite3.Connection:
+    """Открывает базу событий. Для записи включает WAL и создаёт таблицы и индексы."""
+    if readonly:
+        return sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    for statement in SCHEMA:
+        conn.execute(statement)
+    return conn
+
+
+class EventStore:
+    """
+    Хранилище событий бота во встроенной базе SQLite (режим WAL):
+    завершённые викторины, запросы на связь и отзывы.
+
+    Обработчики ставят событие в очередь и не ждут базы. Фоновая задача
+    забирает всё накопившееся (до `batch_size` событий) и записывает пачку
+    одной транзакцией через executemany в единственном служебном потоке.
+    Читать базу можно одновременно с записью: python -m src.bot.tools.events.
+
+    В очереди ждёт не больше `queue_size` событий — лишние отбрасываются.
+    Пачка, которую не удалось записать `max_attempts` раз, записывается
+    по одному событию: события, которые база так и не приняла, пишутся в лог и отбрасываются.
+    """
+
+    def __init__(self, path: str, batch_size: int = 500, queue_size: int = 10000, max_attempts: int = 5):
+        self.path = path
+        self.batch_size = max(1, batch_size)
+        self.queue_size = max(1, queue_size)
+        self.max_attempts = max(1, max_attempts)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="events-sqlite")
+        self._conn: Optional[sqlite3.Connection] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._writer: Optional[asyncio.Task] = None
+        self._closed = False
+        self._overflowing = False
+
+        metrics.gauge("events.queue_depth", lambda: self._queue.qsize() if self._queue else 0, "события в очереди")
+
+    def record(self, table: str, **values: Any):
+        """Ставит событие в очередь. Время ts подставляется автоматически."""
+        if self._closed:
+            logger.warning("Хранилище событий закрыто, событие %s не записано", table)
+            return
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+            self._writer = asyncio.create_task(self._run(), name="events-writer")
+        if self._queue.qsize() >= self.queue_size:
+            dropped.inc()
+            if not self._overflowing:
+                # Предупреждаем один раз на каждое переполнение, остальное видно по events.dropped
+                self._overflowing = True
+                logger.warning("Очередь событий переполнена (%s), новые события отбрасываются", self.queue_size)
+            return
+        self._overflowing = False
+        values.setdefault("ts", time.time())
+        self._queue.put_nowait((table, tuple(values.get(column) for column in TABLES[table])))
+
+    def record_quiz_result(
+        self,
+        user_id: int,
+        animal: str,
+        score: int,
+        answers: Sequence[int],
+        latency_ms: Optional[float],
+        content_version: str
+    ):
+        self.record(
+            "quiz_results",
+            user_id=user_id,
+            animal=animal,
+            score=score,
+            answers=",".join(map(str, answers)),
+            latency_ms=None if latency_ms is None else round(latency_ms, 1),
+            content_version=content_version,
+        )
+
+    def record_contact(
+        self, user_id: int, full_name: str, username: Optional[str], animal: str, content_version: str
+    ):
+        self.record(
+            "contact_requests",
+            user_id=user_id, full_name=full_name, username=username, animal=animal, content_version=content_version,
+        )
+
+    def record_feedback(self, user_id: int, username: Optional[str], text: str):
+        self.record("feedback", user_id=user_id, username=username, text=text)
+
+    # --- Фоновая запись ---
+
+    def _write_batch(self, batch: List[Tuple[str, tuple]]):
+        """Выполняется в служебном потоке: вся пачка — одна транзакция."""
+        if self._conn is None:
+            self._conn = open_database(self.path)
+            logger.info("Хранилище событий SQLite: %s", self.path)
+        rows: Dict[str, List[tuple]] = defaultdict(list)
+        for table, row in batch:
+            rows[table].append(row)
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            for table, table_rows in rows.items():
+                self._conn.executemany(INSERTS[table], table_rows)
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def _write_rows(self, batch: List[Tuple[str, tuple]]) -> List[Tuple[str, tuple, Exception]]:
+        """
+        Выполняется в служебном потоке: записывает пачку по одному событию,
+        чтобы одно «плохое» событие не задерживало остальные. Возвращает отклонённые.
+        """
+        rejected = []
+        for table, row in batch:
+            try:
+                self._write_batch([(table, row)])
+            except sqlite3.Error as e:
+                rejected.append((table, row, e))
+        return rejected
+
+    async def _flush(self, batch: List[Tuple[str, tuple]], attempts: int):
+        """Последняя попытка для пачки: события, которые база не приняла, уходят в лог и отбрасываются."""
+        loop = asyncio.get_running_loop()
+        try:
+            rejected = await loop.run_in_executor(self._executor, self._write_rows, batch)
+        except Exception as e:
+            rejected = [(table, row, e) for table, row in batch]
+        for table, row, error in rejected:
+            logger.error("Событие %s отброшено после %s попыток записи: %s %r", table, attempts, error, row)
+        dropped.inc(len(rejected))
+        written.inc(len(batch) - len(rejected))
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        batch: List[Tuple[str, tuple]] = []
+        attempts = 0
+        stopping = False
+        while not stopping or batch:
+            if not batch and not stopping:
+                item = await self._queue.get()
+                if item is _STOP:
+                    break
+                batch.append(item)
+            while len(batch) < self.batch_size and not self._queue.empty():
+                item = self._queue.get_nowait()
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            try:
+                await loop.run_in_executor(self._executor, self._write_batch, batch)
+            except Exception as e:
+                write_failures.inc()
+                attempts += 1
+                if stopping or attempts >= self.max_attempts:
+                    logger.error(
+                        "Не удалось записать %s событий (попытка %s), записываем по одному: %s", len(batch), attempts, e
+                    )
+                    await self._flush(batch, attempts)
+                    batch = []
+                    attempts = 0
+                    continue
+                logger.error("Не удалось записать %s событий (попытка %s), повторим: %s", len(batch), attempts, e)
+                await asyncio.sleep(1)
+                continue
+            written.inc(len(batch))
+            transactions.inc()
+            batch = []
+            attempts = 0
+
+    async def close(self):
+        """Дописывает очередь в базу и закрывает соединение."""
+        self._closed = True
+        if self._writer is not None:
+            self._queue.put_nowait(_STOP)
+            await self._writer
+            self._writer = None
+
+        def _close():
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+        await asyncio.get_running_loop().run_in_executor(self._executor, _close)
+        self._executor.shutdown(wait=True)
+
+
+@lru_cache(maxsize=None)
+def get_event_store() -> EventStore:
+    """Общее хранилище событий: создаётся при первом обращении, база открывается при первой записи."""
+    settings = get_settings()
+    return EventStore(
+        settings.events_db_path,
+        batch_size=settings.events_batch_size,
+        queue_size=settings.events_queue_size,
+        max_attempts=settings.events_max_attempts
+    )
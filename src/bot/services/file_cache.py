@@ -0,0 +1,180 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from functools import lru_cache
+from typing import Dict, Optional, Tuple, Union
+
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import BufferedInputFile, FSInputFile, Message
+
+from src.bot.core.config import get_settings
+from src.bot.core.metrics import metrics
+
+logger = logging.getLogger("zoo_bot.file_cache")
+
+# Счётчики эффективности кэша
+cache_hits = metrics.counter("file_id_cache.hits", "отправки по сохранённому file_id")
+cache_misses = metrics.counter("file_id_cache.misses", "отправки с загрузкой файла")
+cache_stale = metrics.counter("file_id_cache.stale", "устаревшие file_id, заменённые новой загрузкой")
+bytes_saved = metrics.counter("file_id_cache.bytes_saved", "байт, которые не пришлось загружать")
+bytes_uploaded = metrics.counter("file_id_cache.bytes_uploaded", "байт, загруженных в Telegram")
+
+
+class FileIdCache:
+    """
+    Постоянный кэш «хэш содержимого файла -> file_id Telegram».
+    Хранится в JSON-файле; при переполнении вытесняются самые старые записи.
+
+    Изменения держатся в памяти и помечают кэш как изменённый; файл
+    переписывается в отдельном потоке не чаще раза в `flush_interval` секунд
+    (фоновая задача run) и при остановке (close). Файл читается тоже
+    в отдельном потоке, при первом обращении.
+    """
+
+    def __init__(self, path: str, max_entries: int, flush_interval: float = 5):
+        self.path = path
+        self.max_entries = max_entries
+        self.flush_interval = flush_interval
+        self._entries: Dict[str, str] = {}
+        self._loaded = False
+        self._load_lock = asyncio.Lock()
+        self._dirty = False
+
+    def _load(self) -> Dict[str, str]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+            logger.info("Загружено %s file_id из %s", len(entries), self.path)
+            return entries
+        except Exception as e:
+            logger.warning("Не удалось прочитать кэш file_id %s: %s", self.path, e)
+            return {}
+
+    def _save(self, entries: Dict[str, str]):
+        tmp_path = f"{self.path}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(entries, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.warning("Не удалось сохранить кэш file_id %s: %s", self.path, e)
+
+    async def load(self):
+        """Читает файл кэша в отдельном потоке (один раз)."""
+        if self._loaded:
+            return
+        async with self._load_lock:
+            if not self._loaded:
+                entries = await asyncio.to_thread(self._load)
+                # Записи, добавленные до окончания чтения, новее прочитанных
+                entries.update(self._entries)
+                self._entries = entries
+                self._loaded = True
+
+    async def get(self, digest: str) -> Optional[str]:
+        await self.load()
+        return self._entries.get(digest)
+
+    def put(self, digest: str, file_id: str):
+        self._entries.pop(digest, None)
+        self._entries[digest] = file_id
+        while len(self._entries) > self.max_entries:
+            self._entries.pop(next(iter(self._entries)))
+        self._dirty = True
+
+    def drop(self, digest: str):
+        if self._entries.pop(digest, None) is not None:
+            self._dirty = True
+
+    async def flush(self):
+        """Переписывает файл в отдельном потоке, если с прошлой записи что-то изменилось."""
+        if not self._dirty or not self._loaded:
+            return
+        self._dirty = False
+        await asyncio.to_thread(self._save, dict(self._entries))
+
+    async def run(self):
+        """Фоновая задача: раз в flush_interval секунд сохраняет изменения."""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def close(self):
+        """При остановке бота сохраняет последние изменения."""
+        await self.flush()
+
+
+@lru_cache(maxsize=None)
+def get_file_id_cache() -> FileIdCache:
+    """Общий кэш для всех обработчиков: создаётся при первом обращении."""
+    settings = get_settings()
+    return FileIdCache(
+        settings.file_id_cache_path,
+        settings.file_id_cache_size,
+        flush_interval=settings.file_id_cache_flush_interval
+    )
+
+# Хэши файлов на диске: путь -> (mtime, размер, sha256), чтобы не перечитывать статику
+_file_digests: Dict[str, Tuple[int, int, str]] = {}
+
+
+def _digest_file(path: str) -> Tuple[str, int]:
+    """Возвращает sha256 содержимого файла и его размер."""
+    stat = os.stat(path)
+    cached = _file_digests.get(path)
+    if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+        return cached[2], stat.st_size
+
+    with open(path, 'rb') as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    _file_digests[path] = (stat.st_mtime_ns, stat.st_size, digest)
+    return digest, stat.st_size
+
+
+async def answer_photo_cached(
+    message: Message,
+    photo: Union[str, bytes],
+    filename: str = "photo.jpg",
+    **kwargs
+) -> Message:
+    """
+    Отправляет фото, по возможности используя уже загруженный в Telegram file_id.
+    `photo` — путь к файлу на диске или готовые байты изображения
+    (они передаются в Telegram напрямую, без записи на диск).
+    Если file_id устарел или недействителен — загружает фото заново и обновляет кэш.
+    """
+    if isinstance(photo, str):
+        digest, size = _digest_file(photo)
+        upload = FSInputFile(photo)
+        label = photo
+    else:
+        digest, size = hashlib.sha256(photo).hexdigest(), len(photo)
+        upload = BufferedInputFile(photo, filename=filename)
+        label = filename
+
+    file_id_cache = get_file_id_cache()
+    file_id = await file_id_cache.get(digest)
+    if file_id:
+        try:
+            sent = await message.answer_photo(photo=file_id, **kwargs)
+            cache_hits.inc()
+            bytes_saved.inc(size)
+            return sent
+        except TelegramBadRequest as e:
+            logger.warning("file_id для %s недействителен, загружаем файл заново: %s", label, e)
+            cache_stale.inc()
+            file_id_cache.drop(digest)
+
+    sent = await message.answer_photo(photo=upload, **kwargs)
+    cache_misses.inc()
+    bytes_uploaded.inc(size)
+
+    if sent.photo:
+        # Берём самый крупный размер — он соответствует исходному файлу
+        file_id_cache.put(digest, sent.photo[-1].file_id)
+    return sent
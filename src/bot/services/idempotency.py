@@ -0,0 +1,85 @@
+import asyncio
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+
+from src.bot.core.config import get_settings
+from src.bot.core.metrics import metrics
+
+T = TypeVar("T")
+
+suppressed = metrics.counter("duplicates.suppressed", "повторные нажатия, которые не стали обрабатывать второй раз")
+coalesced = metrics.counter("duplicates.coalesced", "одинаковые задачи, присоединившиеся к уже выполняющейся")
+
+
+class DuplicateGuard:
+    """
+    Помнит ключи недавно обработанных событий в течение `ttl` секунд.
+    Ключи живут одинаковое время, поэтому самые старые всегда в начале словаря
+    и удаляются без полного просмотра.
+    """
+
+    def __init__(self, ttl: float, max_size: int = 10_000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._expires: "OrderedDict[Hashable, float]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._expires)
+
+    def seen(self, key: Hashable) -> bool:
+        """True, если такой ключ уже был за последние ttl секунд; иначе запоминает его."""
+        if self.ttl <= 0:
+            return False
+        now = time.monotonic()
+        while self._expires:
+            oldest, expires = next(iter(self._expires.items()))
+            if expires > now and len(self._expires) < self.max_size:
+                break
+            del self._expires[oldest]
+        if key in self._expires:
+            return True
+        self._expires[key] = now + self.ttl
+        return False
+
+    def forget(self, key: Hashable):
+        """Забывает ключ: обработка не удалась, и повтор того же события нужно принять."""
+        self._expires.pop(key, None)
+
+
+class SingleFlight:
+    """
+    Объединяет одновременные одинаковые задачи: пока задача с ключом выполняется,
+    остальные вызовы с тем же ключом ждут её результата (или исключения), а не запускают свою.
+    Отмена одного из ждущих не отменяет общую задачу для остальных.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def run(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        task = self._calls.get(key)
+        if task is not None:
+            coalesced.inc()
+        else:
+            task = asyncio.ensure_future(func())
+            self._calls[key] = task
+            task.add_done_callback(lambda finished: self._forget(key, finished))
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, finished: asyncio.Task):
+        if self._calls.get(key) is finished:
+            del self._calls[key]
+        # Если все ждущие были отменены, исключение задачи никто не заберёт
+        if not finished.cancelled():
+            finished.exception()
+
+
+@lru_cache(maxsize=None)
+def get_callback_guard() -> DuplicateGuard:
+    """Общий фильтр повторных нажатий: создаётся при первом обращении."""
+    return DuplicateGuard(get_settings().callback_dedup_ttl)
@@ -0,0 +1,191 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from src.bot.core.config import get_settings
+from src.bot.core.metrics import metrics
+
+logger = logging.getLogger("zoo_bot.journal")
+
+FSYNC_POLICIES = ("always", "interval", "never")
+
+# Сигнал фоновой задаче: дописать очередь и завершиться
+_STOP = None
+
+
+class JournalClosed(RuntimeError):
+    """Журнал закрыт при остановке бота — новые записи не принимаются."""
+
+
+class Journal:
+    """
+    Журнал событий только на дозапись: по записи JSON в строке (NDJSON).
+
+    Обработчики кладут записи в очередь и не ждут диска. Фоновая задача забирает
+    из очереди всё накопившееся и пишет пачку одним вызовом write в отдельном потоке
+    (групповая запись), после чего по политике `fsync`:
+    — always — fsync после каждой пачки,
+    — interval — не чаще раза в `fsync_interval` секунд,
+    — never — сброс на диск остаётся операционной системе.
+    Когда файл превышает `max_bytes`, он переименовывается в .1 (старые — в .2 … .backups).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        path: str,
+        fsync: str = "interval",
+        fsync_interval: float = 1.0,
+        max_bytes: int = 10 * 1024 * 1024,
+        backups: int = 5,
+        batch_size: int = 512
+    ):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Неизвестная политика fsync: {fsync}. Доступны: {', '.join(FSYNC_POLICIES)}")
+        self.name = name
+        self.path = path
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.max_bytes = max_bytes
+        self.backups = max(0, backups)
+        self.batch_size = max(1, batch_size)
+        self._queue: Optional[asyncio.Queue] = None
+        self._writer: Optional[asyncio.Task] = None
+        self._file = None
+        self._last_fsync = 0.0
+        self._closed = False
+
+        self._records = metrics.counter(f"journal.{name}.records", "записи, сохранённые в журнал")
+        self._batches = metrics.counter(f"journal.{name}.batches", "пачки записей (вызовы write)")
+        self._failures = metrics.counter(f"journal.{name}.write_failures", "неудачные попытки записи пачки")
+        metrics.gauge(
+            f"journal.{name}.queue_depth", lambda: self._queue.qsize() if self._queue else 0, "записи в очереди"
+        )
+
+    def write(self, record: Dict[str, Any]):
+        """Ставит запись в очередь и сразу возвращается. К записи добавляется время ts (UTC)."""
+        if self._closed:
+            raise JournalClosed(f"Журнал {self.name} закрыт")
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+            self._writer = asyncio.create_task(self._run(), name=f"journal-{self.name}")
+        line = json.dumps(
+            {"ts": datetime.now(timezone.utc).isoformat(timespec="milliseconds"), **record},
+            ensure_ascii=False, separators=(",", ":")
+        )
+        self._queue.put_nowait(line + "\n")
+
+    # --- Фоновая запись ---
+
+    def _open(self):
+        if self._file is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._file = open(self.path, "ab")
+
+    def _rotate(self):
+        self._file.close()
+        self._file = None
+        if self.backups:
+            for index in range(self.backups - 1, 0, -1):
+                source = f"{self.path}.{index}"
+                if os.path.exists(source):
+                    os.replace(source, f"{self.path}.{index + 1}")
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        logger.info("Журнал %s ротирован: %s", self.name, self.path)
+
+    def _write_batch(self, data: bytes, force_fsync: bool = False):
+        """Выполняется в отдельном потоке: одна запись на пачку, ротация и fsync."""
+        self._open()
+        if self.max_bytes and self._file.tell() and self._file.tell() + len(data) > self.max_bytes:
+            self._rotate()
+            self._open()
+        self._file.write(data)
+        self._file.flush()
+        now = time.monotonic()
+        if force_fsync or self.fsync == "always" or (
+            self.fsync == "interval" and now - self._last_fsync >= self.fsync_interval
+        ):
+            os.fsync(self._file.fileno())
+            self._last_fsync = now
+
+    def _drain(self, lines: List[str]) -> bool:
+        """Добирает накопившиеся записи в пачку. Возвращает True, если встретился сигнал остановки."""
+        while len(lines) < self.batch_size and not self._queue.empty():
+            line = self._queue.get_nowait()
+            if line is _STOP:
+                return True
+            lines.append(line)
+        return False
+
+    async def _run(self):
+        lines: List[str] = []
+        stopping = False
+        while True:
+            if not lines:
+                line = await self._queue.get()
+                if line is _STOP:
+                    stopping = True
+                else:
+                    lines.append(line)
+            # Пока шла предыдущая запись, в очереди накопились новые — пишем их одной пачкой
+            stopping = self._drain(lines) or stopping
+            try:
+                await asyncio.to_thread(self._write_batch, "".join(lines).encode("utf-8"), stopping)
+            except OSError as e:
+                self._failures.inc()
+                if stopping:
+                    logger.error("При остановке не удалось записать %s записей в журнал %s: %s", len(lines), self.name, e)
+                    break
+                logger.error("Не удалось записать %s записей в журнал %s, повторим: %s", len(lines), self.name, e)
+                await asyncio.sleep(1)
+                continue
+            self._records.inc(len(lines))
+            self._batches.inc()
+            lines = []
+            if stopping:
+                break
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    async def close(self):
+        """Перестаёт принимать записи, дописывает очередь на диск (с fsync) и закрывает файл."""
+        self._closed = True
+        if self._writer is not None:
+            self._queue.put_nowait(_STOP)
+            await self._writer
+            self._writer = None
+
+
+_journals: Dict[str, Journal] = {}
+
+
+def get_journal(name: str) -> Journal:
+    """Журнал по имени (feedback — отзывы, contacts — запросы на связь): создаётся при первом обращении."""
+    journal = _journals.get(name)
+    if journal is None:
+        settings = get_settings()
+        paths = {"feedback": settings.feedback_journal_path, "contacts": settings.contact_journal_path}
+        journal = _journals[name] = Journal(
+            name,
+            paths[name],
+            fsync=settings.journal_fsync,
+            fsync_interval=settings.journal_fsync_interval,
+            max_bytes=settings.journal_max_bytes,
+            backups=settings.journal_backups
+        )
+    return journal
+
+
+async def close_journals():
+    """При остановке бота дописывает на диск все журналы."""
+    for journal in list(_journals.values()):
+        await journal.close()
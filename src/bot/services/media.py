@@ -1,102 +1,105 @@
+import io
 import os
+import hashlib
 import logging
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
 from PIL import Image, ImageDraw, ImageFont
 
+from src.bot.services.render_assets import (
+    BOLD_FONT_PATH, REGULAR_FONT_PATH, LOGO_PATH, TELEGRAM_MAX_SIDE, OUTPUT_PROFILES, OutputProfile, asset_version
+)
+
 logger = logging.getLogger("zoo_bot.media")
 
-async def generate_result_image(
-    animal_image: str,
-    animal_name: str,
-    user_name: str
-) -> str:
-    """
-    Генерирует изображение с результатом викторины:
-    - Накладывает имя животного и имя пользователя.
-    - Добавляет полупрозрачные плашки под текст для улучшения читаемости.
-    - Вставляет логотип зоопарка (если доступен).
-    """
-    logger.info(f"Начинаем генерацию изображения для {animal_name} и пользователя {user_name}")
+# Размеры шрифтов и отступы
+TITLE_FONT_SIZE = 48
+TEXT_FONT_SIZE = 36
+MARGIN = 25
 
-    try:
-        base = Image.open(animal_image).convert("RGBA")
-    except Exception as e:
-        logger.error(f"Не удалось открыть исходное изображение: {animal_image}")
-        raise RuntimeError(f"Ошибка при открытии изображения: {e}") from e
-
-    # Создаём слой для плашек
-    overlay = Image.new("RGBA", base.size, (0, 0, 0, 0))
-    draw = ImageDraw.Draw(overlay)
-    margin = 25
+# Кэш готовых шаблонов: (путь к фото, название животного, max_side) -> (версия ресурсов, RGB-изображение)
+_TEMPLATES: Dict[Tuple[str, str, int], Tuple[str, Image.Image]] = {}
 
-    # Пути к шрифтам
-    fonts_dir = "media/fonts"
-    bold_font_path = os.path.join(fonts_dir, "ALS_Story_2.0_B.otf")
-    regular_font_path = os.path.join(fonts_dir, "ALS_Story_2.0_I.otf")
 
-    # Загрузка шрифтов
+@lru_cache(maxsize=None)
+def get_font(path: str, size: int) -> ImageFont.ImageFont:
+    """Загружает шрифт один раз на процесс. Если файл недоступен — используется стандартный."""
     try:
-        title_font = ImageFont.truetype(bold_font_path, 48)
+        return ImageFont.truetype(path, size)
     except Exception:
-        logger.warning(f"Шрифт {bold_font_path} недоступен. Используется стандартный.")
-        title_font = ImageFont.load_default()
+        logger.warning("Шрифт %s недоступен. Используется стандартный.", path)
+        return ImageFont.load_default()
 
-    try:
-        text_font = ImageFont.truetype(regular_font_path, 36)
-    except Exception:
-        logger.warning(f"Шрифт {regular_font_path} недоступен. Используется стандартный.")
-        text_font = ImageFont.load_default()
 
-    # Рисуем подпись пользователя сверху
-    caption = f"{user_name}, твое тотемное животное:"
-    caption_width, caption_height = draw.textlength(caption, font=text_font), text_font.size
+@lru_cache(maxsize=None)
+def _load_logo(width: int) -> Optional[Image.Image]:
+    """Загружает логотип зоопарка и масштабирует его под заданную ширину."""
+    if not os.path.exists(LOGO_PATH):
+        logger.warning("Логотип не найден по пути: %s", LOGO_PATH)
+        return None
 
-    # Позиция верхней плашки
-    caption_rect_position = (
-        # margin - 10,
-        0,
-        margin - 10,
-        base.width,
-        margin + caption_height + 20
+    logo = Image.open(LOGO_PATH).convert("RGBA")
+    return logo.resize(
+        (width, int(width * logo.height / logo.width)),
+        Image.Resampling.LANCZOS
     )
 
-    draw.rounded_rectangle(caption_rect_position, radius=0, fill=(255, 255, 255, 150))
-    # text_x = (caption_rect_position[0] + caption_rect_position[2] - caption_width) // 2
-    text_x = margin
-    text_y = (caption_rect_position[1] + caption_rect_position[3] - caption_height) // 2 + 1
-    draw.text((text_x, text_y), caption, font=text_font, fill="black")
+
+def load_source(animal_image: str, max_side: int = TELEGRAM_MAX_SIDE) -> Image.Image:
+    """
+    Открывает исходное фото животного и приводит его к рабочему размеру:
+    большая сторона уменьшается до max_side, меньшие фото не увеличиваются.
+    """
+    try:
+        image = Image.open(animal_image)
+        image.draft("RGB", (max_side, max_side))  # JPEG декодируется сразу в уменьшенном виде
+        image = image.convert("RGBA")
+    except Exception as e:
+        logger.error("Не удалось открыть исходное изображение: %s", animal_image)
+        raise RuntimeError(f"Ошибка при открытии изображения: {e}") from e
+
+    if max(image.size) > max_side:
+        logger.info("Уменьшаем %s с %s до %spx по большей стороне", animal_image, image.size, max_side)
+        image.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+    return image
+
+
+def build_template(animal_image: str, animal_name: str, max_side: int = TELEGRAM_MAX_SIDE) -> Image.Image:
+    """
+    Собирает неизменную часть изображения для животного:
+    - фотографию, приведённую к рабочему размеру,
+    - плашку с названием животного внизу слева,
+    - логотип зоопарка на скруглённой подложке.
+    """
+    base = load_source(animal_image, max_side)
+
+    overlay = Image.new("RGBA", base.size, (0, 0, 0, 0))
+    draw = ImageDraw.Draw(overlay)
+    title_font = get_font(BOLD_FONT_PATH, TITLE_FONT_SIZE)
 
     #  Рисуем название животного внизу слева (не по центру!)
-    title_text = animal_name
-    title_width, title_height = draw.textlength(title_text, font=title_font), title_font.size
+    title_width, title_height = draw.textlength(animal_name, font=title_font), title_font.size
 
     # Позиция нижней плашки — слева, чуть выше логотипа
     title_rect_position = (
         0,
-        base.height - margin - title_height - 30,  # делаем больше отступа, чтобы освободить место для логотипа
-        margin + title_width + 10,
-        base.height - margin - 10
+        base.height - MARGIN - title_height - 30,  # делаем больше отступа, чтобы освободить место для логотипа
+        MARGIN + title_width + 10,
+        base.height - MARGIN - 10
     )
 
     draw.rounded_rectangle(title_rect_position, radius=0, fill=(0, 0, 0, 120))
-    text_x = margin
+    text_x = MARGIN
     text_y = (title_rect_position[1] + title_rect_position[3] - title_height) // 2 + 4
-    draw.text((text_x, text_y), title_text, font=title_font, fill="white")
+    draw.text((text_x, text_y), animal_name, font=title_font, fill="white")
 
-    # Объединяем основное изображение и оверлей с подложками
-    base = Image.alpha_composite(base.convert("RGBA"), overlay)
+    base = Image.alpha_composite(base, overlay)
 
     # Логотип зоопарка
-    logo_path = "media/logo/mzoo_logo.png"
-    if os.path.exists(logo_path):
-        try:
-            logo = Image.open(logo_path).convert("RGBA")
-            logo_width = base.width // 5
-            logo = logo.resize(
-                (logo_width, int(logo_width * logo.height / logo.width)),
-                Image.Resampling.LANCZOS
-            )
-
-            position = (base.width - logo.width - margin, base.height - logo.height - margin)
+    try:
+        logo = _load_logo(base.width // 5)
+        if logo is not None:
+            position = (base.width - logo.width - MARGIN, base.height - logo.height - MARGIN)
 
             # Добавляем подложку под логотип
             overlay = Image.new("RGBA", base.size, (0, 0, 0, 0))
@@ -113,25 +116,196 @@ async def generate_result_image(
             )
             base = Image.alpha_composite(base, overlay)
             base.paste(logo, position, mask=logo)
+    except Exception as e:
+        logger.exception("Ошибка при добавлении логотипа: %s — %s", LOGO_PATH, e)
+
+    # Фото непрозрачное, поэтому шаблон храним сразу в RGB
+    return base.convert("RGB")
+
+
+def get_template(animal_image: str, animal_name: str, max_side: int = TELEGRAM_MAX_SIDE) -> Image.Image:
+    """
+    Возвращает шаблон животного из кэша, собирая его при первом обращении.
+    Если фото, шрифты или логотип заменили на том же месте (изменилась версия ресурсов),
+    шаблон собирается заново, а загруженные шрифты и логотип перечитываются.
+    """
+    key = (animal_image, animal_name, max_side)
+    version = asset_version(animal_image)
+    cached = _TEMPLATES.get(key)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    if cached is not None:
+        logger.info("Ресурсы для %s изменились, собираем шаблон заново", animal_name)
+        get_font.cache_clear()
+        _load_logo.cache_clear()
+    else:
+        logger.info("Собираем шаблон для %s", animal_name)
+    template = build_template(animal_image, animal_name, max_side)
+    _TEMPLATES[key] = (version, template)
+    return template
+
+
+def warm_templates(animals: Dict[str, Dict], max_side: int = TELEGRAM_MAX_SIDE):
+    """
+    Заранее собирает шаблоны для всех животных из animals.json.
+    Заодно каждое исходное фото один раз приводится к рабочему размеру.
+    """
+    for animal in animals.values():
+        try:
+            get_template(animal["image"], animal["name"], max_side)
         except Exception as e:
-            logger.exception(f"Ошибка при добавлении логотипа: {logo_path} — {e}")
+            logger.error("Не удалось подготовить шаблон для %s: %s", animal.get("name"), e)
+
+
+def invalidate_templates():
+    """
+    Сбрасывает кэш шаблонов, шрифтов и логотипа целиком.
+    Замену файлов на том же месте get_template замечает сам; сброс нужен,
+    чтобы измерить холодную отрисовку или освободить шаблоны убранных животных.
+    """
+    _TEMPLATES.clear()
+    get_font.cache_clear()
+    _load_logo.cache_clear()
+    logger.info("Кэш шаблонов изображений сброшен")
+
+
+def compose_result_image(
+    animal_image: str,
+    animal_name: str,
+    user_name: str,
+    max_side: int = TELEGRAM_MAX_SIDE
+) -> Image.Image:
+    """
+    Накладывает на готовый шаблон животного верхнюю плашку с подписью пользователя.
+    Перерисовывается только полоса с подписью, а не всё изображение.
+    """
+    template = get_template(animal_image, animal_name, max_side)
+    text_font = get_font(REGULAR_FONT_PATH, TEXT_FONT_SIZE)
+
+    # Рисуем подпись пользователя сверху
+    caption = f"{user_name}, твое тотемное животное:"
+    caption_height = text_font.size
+
+    # Позиция верхней плашки
+    caption_rect_position = (
+        0,
+        MARGIN - 10,
+        template.width,
+        MARGIN + caption_height + 20
+    )
+    text_x = MARGIN
+    text_y = (caption_rect_position[1] + caption_rect_position[3] - caption_height) // 2 + 1
+
+    # Высота полосы — с запасом на выносные элементы букв ниже плашки
+    text_bottom = text_y + text_font.getbbox(caption)[3]
+    strip_box = (0, 0, template.width, min(template.height, max(caption_rect_position[3], text_bottom) + 1))
+
+    strip = template.crop(strip_box).convert("RGBA")
+    overlay = Image.new("RGBA", strip.size, (0, 0, 0, 0))
+    draw = ImageDraw.Draw(overlay)
+    draw.rounded_rectangle(caption_rect_position, radius=0, fill=(255, 255, 255, 150))
+    draw.text((text_x, text_y), caption, font=text_font, fill="black")
+    strip = Image.alpha_composite(strip, overlay)
+
+    result = template.copy()
+    result.paste(strip.convert("RGB"), strip_box[:2])
+    return result
+
+
+def _encode(image: Image.Image, profile: OutputProfile, quality: int) -> bytes:
+    buffer = io.BytesIO()
+    if profile.name == "webp":
+        image.save(buffer, "WEBP", quality=quality, method=4)
+    elif profile.name == "jpeg":
+        image.save(buffer, "JPEG", quality=quality)
     else:
-        logger.warning(f"Логотип не найден по пути: {logo_path}")
+        image.save(buffer, "JPEG", quality=quality, progressive=True, optimize=True)
+    return buffer.getvalue()
+
+
+def encode_image(image: Image.Image, profile: OutputProfile) -> bytes:
+    """
+    Кодирует изображение по профилю.
+    Для профиля budget двоичным поиском подбирается наибольшее качество
+    (не выше profile.quality), при котором файл укладывается в target_bytes.
+    """
+    if profile.name != "budget":
+        return _encode(image, profile, profile.quality)
+
+    low, high = 30, profile.quality
+    best = None
+    while low <= high:
+        quality = (low + high) // 2
+        data = _encode(image, profile, quality)
+        if len(data) <= profile.target_bytes:
+            best = data
+            low = quality + 1
+        else:
+            high = quality - 1
+
+    if best is None:
+        logger.warning("Не удалось уложиться в %s байт даже с минимальным качеством", profile.target_bytes)
+        best = _encode(image, profile, 30)
+    return best
 
-    # Сохранение результата
-    output_dir = "media/generated"
-    os.makedirs(output_dir, exist_ok=True)
-    safe_user_name = "".join(char for char in user_name if char.isalnum())
-    filename = f"{safe_user_name}_{animal_name}.jpg"
-    output_path = os.path.join(output_dir, filename)
+
+def generate_result_image(
+    animal_image: str,
+    animal_name: str,
+    user_name: str,
+    profile: OutputProfile = OutputProfile(),
+    debug_dir: Optional[str] = None
+) -> bytes:
+    """
+    Генерирует изображение с результатом викторины и возвращает его закодированные байты:
+    - Берёт из кэша шаблон животного (фото, название и логотип).
+    - Накладывает сверху плашку с именем пользователя.
+    - Кодирует результат в памяти по профилю `profile`, без записи на диск.
+
+    Если указан `debug_dir`, копия изображения дополнительно сохраняется туда
+    (режим отладки).
+
+    Функция синхронная и нагружает процессор, поэтому из обработчиков
+    её нужно вызывать через пул отрисовки (services/render_executor).
+    """
+    logger.info("Начинаем генерацию изображения для %s и пользователя %s", animal_name, user_name)
+
+    final_image = compose_result_image(animal_image, animal_name, user_name, profile.max_side)
 
     try:
-        # Конвертируем в RGB перед сохранением как JPEG
-        final_image = base.convert("RGB")
-        final_image.save(output_path, "JPEG", quality=85)
-        logger.info(f"Изображение успешно сохранено: {output_path}")
+        data = encode_image(final_image, profile)
     except Exception as e:
-        logger.error(f"Ошибка при сохранении изображения: {output_path} — {e}")
-        raise RuntimeError(f"Не удалось сохранить изображение: {e}") from e
+        logger.error("Ошибка при кодировании изображения для %s — %s", animal_name, e)
+        raise RuntimeError(f"Не удалось закодировать изображение: {e}") from e
+
+    if debug_dir:
+        save_debug_copy(data, debug_dir, animal_name, user_name, profile.extension)
+
+    return data
+
+
+def save_debug_copy(
+    data: bytes,
+    output_dir: str,
+    animal_name: str,
+    user_name: str,
+    extension: str = "jpg"
+) -> Optional[str]:
+    """
+    Сохраняет готовое изображение на диск для отладки.
+    К имени файла добавляется хэш имени пользователя, чтобы разные
+    пользователи (в том числе с именами без букв и цифр) не перезаписывали друг друга.
+    """
+    safe_user_name = "".join(char for char in user_name if char.isalnum())
+    name_hash = hashlib.sha1(user_name.encode("utf-8")).hexdigest()[:8]
+    output_path = os.path.join(output_dir, f"{safe_user_name}_{name_hash}_{animal_name}.{extension}")
 
-    return output_path
\ No newline at end of file
+    try:
+        os.makedirs(output_dir, exist_ok=True)
+        with open(output_path, "wb") as f:
+            f.write(data)
+        logger.info("Отладочная копия изображения сохранена: %s", output_path)
+        return output_path
+    except Exception as e:
+        logger.error("Ошибка при сохранении изображения: %s — %s", output_path, e)
+        return None
@@ -0,0 +1,253 @@
+import asyncio
+import contextvars
+import heapq
+import itertools
+import logging
+import time
+from contextlib import contextmanager
+from enum import IntEnum
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple, Union
+
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import SendChatAction, SendPhoto, TelegramMethod
+from aiogram.methods.base import TelegramType
+
+from src.bot.core.metrics import metrics
+
+if TYPE_CHECKING:
+    from aiogram import Bot
+
+logger = logging.getLogger("zoo_bot.outbound")
+
+sent = metrics.counter("outbound.sent", "запросы к Bot API, прошедшие через планировщик")
+retries = metrics.counter("outbound.retry_after", "ответы Telegram «слишком много запросов» (RetryAfter)")
+dropped = metrics.counter("outbound.retries_exhausted", "отправки, не прошедшие после всех повторов")
+wait_time = metrics.histogram("outbound.wait_ms", "сколько отправка ждала своей очереди, мс")
+actions_skipped = metrics.counter("outbound.chat_actions_skipped", "статусы «отправляет фото», пропущенные на паузе чата")
+
+# Сколько корзин отдельных чатов держать, прежде чем удалять заполненные (неактивные)
+MAX_IDLE_BUCKETS = 10_000
+
+
+class Priority(IntEnum):
+    """Чем меньше значение, тем раньше запрос уходит в Telegram при очереди."""
+    HIGH = 0      # изображение с результатом — то, ради чего пользователь проходил викторину
+    NORMAL = 1    # вопросы, ответы на команды
+    LOW = 2       # подсказки и прочие второстепенные сообщения
+
+
+_priority: contextvars.ContextVar[Optional[Priority]] = contextvars.ContextVar("outbound_priority", default=None)
+
+
+@contextmanager
+def outbound_priority(priority: Priority):
+    """Задаёт приоритет для всех отправок внутри блока (в текущей задаче)."""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class TokenBucket:
+    """
+    Корзина токенов: пополняется со скоростью `rate` в секунду до `capacity`.
+    Каждая отправка забирает один токен; пустая корзина означает «подожди».
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def _refill(self, now: float):
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def delay(self, now: float) -> float:
+        """Через сколько секунд появится токен (0 — можно отправлять сейчас)."""
+        self._refill(now)
+        if now < self.paused_until:
+            return self.paused_until - now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self, now: float):
+        self._refill(now)
+        self.tokens -= 1
+
+    def pause(self, now: float, seconds: float):
+        """Telegram попросил подождать: корзина пуста до истечения паузы."""
+        self._refill(now)
+        self.paused_until = max(self.paused_until, now + seconds)
+        self.tokens = 0.0
+
+    def is_idle(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity and now >= self.paused_until
+
+
+class OutboundScheduler(BaseRequestMiddleware):
+    """
+    Промежуточный слой сессии бота: все отправки в чаты проходят через него.
+
+    — Общая корзина ограничивает число сообщений в секунду на всего бота,
+      корзина каждого чата — в конкретный чат (с небольшим запасом на всплеск).
+    — При очереди первыми уходят более важные запросы (см. Priority),
+      при равном приоритете — в порядке поступления.
+    — На ответ RetryAfter планировщик приостанавливает корзину чата
+      на указанное Telegram время и повторяет запрос.
+    Запросы без chat_id (ответы на нажатия, getUpdates, getMe) идут в обход очереди.
+    Статусы чата (SendChatAction) тоже: они необязательны и повторяются каждые
+    несколько секунд, поэтому не должны отнимать токены у результата и вопросов
+    того же чата; пока чат на паузе после RetryAfter, они просто не отправляются.
+    """
+
+    def __init__(self, global_rate: float, chat_rate: float, chat_burst: float, max_retries: int = 3):
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.max_retries = max(0, max_retries)
+        self._global = TokenBucket(global_rate, global_rate)
+        self._chats: Dict[Union[int, str], TokenBucket] = {}
+        self._waiting: List[Tuple[int, int, Union[int, str], asyncio.Future]] = []
+        self._order = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._pump_task: Optional[asyncio.Task] = None
+
+        metrics.gauge("outbound.queue_depth", lambda: len(self._waiting), "отправки, ждущие своей очереди")
+
+    def _bucket(self, chat_id: Union[int, str]) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if len(self._chats) >= MAX_IDLE_BUCKETS:
+                now = time.monotonic()
+                self._chats = {key: b for key, b in self._chats.items() if not b.is_idle(now)}
+            bucket = self._chats[chat_id] = TokenBucket(self.chat_rate, self.chat_burst)
+        return bucket
+
+    def _ensure_pump(self):
+        if self._pump_task is None or self._pump_task.done():
+            self._wakeup = asyncio.Event()
+            self._pump_task = asyncio.create_task(self._pump())
+
+    async def _acquire(self, chat_id: Union[int, str], priority: Priority):
+        """Ждёт, пока планировщик разрешит отправку в чат."""
+        self._ensure_pump()
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiting, (priority, next(self._order), chat_id, future))
+        self._wakeup.set()
+        await future
+
+    def _release_ready(self) -> float:
+        """
+        Выпускает запросы, для которых есть токены, в порядке приоритета.
+        Возвращает, через сколько секунд стоит проверить очередь снова.
+        """
+        now = time.monotonic()
+        next_check = float("inf")
+        blocked = set()
+        for entry in sorted(self._waiting):
+            priority, _, chat_id, future = entry
+            if future.done():
+                # Отправку отменили, пока она ждала
+                self._waiting.remove(entry)
+                continue
+            global_delay = self._global.delay(now)
+            if global_delay > 0:
+                next_check = min(next_check, global_delay)
+                break
+            if chat_id in blocked:
+                continue
+            chat = self._bucket(chat_id)
+            chat_delay = chat.delay(now)
+            if chat_delay > 0:
+                # Следующие запросы в тот же чат ждут этот, чтобы не нарушать порядок
+                blocked.add(chat_id)
+                next_check = min(next_check, chat_delay)
+                continue
+            self._global.take(now)
+            chat.take(now)
+            self._waiting.remove(entry)
+            future.set_result(None)
+        heapq.heapify(self._waiting)
+        return next_check
+
+    async def _pump(self):
+        while True:
+            self._wakeup.clear()
+            next_check = self._release_ready()
+            timeout = None if next_check == float("inf") else next_check
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: "Bot",
+        method: TelegramMethod[TelegramType],
+    ):
+        chat_id = getattr(method, "chat_id", None)
+        if chat_id is None:
+            return await make_request(bot, method)
+        if isinstance(method, SendChatAction):
+            return await self._send_chat_action(make_request, bot, method)
+
+        priority = _priority.get()
+        if priority is None:
+            priority = Priority.HIGH if isinstance(method, SendPhoto) else Priority.NORMAL
+        attempt = 0
+        while True:
+            queued = time.monotonic()
+            await self._acquire(chat_id, priority)
+            wait_time.observe((time.monotonic() - queued) * 1000)
+            try:
+                result = await make_request(bot, method)
+            except TelegramRetryAfter as e:
+                retries.inc()
+                self._bucket(chat_id).pause(time.monotonic(), e.retry_after)
+                if attempt >= self.max_retries:
+                    dropped.inc()
+                    logger.error(
+                        "%s в чат %s не отправлен после %s попыток: %s", type(method).__name__, chat_id, attempt + 1, e
+                    )
+                    raise
+                attempt += 1
+                logger.warning(
+                    "Telegram просит подождать %s с перед отправкой в чат %s (попытка %s/%s)",
+                    e.retry_after, chat_id, attempt, self.max_retries
+                )
+                continue
+            sent.inc()
+            return result
+
+    async def _send_chat_action(
+        self, make_request: NextRequestMiddlewareType[TelegramType], bot: "Bot", method: SendChatAction
+    ):
+        """Статус чата отправляется сразу, без токенов и повторов; на паузе чата пропускается."""
+        chat = self._chats.get(method.chat_id)
+        if chat is not None and time.monotonic() < chat.paused_until:
+            actions_skipped.inc()
+            return True
+        try:
+            return await make_request(bot, method)
+        except TelegramRetryAfter as e:
+            retries.inc()
+            self._bucket(method.chat_id).pause(time.monotonic(), e.retry_after)
+            actions_skipped.inc()
+            return True
+
+    async def close(self):
+        """Останавливает планировщик; ждущие отправки отменяются."""
+        if self._pump_task is not None:
+            self._pump_task.cancel()
+            self._pump_task = None
+        for _, _, _, future in self._waiting:
+            future.cancel()
+        self._waiting.clear()
@@ -0,0 +1,153 @@
+import logging
+import os
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+from src.bot.services.scoring import CompiledQuestionBank
+
+logger = logging.getLogger("zoo_bot.outcomes")
+
+# Формат файла таблицы исходов:
+#   4 байта — сигнатура b"ZOOT",
+#   1 байт  — версия формата,
+#   16 байт — отпечаток банка вопросов (CompiledQuestionBank.signature, ASCII),
+#   далее   — по одному байту на путь: номер животного в порядке animals.json
+#             или NO_WINNER, если очков не набрало ни одно животное.
+# Номер пути — упакованные номера ответов (поле «p» сессии), поэтому результат
+# находится одним обращением к массиву.
+MAGIC = b"ZOOT"
+FORMAT_VERSION = 1
+NO_WINNER = 0xFF
+HEADER_SIZE = len(MAGIC) + 1 + 16
+
+
+class OutcomeTable:
+    """Таблица «номер пути ответов -> номер животного» для всех возможных прохождений."""
+
+    def __init__(self, signature: str, winners: array):
+        self.signature = signature
+        self.winners = winners
+
+    def __len__(self) -> int:
+        return len(self.winners)
+
+    def lookup(self, bank: CompiledQuestionBank, path_index: int) -> Optional[str]:
+        """Ключ животного для полного прохождения или None, если путь вне таблицы."""
+        if not 0 <= path_index < len(self.winners):
+            return None
+        winner = self.winners[path_index]
+        return None if winner == NO_WINNER else bank.animal_keys[winner]
+
+    def save(self, path: str):
+        tmp_path = f"{path}.tmp"
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(tmp_path, "wb") as f:
+            f.write(MAGIC + bytes([FORMAT_VERSION]) + self.signature.encode("ascii"))
+            self.winners.tofile(f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "OutcomeTable":
+        with open(path, "rb") as f:
+            header = f.read(HEADER_SIZE)
+            if len(header) != HEADER_SIZE or not header.startswith(MAGIC):
+                raise ValueError(f"{path} не является таблицей исходов")
+            if header[len(MAGIC)] != FORMAT_VERSION:
+                raise ValueError(f"Неподдерживаемая версия таблицы исходов: {header[len(MAGIC)]}")
+            winners = array("B")
+            winners.frombytes(f.read())
+        return cls(header[len(MAGIC) + 1:].decode("ascii"), winners)
+
+
+def compile_outcomes(bank: CompiledQuestionBank) -> Tuple[OutcomeTable, Dict]:
+    """
+    Перебирает все пути ответов и считает победителя для каждого.
+    Очки префиксов переиспользуются (обход в глубину), поэтому на каждый узел
+    дерева путей приходится одно сложение векторов. Это обычный цикл на Python,
+    а не векторизованный подсчёт: таблица собирается офлайн один раз,
+    а переиспользование префиксов и так сокращает работу в разы.
+
+    Возвращает таблицу и сводку: сколько путей приводит к каждому животному,
+    сколько из них решены правилом ничьей и после скольких вопросов
+    результат становится окончательным.
+    """
+    if bank.animal_count >= NO_WINNER:
+        raise ValueError(f"Таблица исходов поддерживает не больше {NO_WINNER - 1} животных")
+
+    total = bank.path_count
+    winners = array("B", bytes(total))
+    reached = [0] * bank.animal_count
+    ties = [0] * bank.animal_count
+    no_winner = 0
+    # Сколько путей решается после N вопросов (для режима досрочного завершения)
+    decided_after = [0] * (bank.question_count + 1)
+    answers: List[int] = []
+    index = 0
+
+    def walk(question_index: int, scores: List[int], decided_at: Optional[int]):
+        nonlocal index, no_winner
+        if decided_at is None and bank.is_decided(scores, question_index):
+            decided_at = question_index
+        if question_index == bank.question_count:
+            decided_after[decided_at] += 1
+            result = bank.winner(scores, answers)
+            if result is None:
+                winners[index] = NO_WINNER
+                no_winner += 1
+            else:
+                animal = bank.animal_index[result[0]]
+                winners[index] = animal
+                reached[animal] += 1
+                if scores.count(result[1]) > 1:
+                    ties[animal] += 1
+            index += 1
+            return
+        for answer_index in range(bank.radices[question_index]):
+            answers.append(answer_index)
+            walk(question_index + 1, bank.apply(scores, question_index, answer_index), decided_at)
+            answers.pop()
+
+    walk(0, bank.empty_scores(), None)
+    questions_needed = sum(count * answered for answered, count in enumerate(decided_after))
+
+    report = {
+        "signature": bank.signature,
+        "tie_break": bank.tie_break,
+        "questions": bank.question_count,
+        "paths": total,
+        "ties": sum(ties),
+        "no_winner": no_winner,
+        "decided_after": {str(answered): count for answered, count in enumerate(decided_after) if count},
+        "mean_questions_needed": round(questions_needed / total, 3),
+        "animals": {
+            key: {"paths": reached[i], "share": round(reached[i] / total, 5), "won_by_tie": ties[i]}
+            for i, key in enumerate(bank.animal_keys)
+        },
+        "unreachable": [key for i, key in enumerate(bank.animal_keys) if not reached[i]],
+    }
+    return OutcomeTable(bank.signature, winners), report
+
+
+def load_outcome_table(path: str, bank: CompiledQuestionBank) -> Optional[OutcomeTable]:
+    """
+    Загружает таблицу исходов, если она собрана для текущего банка вопросов.
+    Если файла нет или он устарел, возвращает None — результат тогда считается по очкам.
+    """
+    if not path or not os.path.exists(path):
+        logger.info("Таблица исходов %s не найдена, результат будет считаться по очкам", path)
+        return None
+    try:
+        table = OutcomeTable.load(path)
+    except Exception as e:
+        logger.warning("Не удалось прочитать таблицу исходов %s: %s", path, e)
+        return None
+
+    if table.signature != bank.signature or len(table) != bank.path_count:
+        logger.warning(
+            "Таблица исходов %s собрана для другого набора вопросов или правила ничьей, "
+            "пересоберите её: python -m src.bot.tools.compile_outcomes", path
+        )
+        return None
+
+    logger.info("Загружена таблица исходов: %s путей", len(table))
+    return table
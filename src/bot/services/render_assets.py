@@ -0,0 +1,68 @@
+"""
+Ресурсы и профили отрисовки, которые не требуют Pillow:
+пути к шрифтам и логотипу, версия вёрстки, профиль кодирования и версия ресурсов.
+Обработчики берут их отсюда, поэтому Pillow загружается только в воркерах отрисовки.
+"""
+import hashlib
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+# Пути к ресурсам
+FONTS_DIR = "media/fonts"
+BOLD_FONT_PATH = os.path.join(FONTS_DIR, "ALS_Story_2.0_B.otf")
+REGULAR_FONT_PATH = os.path.join(FONTS_DIR, "ALS_Story_2.0_I.otf")
+LOGO_PATH = "media/logo/mzoo_logo.png"
+
+# Версия вёрстки изображения: увеличивайте при любом изменении отрисовки,
+# чтобы ранее закэшированные результаты перестали использоваться
+TEMPLATE_VERSION = 1
+
+# Максимальная сторона, которую Telegram сохраняет у фотографий:
+# всё, что больше, он всё равно уменьшит на своей стороне
+TELEGRAM_MAX_SIDE = 1280
+
+# Поддерживаемые профили кодирования готового изображения
+OUTPUT_PROFILES = ("jpeg", "progressive", "webp", "budget")
+
+
+@dataclass(frozen=True)
+class OutputProfile:
+    """
+    Параметры кодирования готового изображения:
+    - jpeg — обычный JPEG с заданным качеством,
+    - progressive — прогрессивный оптимизированный JPEG,
+    - webp — WebP с заданным качеством,
+    - budget — прогрессивный JPEG с максимальным качеством, укладывающимся в target_bytes.
+    Исходные фото уменьшаются так, чтобы большая сторона не превышала max_side.
+    """
+    name: str = "jpeg"
+    quality: int = 85
+    target_bytes: int = 0
+    max_side: int = TELEGRAM_MAX_SIDE
+
+    def __post_init__(self):
+        if self.name not in OUTPUT_PROFILES:
+            raise ValueError(f"Неизвестный профиль кодирования: {self.name}. Доступны: {', '.join(OUTPUT_PROFILES)}")
+        if self.name == "budget" and self.target_bytes <= 0:
+            raise ValueError("Для профиля budget нужно указать target_bytes > 0")
+
+    @property
+    def extension(self) -> str:
+        return "webp" if self.name == "webp" else "jpg"
+
+
+def asset_version(animal_image: str, profile: Optional[OutputProfile] = None) -> str:
+    """
+    Возвращает версию ресурсов, из которых рисуется результат для животного:
+    версию вёрстки, профиль кодирования и время изменения и размер фото, шрифтов и логотипа.
+    Меняется при замене любого из файлов или при смене профиля.
+    """
+    parts = [f"v{TEMPLATE_VERSION}", repr(profile or OutputProfile())]
+    for path in (animal_image, BOLD_FONT_PATH, REGULAR_FONT_PATH, LOGO_PATH):
+        try:
+            stat = os.stat(path)
+            parts.append(f"{path}:{stat.st_mtime_ns}:{stat.st_size}")
+        except OSError:
+            parts.append(f"{path}:-")
+    return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()[:16]
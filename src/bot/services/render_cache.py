@@ -0,0 +1,197 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Optional
+
+from src.bot.core.config import get_settings
+from src.bot.core.metrics import metrics
+
+logger = logging.getLogger("zoo_bot.render_cache")
+
+memory_hits = metrics.counter("render_cache.memory_hits", "результаты, найденные в памяти")
+disk_hits = metrics.counter("render_cache.disk_hits", "результаты, найденные на диске")
+misses = metrics.counter("render_cache.misses", "результаты, которые пришлось рисовать")
+bytes_saved = metrics.counter("render_cache.bytes_saved", "байт готовых изображений, выданных из кэша")
+evictions = metrics.counter("render_cache.evictions", "вытесненные из кэша изображения")
+
+
+def normalize_user_name(user_name: str) -> str:
+    """
+    Приводит имя к каноническому виду: Unicode NFC и одиночные пробелы.
+    Имена, которые выглядят одинаково, дают одну и ту же картинку и один ключ кэша.
+    """
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFC", user_name)).strip()
+
+
+def make_cache_key(animal_key: str, user_name: str, version: str) -> str:
+    """
+    Строит ключ кэша для (животное, нормализованное имя, версия ресурсов).
+    Поля сериализуются в JSON, поэтому разные кортежи не могут дать одну строку
+    (в отличие от имени файла из одних букв и цифр).
+    """
+    payload = json.dumps([animal_key, normalize_user_name(user_name), version], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class RenderCache:
+    """
+    Двухуровневый кэш готовых изображений с результатом:
+    — небольшой LRU в памяти, ограниченный по суммарному размеру в байтах,
+    — каталог на диске с собственным бюджетом; при превышении удаляются
+      файлы, к которым дольше всего не обращались.
+    """
+
+    def __init__(self, memory_bytes: int, disk_dir: Optional[str], disk_bytes: int):
+        self.memory_bytes = memory_bytes
+        self.disk_dir = disk_dir
+        self.disk_bytes = disk_bytes
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_size = 0
+        # Индекс файлов на диске: ключ -> размер, в порядке последнего обращения
+        self._disk: "OrderedDict[str, int]" = OrderedDict()
+        self._disk_size = 0
+        self._disk_loaded = False
+        self._disk_lock = threading.Lock()
+
+    @property
+    def hit_ratio(self) -> float:
+        hits = memory_hits.value + disk_hits.value
+        total = hits + misses.value
+        return hits / total if total else 0.0
+
+    # --- Память ---
+
+    def _remember(self, key: str, data: bytes):
+        if len(data) > self.memory_bytes:
+            return
+        if key in self._memory:
+            self._memory_size -= len(self._memory.pop(key))
+        self._memory[key] = data
+        self._memory_size += len(data)
+        while self._memory_size > self.memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_size -= len(evicted)
+
+    # --- Диск (все операции выполняются в отдельном потоке) ---
+
+    def _path(self, key: str) -> str:
+        # Формат изображения входит в ключ через версию ресурсов, поэтому расширение общее
+        return os.path.join(self.disk_dir, f"{key}.img")
+
+    def _load_disk_index(self):
+        """Сканирует каталог кэша; самые старые по mtime файлы вытесняются первыми."""
+        self._disk_loaded = True
+        os.makedirs(self.disk_dir, exist_ok=True)
+        entries = []
+        for entry in os.scandir(self.disk_dir):
+            if entry.is_file() and entry.name.endswith(".img"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, entry.name[:-4], stat.st_size))
+        for _, key, size in sorted(entries):
+            self._disk[key] = size
+            self._disk_size += size
+        logger.info("Кэш изображений на диске: %s файлов, %s байт", len(self._disk), self._disk_size)
+
+    def _disk_get(self, key: str) -> Optional[bytes]:
+        with self._disk_lock:
+            return self._disk_get_locked(key)
+
+    def _disk_put(self, key: str, data: bytes):
+        with self._disk_lock:
+            self._disk_put_locked(key, data)
+
+    def _disk_get_locked(self, key: str) -> Optional[bytes]:
+        if not self._disk_loaded:
+            self._load_disk_index()
+        if key not in self._disk:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+        except OSError:
+            self._disk_size -= self._disk.pop(key)
+            return None
+        self._disk.move_to_end(key)
+        return data
+
+    def _disk_put_locked(self, key: str, data: bytes):
+        if not self._disk_loaded:
+            self._load_disk_index()
+        if key in self._disk or len(data) > self.disk_bytes:
+            return
+        path = self._path(key)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        self._disk[key] = len(data)
+        self._disk_size += len(data)
+
+        while self._disk_size > self.disk_bytes:
+            evicted_key, size = self._disk.popitem(last=False)
+            self._disk_size -= size
+            evictions.inc()
+            try:
+                os.remove(self._path(evicted_key))
+            except OSError as e:
+                logger.warning("Не удалось удалить %s из кэша: %s", evicted_key, e)
+
+    # --- Публичный интерфейс ---
+
+    async def get(self, key: str) -> Optional[bytes]:
+        """Ищет изображение сначала в памяти, затем на диске."""
+        data = self._memory.get(key)
+        if data is not None:
+            self._memory.move_to_end(key)
+            memory_hits.inc()
+            bytes_saved.inc(len(data))
+            return data
+
+        if self.disk_dir:
+            try:
+                data = await asyncio.to_thread(self._disk_get, key)
+            except Exception as e:
+                logger.warning("Ошибка чтения кэша изображений: %s", e)
+                data = None
+            if data is not None:
+                self._remember(key, data)
+                disk_hits.inc()
+                bytes_saved.inc(len(data))
+                return data
+
+        misses.inc()
+        return None
+
+    async def put(self, key: str, data: bytes):
+        """Сохраняет изображение в оба уровня кэша."""
+        self._remember(key, data)
+        if self.disk_dir:
+            try:
+                await asyncio.to_thread(self._disk_put, key, data)
+            except Exception as e:
+                logger.warning("Ошибка записи в кэш изображений: %s", e)
+
+
+@lru_cache(maxsize=None)
+def get_render_cache() -> RenderCache:
+    """Общий кэш для всех обработчиков: создаётся при первом обращении."""
+    settings = get_settings()
+    return RenderCache(
+        memory_bytes=settings.render_cache_memory_bytes,
+        disk_dir=settings.render_cache_dir,
+        disk_bytes=settings.render_cache_disk_bytes
+    )
+
+
+metrics.gauge(
+    "render_cache.hit_ratio", lambda: get_render_cache().hit_ratio, "доля запросов, обслуженных из кэша"
+)
@@ -0,0 +1,247 @@
+import asyncio
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from src.bot.core.config import get_settings
+from src.bot.core.logger import worker_log_queue
+from src.bot.core.metrics import metrics
+from src.bot.services.content import get_content_store
+from src.bot.services.render_assets import OutputProfile
+
+logger = logging.getLogger("zoo_bot.render")
+
+recycled = metrics.counter("render.pools_recycled", "перезапуски пула отрисовки из-за зависших воркеров")
+
+
+class RenderQueueFull(RuntimeError):
+    """Очередь на отрисовку переполнена — новый рендер не принимается."""
+
+
+class RenderTimeout(RuntimeError):
+    """Отрисовка не уложилась в отведённое время."""
+
+
+def _init_worker(log_queue: Optional[Any], animals: Dict[str, Dict[str, str]], max_side: int):
+    """
+    Инициализация процесса-воркера:
+    направляем логи в очередь основного процесса (файл пишет только он)
+    и заранее собираем шаблоны изображений для всех животных текущей версии контента.
+    """
+    from src.bot.core.logger import setup_logger
+    from src.bot.services.media import warm_templates
+    if log_queue is not None:
+        setup_logger("zoo_bot", log_queue)
+    warm_templates(animals, max_side)
+
+
+def _render(
+    animal_image: str, animal_name: str, user_name: str, profile: OutputProfile, debug_dir: Optional[str]
+) -> bytes:
+    """Выполняется в воркере: Pillow и модуль отрисовки загружаются только в процессах пула."""
+    from src.bot.services.media import generate_result_image
+    return generate_result_image(animal_image, animal_name, user_name, profile, debug_dir)
+
+
+def _ping() -> bool:
+    return True
+
+
+class RenderExecutor:
+    """
+    Выполняет отрисовку результатов в пуле процессов, не блокируя цикл событий:
+    — одновременно рисуется не больше `workers` изображений,
+    — ещё не больше `queue_size` запросов ждут своей очереди,
+    — каждая отрисовка ограничена таймаутом `timeout` секунд,
+    — изображения кодируются по профилю `profile`.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        queue_size: int,
+        timeout: float,
+        profile: OutputProfile,
+        debug_dir: Optional[str] = None
+    ):
+        self.workers = max(1, workers)
+        self.queue_size = max(0, queue_size)
+        self.timeout = timeout
+        self.profile = profile
+        self.debug_dir = debug_dir
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._slots = asyncio.Semaphore(self.workers)
+        self._pending = 0
+        self._warming: Optional[asyncio.Task] = None
+
+    @property
+    def pending(self) -> int:
+        """Количество запросов, которые рисуются или ждут в очереди."""
+        return self._pending
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            logger.info("Запускаем пул отрисовки: %s процесс(ов), очередь %s", self.workers, self.queue_size)
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_worker,
+                initargs=(worker_log_queue(), self._template_animals(), self.profile.max_side)
+            )
+        return self._pool
+
+    @staticmethod
+    def _template_animals() -> Dict[str, Dict[str, str]]:
+        """Фото и названия животных из текущего снимка контента — в виде, который можно передать воркерам."""
+        return {
+            key: {"image": animal["image"], "name": animal["name"]}
+            for key, animal in get_content_store().current.animals.items()
+        }
+
+    def _reset_pool(self, pool: Optional[ProcessPoolExecutor] = None):
+        """
+        Пересоздаёт пул при следующем запросе (например, если воркер упал).
+        Если передан `pool`, сбрасывает только его: пул, созданный взамен, не трогается.
+        """
+        if self._pool is not None and (pool is None or pool is self._pool):
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def _recycle_pool(self, pool: ProcessPoolExecutor):
+        """
+        Останавливает процессы пула с зависшей отрисовкой: отменить уже выполняемую задачу
+        нельзя, а слот освобождается, только когда процесс закончил работу.
+        Остальные отрисовки этого пула завершаются ошибкой BrokenProcessPool,
+        их слоты освобождаются, а новые запросы идут в новый пул.
+        """
+        if pool is self._pool:
+            self._pool = None
+        processes = list((getattr(pool, "_processes", None) or {}).values())
+        pool.shutdown(wait=False)
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        recycled.inc()
+
+    def _release_slot(self, loop: asyncio.AbstractEventLoop):
+        # Колбэк вызывается из служебного потока пула, поэтому возвращаемся в цикл событий
+        try:
+            loop.call_soon_threadsafe(self._slots.release)
+        except RuntimeError:
+            # Цикл уже закрыт — бот завершает работу
+            pass
+
+    async def render(
+        self,
+        animal_image: str,
+        animal_name: str,
+        user_name: str,
+        on_queued: Optional[Callable[[int], Awaitable[None]]] = None
+    ) -> bytes:
+        """
+        Ставит отрисовку в очередь и дожидается результата — байтов изображения,
+        закодированного по профилю пула.
+        Если все воркеры заняты, вызывает `on_queued(позиция_в_очереди)`,
+        чтобы обработчик мог предупредить пользователя.
+        """
+        if self._pending >= self.workers + self.queue_size:
+            raise RenderQueueFull(f"В очереди на отрисовку уже {self._pending} запросов")
+
+        self._pending += 1
+        try:
+            position = self._pending - self.workers
+            if position > 0 and on_queued is not None:
+                try:
+                    await on_queued(position)
+                except Exception as e:
+                    logger.warning("Не удалось уведомить пользователя о позиции в очереди: %s", e)
+
+            await self._slots.acquire()
+            pool: Optional[ProcessPoolExecutor] = None
+            try:
+                pool = self._get_pool()
+                future = pool.submit(
+                    _render, animal_image, animal_name, user_name, self.profile, self.debug_dir
+                )
+            except Exception as e:
+                self._slots.release()
+                if isinstance(e, BrokenProcessPool):
+                    logger.error("Пул отрисовки повреждён, пересоздаём: %s", e)
+                    self._reset_pool(pool)
+                raise
+
+            # Слот освобождается только когда процесс действительно закончил работу,
+            # иначе зависшие отрисовки после таймаута переполнили бы пул
+            loop = asyncio.get_running_loop()
+            future.add_done_callback(lambda _: self._release_slot(loop))
+
+            waiter = asyncio.wrap_future(future)
+            try:
+                return await asyncio.wait_for(asyncio.shield(waiter), self.timeout)
+            except asyncio.TimeoutError:
+                # Результат или ошибка опоздавшей отрисовки уже никому не нужны
+                waiter.add_done_callback(lambda done: done.cancelled() or done.exception())
+                logger.error("Отрисовка для %s не уложилась в %s с", animal_name, self.timeout)
+                # Задача ещё в очереди пула — просто отменяем; уже выполняется — перезапускаем пул
+                if not future.cancel():
+                    logger.error("Перезапускаем пул отрисовки, чтобы освободить зависший воркер")
+                    self._recycle_pool(pool)
+                raise RenderTimeout(f"Отрисовка заняла больше {self.timeout} с") from None
+            except BrokenProcessPool as e:
+                logger.error("Пул отрисовки повреждён, пересоздаём: %s", e)
+                self._reset_pool(pool)
+                raise
+        finally:
+            self._pending -= 1
+
+    async def warm_up(self):
+        """
+        Заранее запускает воркеры: каждый при старте собирает шаблоны всех животных,
+        и первый пользователь не ждёт запуска процессов.
+        """
+        pool = self._get_pool()
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(pool, _ping) for _ in range(self.workers)))
+        logger.info("Пул отрисовки прогрет")
+
+    def invalidate_templates(self):
+        """
+        Сбрасывает шаблоны воркеров после смены контента (животные, их фото и названия).
+        Воркеры перезапускаются и при старте собирают шаблоны по новому снимку;
+        если пул уже работал, новые воркеры прогреваются в фоне.
+        """
+        if self._pool is not None:
+            logger.info("Перезапускаем пул отрисовки для пересборки шаблонов")
+            # Уже принятые отрисовки дорисуются старыми воркерами
+            self._pool.shutdown(wait=False)
+            self._pool = None
+            self._warming = asyncio.create_task(self.warm_up())
+
+    def shutdown(self):
+        """Останавливает пул процессов."""
+        if self._warming is not None:
+            self._warming.cancel()
+            self._warming = None
+        if self._pool is not None:
+            logger.info("Останавливаем пул отрисовки")
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+
+@lru_cache(maxsize=None)
+def get_render_executor() -> RenderExecutor:
+    """Общий экземпляр для всех обработчиков: создаётся при первом обращении."""
+    settings = get_settings()
+    return RenderExecutor(
+        workers=settings.render_workers,
+        queue_size=settings.render_queue_size,
+        timeout=settings.render_timeout,
+        profile=OutputProfile(
+            name=settings.render_profile,
+            quality=settings.render_quality,
+            target_bytes=settings.render_target_bytes,
+            max_side=settings.render_max_side
+        ),
+        debug_dir=settings.render_debug_dir
+    )
@@ -1,22 +1,195 @@
-from collections import defaultdict
-from typing import List, Dict, Optional, Tuple
+import hashlib
+import json
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+# Способы выбора победителя при равенстве очков:
+# - first_scored — животное, первым получившее очко по ходу ответов (прежнее поведение),
+# - recent — животное, получившее очко в самом позднем ответе,
+# - order — животное, стоящее раньше в animals.json,
+# - alphabetical — животное с меньшим ключом по алфавиту.
+TIE_BREAK_RULES = ("first_scored", "recent", "order", "alphabetical")
 
-def calculate_scores(answer_weights: List[List[str]]) -> Dict[str, int]:
-    """
-    Рассчитывает общий вес для каждого животного на основе ответов пользователя.
-    Каждое совпадение увеличивает счетчик животного.
-    """
-    scores = defaultdict(int)
-    for weights in answer_weights:
-        for animal in weights:
-            scores[animal] += 1
-    return dict(scores)
 
-def determine_top_animal(scores: Dict[str, int]) -> Optional[Tuple[str, int]]:
+class CompiledQuestionBank:
     """
-    Определяет животное с наибольшим количеством очков.
-    Если список пуст — возвращает None.
+    Банк вопросов, скомпилированный для быстрого подсчёта очков.
+
+    Животные нумеруются в порядке animals.json, а веса ответов хранятся
+    плотной матрицей «ответ -> очки каждого животного» в массиве array.
+    Текущие очки пользователя — вектор длины «число животных»; каждый ответ
+    прибавляет к нему одну строку матрицы, итог — выбор максимума.
     """
-    if not scores:
-        return None
-    return max(scores.items(), key=lambda item: item[1])
\ No newline at end of file
+
+    def __init__(self, questions: List[Dict], animals: Dict[str, Dict], tie_break: str = "first_scored"):
+        if tie_break not in TIE_BREAK_RULES:
+            raise ValueError(f"Неизвестное правило ничьей: {tie_break}. Доступны: {', '.join(TIE_BREAK_RULES)}")
+
+        self.tie_break = tie_break
+        self.animal_keys: List[str] = list(animals)
+        self.animal_index: Dict[str, int] = {key: i for i, key in enumerate(self.animal_keys)}
+        self.animal_count = len(self.animal_keys)
+        self.radices: List[int] = [len(question["answers"]) for question in questions]
+        self.question_count = len(questions)
+        # Число всех возможных путей ответов
+        self.path_count = 1
+        for radix in self.radices:
+            self.path_count *= radix
+
+        # Смещение строки матрицы для первого ответа каждого вопроса
+        self._row_offsets: List[int] = []
+        # Порядок животных в весах ответа — нужен для правил ничьей, зависящих от хода ответов
+        self._answer_animals: List[List[Tuple[int, ...]]] = []
+        self._weights = array("H")
+
+        row = 0
+        for q_idx, question in enumerate(questions):
+            self._row_offsets.append(row)
+            answer_animals = []
+            for a_idx, answer in enumerate(question["answers"]):
+                vector = [0] * self.animal_count
+                order = []
+                for key in answer["weights"]:
+                    if key not in self.animal_index:
+                        raise ValueError(
+                            f"Вопрос {q_idx + 1}, ответ {a_idx + 1}: животного '{key}' нет в animals.json"
+                        )
+                    vector[self.animal_index[key]] += 1
+                    order.append(self.animal_index[key])
+                self._weights.extend(vector)
+                answer_animals.append(tuple(order))
+                row += 1
+            self._answer_animals.append(answer_animals)
+
+        # Сколько очков каждое животное ещё может набрать, начиная с вопроса q:
+        # строка q — сумма максимальных весов по оставшимся вопросам
+        self._remaining_gain = array("H", [0] * ((self.question_count + 1) * self.animal_count))
+        for q_idx in reversed(range(self.question_count)):
+            for animal in range(self.animal_count):
+                best = max(self._row(q_idx, a_idx)[animal] for a_idx in range(self.radices[q_idx]))
+                self._remaining_gain[q_idx * self.animal_count + animal] = (
+                    self._remaining_gain[(q_idx + 1) * self.animal_count + animal] + best
+                )
+
+        # Порядок животных по алфавиту ключей
+        self._alphabetical_rank = {
+            index: rank for rank, index in enumerate(sorted(range(self.animal_count), key=self.animal_keys.__getitem__))
+        }
+
+        # Отпечаток всего, от чего зависит результат: по нему проверяется актуальность таблицы исходов
+        payload = json.dumps(
+            [self.animal_keys, self.radices, list(self._weights), self._answer_animals, tie_break]
+        )
+        self.signature = hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+    def _row(self, question_index: int, answer_index: int) -> array:
+        if not 0 <= answer_index < self.radices[question_index]:
+            raise IndexError(f"На вопрос {question_index} нет ответа с номером {answer_index}")
+        start = (self._row_offsets[question_index] + answer_index) * self.animal_count
+        return self._weights[start:start + self.animal_count]
+
+    def empty_scores(self) -> List[int]:
+        return [0] * self.animal_count
+
+    def apply(self, scores: Sequence[int], question_index: int, answer_index: int) -> List[int]:
+        """Прибавляет к вектору очков веса выбранного ответа — O(число животных)."""
+        return [score + weight for score, weight in zip(scores, self._row(question_index, answer_index))]
+
+    def score_path(self, answers: Sequence[int]) -> List[int]:
+        """Вектор очков для последовательности номеров ответов."""
+        scores = self.empty_scores()
+        for question_index, answer_index in enumerate(answers):
+            scores = self.apply(scores, question_index, answer_index)
+        return scores
+
+    def is_decided(self, scores: Sequence[int], answered: int) -> bool:
+        """
+        Проверяет, что после ответа на первые answered вопросов лидер уже не изменится:
+        ни одно другое животное не может догнать его даже с максимальными очками
+        за оставшиеся вопросы (догнать — значит сравняться, ведь ничья разрешается отдельно).
+        """
+        if answered >= self.question_count:
+            return True
+        best = max(scores, default=0)
+        if best <= 0:
+            return False
+        leader = list(scores).index(best)
+        offset = answered * self.animal_count
+        gains = self._remaining_gain[offset:offset + self.animal_count]
+        return all(
+            score + gain < best
+            for animal, (score, gain) in enumerate(zip(scores, gains))
+            if animal != leader
+        )
+
+    def _tie_rank(self, candidates: List[int], answers: Optional[Sequence[int]]) -> int:
+        """Выбирает одного из животных с равным максимумом очков по правилу ничьей."""
+        if self.tie_break == "alphabetical":
+            return min(candidates, key=self._alphabetical_rank.__getitem__)
+        if self.tie_break == "order" or not answers:
+            return min(candidates)
+
+        # Порядок, в котором животные получали очки по ходу ответов
+        sequence = [
+            animal
+            for question_index, answer_index in enumerate(answers)
+            for animal in self._answer_animals[question_index][answer_index]
+        ]
+        if self.tie_break == "recent":
+            sequence.reverse()
+        remaining = set(candidates)
+        for animal in sequence:
+            if animal in remaining:
+                return animal
+        return min(candidates)
+
+    def winner(self, scores: Sequence[int], answers: Optional[Sequence[int]] = None) -> Optional[Tuple[str, int]]:
+        """
+        Возвращает (ключ животного, очки) победителя или None, если очков нет ни у кого.
+        Ничья разрешается детерминированно по правилу tie_break;
+        для правил first_scored и recent нужны номера ответов.
+        """
+        best = max(scores, default=0)
+        if best <= 0:
+            return None
+        candidates = [index for index, score in enumerate(scores) if score == best]
+        index = candidates[0] if len(candidates) == 1 else self._tie_rank(candidates, answers)
+        return self.animal_keys[index], best
+
+    def unpack_path(self, path_index: int) -> List[int]:
+        """Номера ответов полного пути по его номеру (смешанное основание, как в таблице исходов)."""
+        if not 0 <= path_index < self.path_count:
+            raise IndexError(f"Номер пути {path_index} вне диапазона 0..{self.path_count - 1}")
+        answers = []
+        for radix in reversed(self.radices):
+            path_index, answer = divmod(path_index, radix)
+            answers.append(answer)
+        answers.reverse()
+        return answers
+
+    def score_many(self, paths: Iterable[Union[int, Sequence[int]]]) -> List[Optional[Tuple[str, int]]]:
+        """
+        Пакетный подсчёт для офлайн-анализа: победитель для каждого пути ответов
+        (номер полного пути или последовательность номеров ответов), в порядке paths.
+
+        Пути обходятся в лексикографическом порядке, а векторы очков общих
+        префиксов хранятся стеком — как при компиляции таблицы исходов, каждый
+        путь досчитывается только от места, где он расходится с предыдущим.
+        """
+        decoded = [self.unpack_path(path) if isinstance(path, int) else list(path) for path in paths]
+        results: List[Optional[Tuple[str, int]]] = [None] * len(decoded)
+        # prefix_scores[k] — очки после первых k ответов предыдущего пути
+        prefix_scores = [self.empty_scores()]
+        previous: List[int] = []
+        for position in sorted(range(len(decoded)), key=decoded.__getitem__):
+            path = decoded[position]
+            common = 0
+            limit = min(len(path), len(previous))
+            while common < limit and path[common] == previous[common]:
+                common += 1
+            del prefix_scores[common + 1:]
+            for question_index in range(common, len(path)):
+                prefix_scores.append(self.apply(prefix_scores[-1], question_index, path[question_index]))
+            results[position] = self.winner(prefix_scores[-1], path)
+            previous = path
+        return results
@@ -0,0 +1,70 @@
+import time
+from typing import Any, Dict, List
+
+from src.bot.services.scoring import CompiledQuestionBank
+
+# Компактный формат сессии викторины в хранилище состояний.
+# Вместо списков весов хранятся только номера ответов, упакованные в одно число:
+#   v — версия снимка контента, с которым начата сессия,
+#   i — сколько вопросов уже отвечено,
+#   p — номера ответов в позиционной записи со смешанным основанием
+#       (основание для вопроса — число вариантов ответа на него),
+#   s — текущие очки животных в порядке animals.json (обновляются на каждом ответе),
+#   t — время последнего ответа (unix-время, секунды).
+VERSION_FIELD = "v"
+INDEX_FIELD = "i"
+PACKED_FIELD = "p"
+SCORES_FIELD = "s"
+TOUCHED_FIELD = "t"
+
+
+def new_session(version: str, bank: CompiledQuestionBank) -> Dict[str, Any]:
+    """Данные новой сессии викторины."""
+    return {
+        VERSION_FIELD: version,
+        INDEX_FIELD: 0,
+        PACKED_FIELD: 0,
+        SCORES_FIELD: bank.empty_scores(),
+        TOUCHED_FIELD: int(time.time()),
+    }
+
+
+def is_current(data: Dict[str, Any], version: str) -> bool:
+    """Проверяет, что сессия в новом формате и начата с указанной версией контента."""
+    return (
+        data.get(VERSION_FIELD) == version
+        and INDEX_FIELD in data
+        and PACKED_FIELD in data
+        and SCORES_FIELD in data
+    )
+
+
+def record_answer(
+    data: Dict[str, Any], bank: CompiledQuestionBank, question_index: int, answer_index: int
+) -> Dict[str, Any]:
+    """
+    Возвращает поля, которые нужно записать в хранилище после ответа на очередной вопрос.
+    Ответ дописывается младшей «цифрой» упакованного числа,
+    а его веса сразу прибавляются к вектору очков.
+    """
+    radix = bank.radices[question_index]
+    if not 0 <= answer_index < radix:
+        raise ValueError(f"Номер ответа {answer_index} вне диапазона 0..{radix - 1}")
+    return {
+        INDEX_FIELD: data[INDEX_FIELD] + 1,
+        PACKED_FIELD: data[PACKED_FIELD] * radix + answer_index,
+        SCORES_FIELD: bank.apply(data[SCORES_FIELD], question_index, answer_index),
+        TOUCHED_FIELD: int(time.time()),
+    }
+
+
+def unpack_answers(data: Dict[str, Any], radices: List[int]) -> List[int]:
+    """Восстанавливает номера выбранных ответов по порядку вопросов."""
+    count = data.get(INDEX_FIELD, 0)
+    packed = data.get(PACKED_FIELD, 0)
+    answers = []
+    for radix in reversed(radices[:count]):
+        packed, answer = divmod(packed, radix)
+        answers.append(answer)
+    answers.reverse()
+    return answers
@@ -0,0 +1,258 @@
+import asyncio
+import logging
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramAPIError, TelegramNetworkError, TelegramRetryAfter
+
+from src.bot.core.config import get_settings
+from src.bot.core.metrics import metrics
+from src.bot.services.outbound import Priority, outbound_priority
+
+logger = logging.getLogger("zoo_bot.staff")
+
+queued = metrics.counter("staff.queued", "запросы на связь, поставленные в очередь уведомлений")
+deduplicated = metrics.counter("staff.deduplicated", "повторные запросы того же пользователя о том же животном")
+digests_sent = metrics.counter("staff.digests_sent", "отправленные сотрудникам сводки")
+send_failures = metrics.counter("staff.send_failures", "неудачные попытки отправить сводку")
+dead_letters = metrics.counter("staff.dead_letters", "запросы, так и не доставленные после всех попыток")
+
+# Telegram ограничивает сообщение 4096 символами — сводка разбивается на части
+MAX_DIGEST_CHARS = 4000
+MAX_BACKOFF = 3600
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS outbox ("
+    " id INTEGER PRIMARY KEY,"
+    " created_at REAL NOT NULL,"
+    " user_id INTEGER NOT NULL,"
+    " full_name TEXT,"
+    " username TEXT,"
+    " animal TEXT NOT NULL,"
+    " animal_name TEXT,"
+    " attempts INTEGER NOT NULL DEFAULT 0,"
+    " next_attempt_at REAL NOT NULL,"
+    " status TEXT NOT NULL DEFAULT 'pending')",     # pending | sent | failed
+    "CREATE INDEX IF NOT EXISTS outbox_pending ON outbox (status, next_attempt_at)",
+    "CREATE INDEX IF NOT EXISTS outbox_dedup ON outbox (user_id, animal, created_at)",
+)
+
+Row = Tuple[int, float, int, Optional[str], Optional[str], str, Optional[str], int]
+
+# Фоновые постановки в очередь: на них держатся ссылки, пока они не завершатся
+_submissions = set()
+
+
+class StaffNotifier:
+    """
+    Доставка запросов на связь в чат сотрудников зоопарка.
+
+    — Запрос сразу сохраняется в постоянную очередь (SQLite), поэтому
+      не теряется при перезапуске и сбоях Telegram; обработчик нажатия не ждёт ни базы, ни отправки.
+    — Повторный запрос того же пользователя о том же животном в течение
+      `dedup_window` секунд не добавляется.
+    — Раз в `digest_interval` секунд все накопившиеся запросы уходят одной сводкой.
+    — Если отправить не удалось, запросы повторяются с растущей паузой,
+      после `max_attempts` попыток помечаются как недоставленные.
+    """
+
+    def __init__(
+        self,
+        chat_id: int,
+        path: str,
+        digest_interval: float = 60,
+        dedup_window: float = 600,
+        max_attempts: int = 10
+    ):
+        self.chat_id = chat_id
+        self.path = path
+        self.digest_interval = digest_interval
+        self.dedup_window = dedup_window
+        self.max_attempts = max(1, max_attempts)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="staff-outbox")
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pending = 0
+
+        metrics.gauge("staff.pending", lambda: self._pending, "запросы, ждущие отправки сотрудникам")
+
+    # --- Очередь в SQLite (служебный поток) ---
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            for statement in SCHEMA:
+                conn.execute(statement)
+            self._conn = conn
+        return self._conn
+
+    async def _run_db(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    def _insert(self, user_id: int, full_name: str, username: Optional[str], animal: str, animal_name: str) -> bool:
+        conn = self._connection()
+        now = time.time()
+        duplicate = conn.execute(
+            "SELECT 1 FROM outbox WHERE user_id = ? AND animal = ? AND created_at > ? LIMIT 1",
+            (user_id, animal, now - self.dedup_window)
+        ).fetchone()
+        if duplicate:
+            return False
+        conn.execute(
+            "INSERT INTO outbox (created_at, user_id, full_name, username, animal, animal_name, next_attempt_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (now, user_id, full_name, username, animal, animal_name, now)
+        )
+        return True
+
+    def _due(self, limit: int) -> List[Row]:
+        return self._connection().execute(
+            "SELECT id, created_at, user_id, full_name, username, animal, animal_name, attempts FROM outbox "
+            "WHERE status = 'pending' AND next_attempt_at <= ? ORDER BY id LIMIT ?",
+            (time.time(), limit)
+        ).fetchall()
+
+    def _count_pending(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM outbox WHERE status = 'pending'").fetchone()[0]
+
+    def _mark_sent(self, ids: List[int]):
+        self._connection().executemany("UPDATE outbox SET status = 'sent' WHERE id = ?", [(i,) for i in ids])
+
+    def _mark_failed(self, rows: List[Row], delay: Optional[float]) -> int:
+        """Переносит попытку на потом; возвращает, сколько запросов исчерпали попытки."""
+        conn = self._connection()
+        now = time.time()
+        exhausted = 0
+        conn.execute("BEGIN")
+        for row in rows:
+            attempts = row[7] + 1
+            if attempts >= self.max_attempts:
+                exhausted += 1
+                conn.execute("UPDATE outbox SET attempts = ?, status = 'failed' WHERE id = ?", (attempts, row[0]))
+                continue
+            backoff = delay if delay is not None else min(MAX_BACKOFF, self.digest_interval * 2 ** attempts)
+            conn.execute(
+                "UPDATE outbox SET attempts = ?, next_attempt_at = ? WHERE id = ?", (attempts, now + backoff, row[0])
+            )
+        conn.execute("COMMIT")
+        return exhausted
+
+    # --- Приём запросов ---
+
+    async def _submit(self, user_id: int, full_name: str, username: Optional[str], animal: str, animal_name: str):
+        try:
+            added = await self._run_db(self._insert, user_id, full_name, username, animal, animal_name)
+        except sqlite3.Error as e:
+            logger.error("Не удалось поставить в очередь запрос на связь от %s: %s", user_id, e)
+            return
+        if added:
+            queued.inc()
+            self._pending += 1
+        else:
+            deduplicated.inc()
+            logger.info("Повторный запрос на связь от %s о %s — он уже в очереди сотрудникам", user_id, animal)
+
+    def submit(self, user_id: int, full_name: str, username: Optional[str], animal: str, animal_name: str):
+        """Ставит запрос в постоянную очередь в фоне и сразу возвращается."""
+        task = asyncio.create_task(self._submit(user_id, full_name, username, animal, animal_name))
+        _submissions.add(task)
+        task.add_done_callback(_submissions.discard)
+
+    # --- Сводки ---
+
+    @staticmethod
+    def format_line(row: Row) -> str:
+        _, created_at, user_id, full_name, username, animal, animal_name, _ = row
+        contact = f"@{username}, " if username else ""
+        moment = time.strftime("%d.%m %H:%M", time.localtime(created_at))
+        return f"• {moment} — {full_name or 'Без имени'} ({contact}ID {user_id}) — {animal_name or animal}"
+
+    def build_digests(self, rows: List[Row]) -> List[Tuple[str, List[Row]]]:
+        """Разбивает запросы на сообщения не длиннее MAX_DIGEST_CHARS."""
+        groups: List[Tuple[List[str], List[Row]]] = []
+        lines: List[str] = []
+        batch: List[Row] = []
+        size = 0
+        for row in rows:
+            line = self.format_line(row)
+            if batch and size + len(line) > MAX_DIGEST_CHARS:
+                groups.append((lines, batch))
+                lines, batch, size = [], [], 0
+            lines.append(line)
+            batch.append(row)
+            size += len(line) + 1
+        if batch:
+            groups.append((lines, batch))
+        return [
+            (f"📩 Новые запросы на связь ({len(batch)}):\n\n" + "\n".join(lines), batch)
+            for lines, batch in groups
+        ]
+
+    async def flush(self, bot: Bot) -> int:
+        """Отправляет все запросы, которым пора. Возвращает число доставленных."""
+        rows = await self._run_db(self._due, 1000)
+        delivered = 0
+        for text, batch in self.build_digests(rows):
+            try:
+                with outbound_priority(Priority.LOW):
+                    await bot.send_message(self.chat_id, text)
+            except (TelegramAPIError, TelegramNetworkError) as e:
+                send_failures.inc()
+                delay = e.retry_after if isinstance(e, TelegramRetryAfter) else None
+                exhausted = await self._run_db(self._mark_failed, batch, delay)
+                if exhausted:
+                    dead_letters.inc(exhausted)
+                    logger.error("%s запросов на связь не доставлены сотрудникам после всех попыток", exhausted)
+                logger.warning("Не удалось отправить сотрудникам сводку из %s запросов: %s", len(batch), e)
+                break
+            await self._run_db(self._mark_sent, [row[0] for row in batch])
+            digests_sent.inc()
+            delivered += len(batch)
+        self._pending = await self._run_db(self._count_pending)
+        if delivered:
+            logger.info("Сотрудникам отправлено запросов на связь: %s", delivered)
+        return delivered
+
+    async def run(self, bot: Bot):
+        """Фоновая задача: раз в digest_interval секунд отправляет сводку."""
+        self._pending = await self._run_db(self._count_pending)
+        logger.info("Уведомления сотрудникам в чат %s, в очереди %s запросов", self.chat_id, self._pending)
+        while True:
+            try:
+                await self.flush(bot)
+            except Exception as e:
+                logger.exception("Ошибка при отправке сводки сотрудникам: %s", e)
+            await asyncio.sleep(self.digest_interval)
+
+    async def close(self):
+        """Дожидается постановки в очередь уже принятых запросов и закрывает базу."""
+        if _submissions:
+            await asyncio.gather(*_submissions, return_exceptions=True)
+
+        def _close():
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+        await self._run_db(_close)
+        self._executor.shutdown(wait=True)
+
+
+@lru_cache(maxsize=None)
+def get_staff_notifier() -> Optional[StaffNotifier]:
+    """Доставка запросов сотрудникам или None, если STAFF_CHAT_ID не задан."""
+    settings = get_settings()
+    if settings.staff_chat_id is None:
+        return None
+    return StaffNotifier(
+        settings.staff_chat_id,
+        settings.staff_outbox_path,
+        digest_interval=settings.staff_digest_interval,
+        dedup_window=settings.staff_dedup_window,
+        max_attempts=settings.staff_max_attempts
+    )
@@ -0,0 +1,214 @@
+"""
+Набор бенчмарков конвейера изображений с проверкой по эталонам.
+
+Рисует результат для каждого животного из data/animals.json и набора имён
+разной длины и письменности, измеряет задержку (p50/p99), пиковое потребление
+памяти и размер файлов, а затем сравнивает картинки с эталонами из media/golden
+с допуском на шум кодирования. Отчёт пишется в JSON, чтобы его можно было
+сравнивать между релизами.
+
+Запуск из корня проекта:
+    python -m src.bot.tools.bench_media --output bench_report.json
+    python -m src.bot.tools.bench_media --update-golden   # обновить эталоны
+"""
+import argparse
+import io
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import time
+from dataclasses import asdict
+from typing import Dict, List, Optional
+
+import PIL
+from PIL import Image, ImageChops, ImageStat
+
+from src.bot.services.data_loader import load_animals
+from src.bot.services.media import (
+    OUTPUT_PROFILES, OutputProfile, generate_result_image, invalidate_templates, warm_templates
+)
+
+GOLDEN_DIR = os.path.join("media", "golden")
+
+# Ширина эталона: картинки сравниваются в уменьшенном виде,
+# так сравнение устойчиво к шуму JPEG, но замечает сдвиги плашек и текста
+GOLDEN_WIDTH = 256
+
+# Допуски сравнения с эталоном. Шум кодирования даёт небольшую разницу по всей
+# картинке, а изменение вёрстки или текста — сильную разницу в отдельных пикселях,
+# поэтому главный критерий — доля сильно изменившихся пикселей
+MAX_MEAN_DIFF = 6.0           # средняя разница яркости по каналам (0–255)
+PIXEL_DIFF_THRESHOLD = 32     # пиксель считается изменённым, если разница больше
+MAX_CHANGED_PIXELS = 0.002    # допустимая доля изменённых пикселей
+
+# Имена пользователей: разная длина и письменность
+USER_NAMES = {
+    "cyrillic": "Екатерина",
+    "latin": "John Smith",
+    "emoji": "🦊 Лиса 🌿",
+    "mixed": "Анна-Maria O'Brien",
+    "short": "Я",
+    "long": "Константин Константинопольский-Достопримечательный Третий",
+}
+
+
+def _percentile(values: List[float], percent: float) -> float:
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, round(percent / 100 * len(values)) - 1))
+    return values[index]
+
+
+def _peak_rss_kb() -> Optional[int]:
+    """Пиковое потребление памяти процессом в КБ (только на Unix)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # На macOS значение в байтах, на Linux — в килобайтах
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def _thumbnail(data: bytes) -> Image.Image:
+    image = Image.open(io.BytesIO(data)).convert("RGB")
+    height = round(image.height * GOLDEN_WIDTH / image.width)
+    return image.resize((GOLDEN_WIDTH, height), Image.Resampling.BOX)
+
+
+def _golden_path(animal_key: str, name_id: str) -> str:
+    return os.path.join(GOLDEN_DIR, f"{animal_key}__{name_id}.jpg")
+
+
+def _compare_with_golden(thumbnail: Image.Image, path: str) -> Dict:
+    """Сравнивает уменьшенную картинку с эталоном."""
+    if not os.path.exists(path):
+        return {"status": "missing"}
+
+    golden = Image.open(path).convert("RGB")
+    if golden.size != thumbnail.size:
+        return {"status": "failed", "reason": f"размер {thumbnail.size} вместо {golden.size}"}
+
+    diff = ImageChops.difference(thumbnail, golden)
+    mean_diff = sum(ImageStat.Stat(diff).mean) / 3
+    histogram = diff.convert("L").histogram()
+    changed = sum(histogram[PIXEL_DIFF_THRESHOLD + 1:]) / (thumbnail.width * thumbnail.height)
+
+    ok = mean_diff <= MAX_MEAN_DIFF and changed <= MAX_CHANGED_PIXELS
+    return {
+        "status": "ok" if ok else "failed",
+        "mean_diff": round(mean_diff, 3),
+        "changed_pixels": round(changed, 5),
+    }
+
+
+def run(profile: OutputProfile, rounds: int, update_golden: bool) -> Dict:
+    animals = load_animals()
+
+    # Первая отрисовка с холодным кэшем шаблонов — отдельно
+    invalidate_templates()
+    first = next(iter(animals.values()))
+    started = time.perf_counter()
+    generate_result_image(first["image"], first["name"], USER_NAMES["cyrillic"], profile)
+    cold_ms = (time.perf_counter() - started) * 1000
+    warm_templates(animals, profile.max_side)
+
+    cases = []
+    all_timings: List[float] = []
+    all_sizes: List[int] = []
+    golden_summary = {"ok": 0, "failed": 0, "missing": 0, "updated": 0}
+
+    for animal_key, animal in animals.items():
+        for name_id, user_name in USER_NAMES.items():
+            timings = []
+            data = b""
+            for _ in range(rounds):
+                started = time.perf_counter()
+                data = generate_result_image(animal["image"], animal["name"], user_name, profile)
+                timings.append((time.perf_counter() - started) * 1000)
+
+            all_timings.extend(timings)
+            all_sizes.append(len(data))
+
+            thumbnail = _thumbnail(data)
+            golden_path = _golden_path(animal_key, name_id)
+            if update_golden:
+                os.makedirs(GOLDEN_DIR, exist_ok=True)
+                thumbnail.save(golden_path, "JPEG", quality=92)
+                golden = {"status": "updated"}
+            else:
+                golden = _compare_with_golden(thumbnail, golden_path)
+            golden_summary[golden["status"]] += 1
+
+            cases.append({
+                "animal": animal_key,
+                "name": name_id,
+                "p50_ms": round(statistics.median(timings), 2),
+                "bytes": len(data),
+                "golden": golden,
+            })
+
+    return {
+        "environment": {
+            "python": platform.python_version(),
+            "pillow": PIL.__version__,
+            "platform": platform.platform(),
+        },
+        "profile": asdict(profile),
+        "rounds": rounds,
+        "summary": {
+            "renders": len(all_timings),
+            "cold_render_ms": round(cold_ms, 2),
+            "latency_ms": {
+                "p50": round(_percentile(all_timings, 50), 2),
+                "p99": round(_percentile(all_timings, 99), 2),
+                "max": round(max(all_timings), 2),
+            },
+            "output_bytes": {
+                "mean": round(statistics.mean(all_sizes)),
+                "max": max(all_sizes),
+            },
+            "peak_rss_kb": _peak_rss_kb(),
+            "golden": golden_summary,
+        },
+        "cases": cases,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк и регрессионная проверка изображений с результатом")
+    parser.add_argument("--rounds", type=int, default=5, help="сколько раз рисовать каждую комбинацию")
+    parser.add_argument("--profile", choices=OUTPUT_PROFILES, default="jpeg", help="профиль кодирования")
+    parser.add_argument("--quality", type=int, default=85, help="качество JPEG/WebP")
+    parser.add_argument("--target-bytes", type=int, default=150_000, help="бюджет размера для профиля budget")
+    parser.add_argument("--output", help="куда записать JSON-отчёт (по умолчанию — в stdout)")
+    parser.add_argument("--update-golden", action="store_true", help="перезаписать эталонные изображения")
+    args = parser.parse_args()
+
+    logging.getLogger("zoo_bot").setLevel(logging.WARNING)
+    profile = OutputProfile(args.profile, quality=args.quality, target_bytes=args.target_bytes)
+    report = run(profile, max(1, args.rounds), args.update_golden)
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    summary = report["summary"]
+    print(
+        f"p50={summary['latency_ms']['p50']} мс, p99={summary['latency_ms']['p99']} мс, "
+        f"пик RSS={summary['peak_rss_kb']} КБ, эталоны: {summary['golden']}",
+        file=sys.stderr
+    )
+
+    # Ненулевой код возврата, если картинки разошлись с эталонами
+    if summary["golden"]["failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Замер времени отрисовки результата до и после кэширования шаблонов
+и сравнение профилей кодирования по времени и размеру файла.
+
+Запуск из корня проекта:
+    python -m src.bot.tools.bench_render --rounds 20
+"""
+import argparse
+import io
+import logging
+import statistics
+import time
+from typing import Callable, Dict, List
+
+from src.bot.services.data_loader import load_animals
+from src.bot.services.media import (
+    OutputProfile, compose_result_image, encode_image, invalidate_templates, warm_templates
+)
+
+# Профили, которые сравниваются между собой
+PROFILES = [
+    OutputProfile("jpeg"),
+    OutputProfile("progressive"),
+    OutputProfile("webp", quality=80),
+    OutputProfile("budget", target_bytes=100_000),
+]
+
+
+def _measure(animals: Dict[str, Dict], rounds: int, before_each: Callable[[], None]) -> List[float]:
+    """Рисует и кодирует в JPEG каждое животное `rounds` раз, возвращает время в мс."""
+    timings = []
+    for _ in range(rounds):
+        for animal in animals.values():
+            before_each()
+            started = time.perf_counter()
+            image = compose_result_image(animal["image"], animal["name"], "Екатерина Иванова")
+            image.save(io.BytesIO(), "JPEG", quality=85)
+            timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def _report(title: str, timings: List[float]):
+    timings = sorted(timings)
+    p50 = statistics.median(timings)
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(f"{title:<32} p50={p50:7.1f} мс  p95={p95:7.1f} мс  n={len(timings)}")
+
+
+def _measure_profiles(animals: Dict[str, Dict]):
+    """Кодирует готовые изображения всех животных каждым профилем."""
+    images = [
+        compose_result_image(animal["image"], animal["name"], "Екатерина Иванова")
+        for animal in animals.values()
+    ]
+    for profile in PROFILES:
+        timings, sizes = [], []
+        for image in images:
+            started = time.perf_counter()
+            sizes.append(len(encode_image(image, profile)))
+            timings.append((time.perf_counter() - started) * 1000)
+        print(
+            f"Профиль {profile.name:<12} кодирование p50={statistics.median(timings):6.1f} мс  "
+            f"средний размер={statistics.mean(sizes) / 1024:6.1f} КБ"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк отрисовки изображения с результатом")
+    parser.add_argument("--rounds", type=int, default=10, help="сколько раз рисовать каждое животное")
+    args = parser.parse_args()
+
+    logging.getLogger("zoo_bot").setLevel(logging.WARNING)
+    animals = load_animals()
+
+    # «До»: шаблон, шрифты и логотип собираются заново для каждого запроса
+    cold = _measure(animals, args.rounds, before_each=invalidate_templates)
+
+    # «После»: шаблоны собраны заранее, рисуется только подпись пользователя
+    invalidate_templates()
+    warm_templates(animals)
+    warm = _measure(animals, args.rounds, before_each=lambda: None)
+
+    _report("Без кэша шаблонов", cold)
+    _report("С кэшем шаблонов", warm)
+    print(f"Ускорение по медиане: x{statistics.median(cold) / statistics.median(warm):.1f}")
+    print()
+    _measure_profiles(animals)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Компилятор таблицы исходов викторины.
+
+Перебирает все пути ответов из data/questions.json, для каждого определяет
+тотемное животное и записывает компактную таблицу «номер пути -> животное»,
+по которой бот находит результат одним обращением к массиву.
+Заодно печатает отчёт: как часто выпадает каждое животное из data/animals.json,
+какие животные недостижимы и сколько результатов решено правилом ничьей.
+
+Запуск из корня проекта:
+    python -m src.bot.tools.compile_outcomes
+    python -m src.bot.tools.compile_outcomes --report outcomes_report.json
+    python -m src.bot.tools.compile_outcomes --check   # только проверить, что таблица актуальна
+"""
+import argparse
+import json
+import logging
+import sys
+import time
+
+from src.bot.core.config import get_settings
+from src.bot.services.data_loader import load_animals, load_questions
+from src.bot.services.outcomes import compile_outcomes, load_outcome_table
+from src.bot.services.scoring import TIE_BREAK_RULES, CompiledQuestionBank
+
+
+def print_report(report: dict, animals: dict):
+    """Печатает распределение исходов в читаемом виде."""
+    print(
+        f"Путей: {report['paths']}, правило ничьей: {report['tie_break']}, "
+        f"решено ничьей: {report['ties']} ({report['ties'] / report['paths']:.1%})"
+    )
+    rows = sorted(report["animals"].items(), key=lambda item: item[1]["paths"], reverse=True)
+    for key, row in rows:
+        print(
+            f"  {animals[key]['name']:<35} {row['paths']:>7} путей  {row['share']:>7.2%}  "
+            f"из них ничьей: {row['won_by_tie']}"
+        )
+    decided = ", ".join(f"{answered}: {count}" for answered, count in report["decided_after"].items())
+    print(
+        f"Результат решается в среднем после {report['mean_questions_needed']} вопросов "
+        f"из {report['questions']} (вопросов: путей — {decided})"
+    )
+    if report["no_winner"]:
+        print(f"Путей без победителя: {report['no_winner']}")
+    if report["unreachable"]:
+        print(f"⚠️ Недостижимые животные: {', '.join(report['unreachable'])}")
+
+
+def main():
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Сборка таблицы исходов викторины и отчёт о распределении")
+    parser.add_argument("--output", default=settings.outcomes_path, help="куда записать таблицу исходов")
+    parser.add_argument("--tie-break", choices=TIE_BREAK_RULES, default=settings.tie_break, help="правило ничьей")
+    parser.add_argument("--report", help="куда записать отчёт в JSON")
+    parser.add_argument("--check", action="store_true", help="не записывать таблицу, а проверить её актуальность")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s - %(message)s")
+    animals = load_animals()
+    bank = CompiledQuestionBank(load_questions(), animals, args.tie_break)
+
+    if args.check:
+        if load_outcome_table(args.output, bank) is None:
+            print(f"Таблица исходов {args.output} отсутствует или устарела", file=sys.stderr)
+            sys.exit(1)
+        print(f"Таблица исходов {args.output} актуальна")
+        return
+
+    started = time.perf_counter()
+    table, report = compile_outcomes(bank)
+    elapsed = time.perf_counter() - started
+    table.save(args.output)
+
+    print_report(report, animals)
+    print(f"Таблица записана в {args.output} ({len(table)} байт данных) за {elapsed:.2f} с")
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Запросы к базе событий бота (data/events.sqlite3): завершённые викторины,
+запросы на связь и отзывы. База открывается только на чтение и может
+использоваться, пока бот работает. Строки выводятся по мере чтения —
+таблица целиком в память не загружается.
+
+Запуск из корня проекта:
+    python -m src.bot.tools.events count contact_requests --animal binturong --since 7d
+    python -m src.bot.tools.events top quiz_results --since 30d
+    python -m src.bot.tools.events export quiz_results --since 2026-10-01 --format csv > results.csv
+    python -m src.bot.tools.events export feedback --limit 20
+"""
+import argparse
+import csv
+import json
+import re
+import sqlite3
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Iterator, List, Optional, Tuple
+
+from src.bot.core.config import get_settings
+from src.bot.services.events import TABLES, open_database
+
+FETCH_SIZE = 1000
+UNITS = {"m": 60, "h": 3600, "d": 86400, "w": 7 * 86400}
+
+
+def parse_since(value: str) -> float:
+    """«7d», «24h», «30m», «2w» — столько назад от текущего момента; иначе дата ISO (UTC)."""
+    match = re.fullmatch(r"(\d+)([mhdw])", value.strip())
+    if match:
+        return time.time() - int(match.group(1)) * UNITS[match.group(2)]
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+def build_filter(table: str, since: Optional[float], until: Optional[float], animal: Optional[str]):
+    """Условие WHERE по индексированным столбцам и его параметры."""
+    conditions, params = [], []
+    if animal is not None:
+        if "animal" not in TABLES[table]:
+            raise SystemExit(f"В таблице {table} нет столбца animal")
+        conditions.append("animal = ?")
+        params.append(animal)
+    if since is not None:
+        conditions.append("ts >= ?")
+        params.append(since)
+    if until is not None:
+        conditions.append("ts < ?")
+        params.append(until)
+    return (" WHERE " + " AND ".join(conditions)) if conditions else "", params
+
+
+def stream(conn: sqlite3.Connection, query: str, params: List) -> Iterator[Tuple]:
+    """Читает результат запроса порциями по FETCH_SIZE строк."""
+    cursor = conn.execute(query, params)
+    while True:
+        rows = cursor.fetchmany(FETCH_SIZE)
+        if not rows:
+            return
+        yield from rows
+
+
+def iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat(timespec="seconds")
+
+
+def main():
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Запросы к базе событий бота")
+    parser.add_argument("command", choices=("count", "top", "export"), help="что сделать")
+    parser.add_argument("table", choices=tuple(TABLES), help="таблица событий")
+    parser.add_argument("--db", default=settings.events_db_path, help="путь к базе событий")
+    parser.add_argument("--since", type=parse_since, help="с какого момента: 7d, 24h, 30m или дата ISO")
+    parser.add_argument("--until", type=parse_since, help="до какого момента (не включая)")
+    parser.add_argument("--animal", help="только события с этим животным")
+    parser.add_argument("--format", choices=("ndjson", "csv"), default="ndjson", help="формат для export")
+    parser.add_argument("--limit", type=int, help="не больше стольких строк (export — самые новые)")
+    args = parser.parse_args()
+
+    try:
+        conn = open_database(args.db, readonly=True)
+        where, params = build_filter(args.table, args.since, args.until, args.animal)
+
+        if args.command == "count":
+            (count,) = conn.execute(f"SELECT COUNT(*) FROM {args.table}{where}", params).fetchone()
+            print(count)
+            return
+
+        if args.command == "top":
+            if "animal" not in TABLES[args.table]:
+                raise SystemExit(f"В таблице {args.table} нет столбца animal")
+            query = f"SELECT animal, COUNT(*) AS n FROM {args.table}{where} GROUP BY animal ORDER BY n DESC"
+            for animal, count in stream(conn, query, params):
+                print(f"{animal:<25} {count}")
+            return
+
+        columns = ("id",) + TABLES[args.table]
+        query = f"SELECT {', '.join(columns)} FROM {args.table}{where}"
+        if args.limit:
+            query += " ORDER BY ts DESC LIMIT ?"
+            params.append(args.limit)
+        else:
+            query += " ORDER BY ts"
+        rows = stream(conn, query, params)
+        ts_index = columns.index("ts")
+
+        if args.format == "csv":
+            writer = csv.writer(sys.stdout)
+            writer.writerow(columns)
+            for row in rows:
+                row = list(row)
+                row[ts_index] = iso(row[ts_index])
+                writer.writerow(row)
+        else:
+            for row in rows:
+                record = dict(zip(columns, row))
+                record["ts"] = iso(record["ts"])
+                sys.stdout.write(json.dumps(record, ensure_ascii=False) + "\n")
+    except sqlite3.OperationalError as e:
+        raise SystemExit(f"Не удалось прочитать базу событий {args.db}: {e}")
+    except BrokenPipeError:
+        # Вывод оборвали (например, | head) — это не ошибка
+        sys.stderr.close()
+
+
+if __name__ == "__main__":
+    main()
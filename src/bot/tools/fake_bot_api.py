@@ -0,0 +1,119 @@
+"""
+Локальная имитация Telegram Bot API для разработки и проверки бота без Telegram.
+
+Принимает запросы вида POST /bot<токен>/<метод>, печатает их и отвечает
+правдоподобными объектами: getMe — бот, sendMessage/sendPhoto/editMessageText — сообщение,
+остальные методы — true. Для проверки повторов умеет отвечать ошибками:
+--flood-every N — каждый N-й запрос получает 429 с retry_after,
+--fail-rate P — доля запросов, на которые приходит 500.
+
+Запуск из корня проекта:
+    python -m src.bot.tools.fake_bot_api --port 8081
+    TELEGRAM_API_URL=http://127.0.0.1:8081 STAFF_CHAT_ID=-100 STAFF_DIGEST_INTERVAL=5 \\
+        DELIVERY_MODE=webhook python -m src.bot.main
+    python -m src.bot.tools.replay_updates updates.json
+"""
+import argparse
+import itertools
+import json
+import logging
+import random
+import time
+from typing import Any, Dict
+
+from aiohttp import web
+
+logger = logging.getLogger("zoo_bot.fake_bot_api")
+
+BOT_USER = {"id": 1, "is_bot": True, "first_name": "MZoo", "username": "MZoo_Bot"}
+
+
+class FakeBotApi:
+    """Отвечает на методы Bot API и считает вызовы по методам."""
+
+    def __init__(self, flood_every: int = 0, retry_after: int = 1, fail_rate: float = 0.0, quiet: bool = False):
+        self.flood_every = flood_every
+        self.retry_after = retry_after
+        self.fail_rate = fail_rate
+        self.quiet = quiet
+        self.calls: Dict[str, int] = {}
+        self._requests = itertools.count(1)
+        self._message_ids = itertools.count(1)
+
+    def _message(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        chat_id = params.get("chat_id", 0)
+        message = {
+            "message_id": int(params.get("message_id") or next(self._message_ids)),
+            "date": int(time.time()),
+            "chat": {"id": int(chat_id) if str(chat_id).lstrip("-").isdigit() else 0, "type": "private"},
+            "from": BOT_USER,
+        }
+        if "photo" in params:
+            file_id = f"fake-photo-{message['message_id']}"
+            message["photo"] = [{"file_id": file_id, "file_unique_id": file_id, "width": 1280, "height": 1280}]
+            message["caption"] = params.get("caption")
+        else:
+            message["text"] = params.get("text", "")
+        return message
+
+    def result(self, method: str, params: Dict[str, Any]) -> Any:
+        if method == "getme":
+            return BOT_USER
+        if method in ("sendmessage", "sendphoto", "editmessagetext", "editmessagecaption", "editmessagereplymarkup"):
+            return self._message(params)
+        if method == "getupdates":
+            return []
+        return True
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        if request.content_type == "multipart/form-data":
+            params = {key: value if isinstance(value, str) else "<file>" for key, value in (await request.post()).items()}
+        elif request.content_type == "application/json":
+            params = await request.json()
+        else:
+            params = dict(await request.post())
+        number = next(self._requests)
+        self.calls[method] = self.calls.get(method, 0) + 1
+
+        if self.flood_every and number % self.flood_every == 0:
+            logger.info("#%s %s: 429, retry_after=%s", number, method, self.retry_after)
+            return web.json_response({
+                "ok": False, "error_code": 429,
+                "description": f"Too Many Requests: retry after {self.retry_after}",
+                "parameters": {"retry_after": self.retry_after},
+            }, status=429)
+        if self.fail_rate and random.random() < self.fail_rate:
+            logger.info("#%s %s: 500", number, method)
+            return web.json_response({"ok": False, "error_code": 500, "description": "Internal Server Error"}, status=500)
+
+        if not self.quiet:
+            shown = {key: value for key, value in params.items() if key != "reply_markup"}
+            logger.info("#%s %s %s", number, method, json.dumps(shown, ensure_ascii=False)[:500])
+        return web.json_response({"ok": True, "result": self.result(method.lower(), params)})
+
+    async def stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.calls)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Локальная имитация Telegram Bot API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--flood-every", type=int, default=0, help="каждый N-й запрос отвечать 429")
+    parser.add_argument("--retry-after", type=int, default=1, help="retry_after для ответов 429, сек")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="доля запросов с ответом 500")
+    parser.add_argument("--quiet", action="store_true", help="не печатать успешные запросы")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(message)s")
+    api = FakeBotApi(args.flood_every, args.retry_after, args.fail_rate, args.quiet)
+    app = web.Application()
+    app.router.add_post("/bot{token}/{method}", api.handle)
+    app.router.add_get("/stats", api.stats)
+    logger.info("Имитация Bot API: http://%s:%s (счётчики вызовов — GET /stats)", args.host, args.port)
+    web.run_app(app, host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
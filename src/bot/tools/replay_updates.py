@@ -0,0 +1,136 @@
+"""
+Отправляет записанные обновления Telegram на вебхук бота — для локальной
+проверки режима DELIVERY_MODE=webhook без регистрации адреса в Telegram.
+
+Обновления читаются из файла: JSON-список, ответ getUpdates ({"ok": ..., "result": [...]})
+или по одному JSON-объекту в строке. Без файла генерируются команды /start
+от --synthetic разных пользователей.
+
+Запуск из корня проекта:
+    DELIVERY_MODE=webhook WEBHOOK_SECRET=local python -m src.bot.main
+    python -m src.bot.tools.replay_updates updates.json --secret local
+    python -m src.bot.tools.replay_updates --synthetic 200 --concurrency 20 --secret local
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from collections import Counter
+from typing import Any, Dict, List
+
+from src.bot.core.config import get_settings
+
+
+def load_updates(path: str) -> List[Dict[str, Any]]:
+    """Читает обновления из файла в любом из поддерживаемых форматов."""
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+    if isinstance(data, dict):
+        data = data.get("result", [data])
+    return list(data)
+
+
+def synthetic_updates(count: int, first_user: int = 10_000) -> List[Dict[str, Any]]:
+    """Команды /start от `count` разных пользователей."""
+    now = int(time.time())
+    updates = []
+    for offset in range(count):
+        user = {"id": first_user + offset, "is_bot": False, "first_name": f"Гость {offset + 1}"}
+        updates.append({
+            "update_id": offset + 1,
+            "message": {
+                "message_id": offset + 1,
+                "date": now,
+                "chat": {"id": user["id"], "type": "private", "first_name": user["first_name"]},
+                "from": user,
+                "text": "/start",
+                "entities": [{"type": "bot_command", "offset": 0, "length": 6}],
+            },
+        })
+    return updates
+
+
+async def replay(
+    url: str,
+    updates: List[Dict[str, Any]],
+    secret: str,
+    concurrency: int,
+    delay: float
+) -> Dict[str, Any]:
+    """Отправляет обновления и собирает коды ответов и время до ответа сервера."""
+    from aiohttp import ClientSession, ClientError
+
+    headers = {"X-Telegram-Bot-Api-Secret-Token": secret}
+    statuses: Counter = Counter()
+    latencies: List[float] = []
+    slots = asyncio.Semaphore(max(1, concurrency))
+
+    async def post(session: ClientSession, update: Dict[str, Any]):
+        async with slots:
+            started = time.perf_counter()
+            try:
+                async with session.post(url, json=update, headers=headers) as response:
+                    await response.read()
+                    statuses[response.status] += 1
+            except ClientError as e:
+                statuses[type(e).__name__] += 1
+                return
+            latencies.append((time.perf_counter() - started) * 1000)
+            if delay:
+                await asyncio.sleep(delay)
+
+    started = time.perf_counter()
+    async with ClientSession() as session:
+        await asyncio.gather(*(post(session, update) for update in updates))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "updates": len(updates),
+        "seconds": round(elapsed, 3),
+        "per_second": round(len(updates) / elapsed, 1) if elapsed else None,
+        "statuses": {str(status): count for status, count in statuses.items()},
+        "ack_ms_p50": round(statistics.median(latencies), 2) if latencies else None,
+        "ack_ms_p95": round(latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))], 2) if latencies else None,
+        "ack_ms_max": round(latencies[-1], 2) if latencies else None,
+    }
+
+
+def main():
+    settings = get_settings()
+    default_url = f"http://127.0.0.1:{settings.webhook_port}{settings.webhook_path}"
+    parser = argparse.ArgumentParser(description="Отправка записанных обновлений на вебхук бота")
+    parser.add_argument("file", nargs="?", help="файл с обновлениями (JSON-список, ответ getUpdates или NDJSON)")
+    parser.add_argument("--url", default=default_url, help=f"адрес вебхука (по умолчанию {default_url})")
+    parser.add_argument("--secret", default=settings.webhook_secret, help="секретный токен (по умолчанию WEBHOOK_SECRET)")
+    parser.add_argument("--synthetic", type=int, default=0, help="сгенерировать столько команд /start вместо файла")
+    parser.add_argument("--repeat", type=int, default=1, help="сколько раз повторить набор обновлений")
+    parser.add_argument("--concurrency", type=int, default=1, help="сколько запросов отправлять одновременно")
+    parser.add_argument("--delay", type=float, default=0.0, help="пауза после каждого запроса, сек")
+    args = parser.parse_args()
+
+    if args.file:
+        updates = load_updates(args.file)
+    elif args.synthetic > 0:
+        updates = synthetic_updates(args.synthetic)
+    else:
+        parser.error("укажите файл с обновлениями или --synthetic N")
+    updates = updates * max(1, args.repeat)
+    # Вебхук бота не принимает запросы без секретного токена — без него все ответы были бы 401
+    if not args.secret:
+        parser.error("не задан секретный токен: укажите --secret или WEBHOOK_SECRET, как у запущенного бота")
+
+    report = asyncio.run(replay(args.url, updates, args.secret, args.concurrency, args.delay))
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    ok = report["statuses"].get("200", 0)
+    sys.exit(0 if ok == report["updates"] else 1)
+
+
+if __name__ == "__main__":
+    main()
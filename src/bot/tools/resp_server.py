@@ -0,0 +1,274 @@
+"""
+Локальный сервер с протоколом Redis (RESP2) для разработки и проверки бота
+без внешнего Redis. Данные хранятся в памяти процесса.
+
+Поддерживается подмножество команд, которым пользуется хранилище состояний:
+строки, хэши, время жизни ключей и транзакции MULTI/EXEC.
+
+Запуск из корня проекта:
+    python -m src.bot.tools.resp_server --port 6390
+    FSM_STORAGE=redis REDIS_URL=redis://127.0.0.1:6390/0 python -m src.bot.main
+"""
+import argparse
+import asyncio
+import fnmatch
+import logging
+import time
+from typing import Any, Dict, List, Optional, Union
+
+logger = logging.getLogger("zoo_bot.resp_server")
+
+
+class RespError(Exception):
+    """Ошибка, которая возвращается клиенту как ответ -ERR."""
+
+
+class RespServer:
+    """Минимальная реализация Redis в памяти."""
+
+    def __init__(self):
+        self.data: Dict[bytes, Union[bytes, Dict[bytes, bytes]]] = {}
+        self.expires: Dict[bytes, float] = {}
+        self.commands_processed = 0
+
+    # --- Хранилище ---
+
+    def _alive(self, key: bytes) -> bool:
+        deadline = self.expires.get(key)
+        if deadline is not None and deadline <= time.monotonic():
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+        return key in self.data
+
+    def _hash(self, key: bytes, create: bool = False) -> Optional[Dict[bytes, bytes]]:
+        if not self._alive(key):
+            if not create:
+                return None
+            self.data[key] = {}
+        value = self.data[key]
+        if not isinstance(value, dict):
+            raise RespError("WRONGTYPE Operation against a key holding the wrong kind of value")
+        return value
+
+    def _delete(self, key: bytes) -> int:
+        existed = self._alive(key)
+        self.data.pop(key, None)
+        self.expires.pop(key, None)
+        return int(existed)
+
+    # --- Команды ---
+
+    def execute(self, args: List[bytes]) -> Any:
+        self.commands_processed += 1
+        name = args[0].decode().upper()
+        handler = getattr(self, f"cmd_{name.lower()}", None)
+        if handler is None:
+            raise RespError(f"unknown command '{name}'")
+        return handler(*args[1:])
+
+    def cmd_ping(self, message: bytes = None):
+        return message if message is not None else "PONG"
+
+    def cmd_echo(self, message: bytes):
+        return message
+
+    def cmd_select(self, index: bytes):
+        return "OK"
+
+    def cmd_client(self, *args: bytes):
+        return "OK"
+
+    def cmd_flushdb(self, *args: bytes):
+        self.data.clear()
+        self.expires.clear()
+        return "OK"
+
+    cmd_flushall = cmd_flushdb
+
+    def cmd_dbsize(self):
+        return sum(1 for key in list(self.data) if self._alive(key))
+
+    def cmd_get(self, key: bytes):
+        if not self._alive(key):
+            return None
+        value = self.data[key]
+        if isinstance(value, dict):
+            raise RespError("WRONGTYPE Operation against a key holding the wrong kind of value")
+        return value
+
+    def cmd_set(self, key: bytes, value: bytes, *options: bytes):
+        self.data[key] = value
+        self.expires.pop(key, None)
+        options = [option.upper() for option in options]
+        for flag, scale in ((b"EX", 1.0), (b"PX", 0.001)):
+            if flag in options:
+                self.expires[key] = time.monotonic() + int(options[options.index(flag) + 1]) * scale
+        return "OK"
+
+    def cmd_del(self, *keys: bytes):
+        return sum(self._delete(key) for key in keys)
+
+    def cmd_exists(self, *keys: bytes):
+        return sum(1 for key in keys if self._alive(key))
+
+    def cmd_keys(self, pattern: bytes):
+        return [key for key in list(self.data) if self._alive(key) and fnmatch.fnmatchcase(key, pattern)]
+
+    def cmd_scan(self, cursor: bytes, *options: bytes):
+        pattern = b"*"
+        upper = [option.upper() for option in options]
+        if b"MATCH" in upper:
+            pattern = options[upper.index(b"MATCH") + 1]
+        return [b"0", self.cmd_keys(pattern)]
+
+    def cmd_expire(self, key: bytes, seconds: bytes):
+        return self.cmd_pexpire(key, str(int(seconds) * 1000).encode())
+
+    def cmd_pexpire(self, key: bytes, milliseconds: bytes):
+        if not self._alive(key):
+            return 0
+        self.expires[key] = time.monotonic() + int(milliseconds) / 1000
+        return 1
+
+    def cmd_pttl(self, key: bytes):
+        if not self._alive(key):
+            return -2
+        deadline = self.expires.get(key)
+        return -1 if deadline is None else int((deadline - time.monotonic()) * 1000)
+
+    def cmd_ttl(self, key: bytes):
+        ttl = self.cmd_pttl(key)
+        return ttl if ttl < 0 else ttl // 1000
+
+    def cmd_hset(self, key: bytes, *pairs: bytes):
+        if not pairs or len(pairs) % 2:
+            raise RespError("wrong number of arguments for 'hset' command")
+        value = self._hash(key, create=True)
+        added = 0
+        for field, item in zip(pairs[::2], pairs[1::2]):
+            added += field not in value
+            value[field] = item
+        return added
+
+    def cmd_hget(self, key: bytes, field: bytes):
+        value = self._hash(key)
+        return value.get(field) if value else None
+
+    def cmd_hgetall(self, key: bytes):
+        value = self._hash(key) or {}
+        return [item for pair in value.items() for item in pair]
+
+    def cmd_hdel(self, key: bytes, *fields: bytes):
+        value = self._hash(key)
+        if not value:
+            return 0
+        removed = sum(1 for field in fields if value.pop(field, None) is not None)
+        if not value:
+            self._delete(key)
+        return removed
+
+    # --- Протокол ---
+
+    @staticmethod
+    async def _read_command(reader: asyncio.StreamReader) -> Optional[List[bytes]]:
+        line = await reader.readline()
+        if not line:
+            return None
+        if not line.startswith(b"*"):
+            # Inline-команда, например из telnet
+            return line.split()
+        args = []
+        for _ in range(int(line[1:])):
+            header = await reader.readline()
+            length = int(header[1:])
+            args.append((await reader.readexactly(length + 2))[:-2])
+        return args
+
+    @classmethod
+    def _encode(cls, value: Any) -> bytes:
+        if value is None:
+            return b"$-1\r\n"
+        if isinstance(value, RespError):
+            return f"-ERR {value}\r\n".encode()
+        if isinstance(value, str):
+            return f"+{value}\r\n".encode()
+        if isinstance(value, bool) or isinstance(value, int):
+            return f":{int(value)}\r\n".encode()
+        if isinstance(value, bytes):
+            return b"$%d\r\n%s\r\n" % (len(value), value)
+        if isinstance(value, list):
+            return b"*%d\r\n" % len(value) + b"".join(cls._encode(item) for item in value)
+        raise TypeError(f"Нельзя закодировать {type(value).__name__}")
+
+    def _safe_execute(self, args: List[bytes]) -> Any:
+        try:
+            return self.execute(args)
+        except RespError as e:
+            return e
+        except (TypeError, ValueError, IndexError) as e:
+            return RespError(f"bad arguments: {e}")
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Обслуживает одно клиентское подключение. Поддерживает конвейер и MULTI/EXEC."""
+        queued: Optional[List[List[bytes]]] = None
+        try:
+            while True:
+                args = await self._read_command(reader)
+                if args is None:
+                    break
+                if not args:
+                    continue
+
+                name = args[0].upper()
+                if name == b"MULTI":
+                    queued = []
+                    reply = "OK"
+                elif name == b"EXEC":
+                    if queued is None:
+                        reply = RespError("EXEC without MULTI")
+                    else:
+                        reply = [self._safe_execute(command) for command in queued]
+                        queued = None
+                elif name == b"DISCARD":
+                    queued = None
+                    reply = "OK"
+                elif queued is not None:
+                    queued.append(args)
+                    reply = "QUEUED"
+                else:
+                    reply = self._safe_execute(args)
+
+                writer.write(self._encode(reply))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host: str = "127.0.0.1", port: int = 6390) -> asyncio.AbstractServer:
+        server = await asyncio.start_server(self.handle, host, port)
+        logger.info("Сервер RESP слушает %s:%s", host, port)
+        return server
+
+
+async def _serve(host: str, port: int):
+    server = await RespServer().start(host, port)
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Локальный сервер с протоколом Redis для разработки")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6390)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    try:
+        asyncio.run(_serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()